@@ -0,0 +1,129 @@
+"""
+Attendance bitmaps vs attendance rows at gym scale.
+
+Generates `--members` members with `--years` of daily attendance (each member
+gets their own visit probability) as DayBitmaps, and the same attendance as
+row-style date lists for a sample of members. It then times the questions the
+API asks, per member:
+- current streak (the loop /student/progress used to run);
+- longest streak;
+- 30-day attendance rate;
+- "attended on any of these days".
+
+Row timings are measured on the sample and scaled to all members. Storage
+compares the bitmap bytes with the attendance rows they replace.
+
+Usage:
+    python benchmarks/attendance_bitmap_benchmark.py
+    python benchmarks/attendance_bitmap_benchmark.py --members 100000 --years 3 --row-sample 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.day_bitmap import DayBitmap
+
+# Approximate InnoDB footprint of one attendance row: id, student_id, date,
+# status, created_at plus row header, and the (student_id, date) index entry
+ROW_BYTES = 70
+
+
+def random_bitmap(start, days, probability, rng):
+    """A bitmap with each day set with `probability`, built from random words rather than day by day"""
+    bits = 0
+    # Combining random words approximates the probability in steps of 1/16
+    sixteenths = max(0, min(15, round(probability * 16)))
+    for level in range(4):
+        word = rng.getrandbits(days)
+        bits = (bits | word) if (sixteenths >> level) & 1 else (bits & word)
+    return DayBitmap(start, bits & ((1 << days) - 1))
+
+
+def row_streak(dates, today):
+    """The row walk /student/progress did: consecutive dates back from today or yesterday"""
+    if not dates or dates[0] not in (today, today - timedelta(days=1)):
+        return 0
+    streak = 1
+    for newer, older in zip(dates, dates[1:]):
+        if newer - older != timedelta(days=1):
+            break
+        streak += 1
+    return streak
+
+
+def row_longest(dates):
+    longest = run = 0
+    previous = None
+    for day in reversed(dates):
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    return longest
+
+
+def timed(fn, items):
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark day bitmaps against attendance rows')
+    parser.add_argument('--members', type=int, default=100000)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--row-sample', type=int, default=2000, help='members measured with row lists')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    today = date.today()
+    days = 365 * args.years
+    start = today - timedelta(days=days - 1)
+
+    started = time.perf_counter()
+    bitmaps = [random_bitmap(start, days, rng.uniform(0.05, 0.9), rng) for _ in range(args.members)]
+    print(f"Generated {args.members} members x {days} days in {time.perf_counter() - started:.1f}s")
+
+    sample = bitmaps[:min(args.row_sample, args.members)]
+    rows = [sorted(bitmap, reverse=True) for bitmap in sample]  # what an ORDER BY date DESC query returns
+    total_rows = sum(len(bitmap) for bitmap in bitmaps)
+    scale = args.members / len(sample)
+
+    window = (today - timedelta(days=29), today)
+    probe_days = [today - timedelta(days=rng.randint(0, days - 1)) for _ in range(10)]
+    probe_set = set(probe_days)
+
+    cases = [
+        ('current streak',
+         lambda b: b.streak_ending(today) or b.streak_ending(today - timedelta(days=1)),
+         lambda r: row_streak(r, today)),
+        ('longest streak', DayBitmap.longest_streak, row_longest),
+        ('30-day rate',
+         lambda b: b.count(*window) / 30,
+         lambda r: sum(1 for d in r if window[0] <= d <= window[1]) / 30),
+        ('any of 10 days', lambda b: b.any_of(probe_days), lambda r: any(d in probe_set for d in r))
+    ]
+
+    print(f"\n{'query':<18}{'bitmaps, all members':>22}{'rows, all members*':>21}{'speedup':>10}")
+    for name, bitmap_fn, row_fn in cases:
+        for bitmap, dates in zip(sample[:200], rows[:200]):
+            assert bitmap_fn(bitmap) == row_fn(dates), name
+        bitmap_s = timed(bitmap_fn, bitmaps)
+        row_s = timed(row_fn, rows) * scale
+        print(f"{name:<18}{bitmap_s * 1000:>19.0f} ms{row_s * 1000:>18.0f} ms{row_s / max(bitmap_s, 1e-9):>9.1f}x")
+
+    bitmap_bytes = sum(len(bitmap.to_bytes()) for bitmap in bitmaps)
+    print(f"\n* row timings measured on {len(sample)} members and scaled; they exclude fetching the rows")
+    print(f"attendance rows: {total_rows:,} (~{total_rows * ROW_BYTES / 1e6:,.0f} MB)")
+    print(f"present bitmaps: {bitmap_bytes / 1e6:,.1f} MB ({bitmap_bytes / args.members:.0f} bytes/member)")
+
+
+if __name__ == '__main__':
+    main()
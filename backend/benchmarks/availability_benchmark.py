@@ -0,0 +1,151 @@
+"""
+Free-slot search time for --trainers trainers over a three-month window.
+
+Books every trainer for the evening (18:00 to 20:00) of every day of the
+window plus --per-day random daytime sessions, fills trainer_calendar from
+them, then times services.availability.search over the whole window for:
+- a free hour with anyone;
+- the same restricted to one specialization;
+- an evening hour, which only the seeded trainer without sessions has.
+The first is also timed the way it was done by hand: loading every
+trainer's sessions through the ORM and trying each 15-minute start in turn.
+
+Usage:
+    python benchmarks/availability_benchmark.py --trainers 200
+    DATABASE_URL=mysql+pymysql://... python benchmarks/availability_benchmark.py --repeat 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault('TRACING_ENABLED', 'false')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'availability_benchmark.db')
+
+from sqlalchemy import insert, select, func
+
+from app import create_app
+from models import db, User, Trainer, Schedule
+from seed import init_database
+from services import availability, trainer_calendar
+
+BENCH_DOMAIN = '@availability.benchmark'
+SPECIALIZATIONS = ['Weight Training', 'Yoga', 'Cardio', 'CrossFit', 'Pilates', 'Boxing', 'Rehabilitation', 'Nutrition']
+DAYS = 92
+
+
+def ensure_trainers(count, per_day, start):
+    existing = db.session.execute(
+        select(func.count()).select_from(User).where(User.email.like('trainer%' + BENCH_DOMAIN))
+    ).scalar()
+    if existing >= count:
+        return
+    random.seed(count)
+    db.session.execute(insert(User), [
+        {'name': f'Trainer {i}', 'email': f'trainer{i}{BENCH_DOMAIN}', 'role': 'trainer', 'password_hash': '!'}
+        for i in range(existing, count)
+    ] + [{'name': f'Member {i}', 'email': f'member{i}{BENCH_DOMAIN}', 'role': 'student', 'password_hash': '!'}
+         for i in range(100)])
+    user_ids = db.session.execute(
+        select(User.id).where(User.email.like('trainer%' + BENCH_DOMAIN)).order_by(User.id)
+    ).scalars().all()
+    member_ids = db.session.execute(
+        select(User.id).where(User.email.like('member%' + BENCH_DOMAIN))
+    ).scalars().all()
+    db.session.execute(insert(Trainer), [
+        {'user_id': user_id, 'specialization': SPECIALIZATIONS[i % len(SPECIALIZATIONS)], 'experience_years': 1}
+        for i, user_id in enumerate(user_ids)
+    ])
+    trainer_ids = db.session.execute(
+        select(Trainer.id).where(Trainer.user_id.in_(user_ids))
+    ).scalars().all()
+
+    rows = []
+    for trainer_id in trainer_ids:
+        for day in range(DAYS):
+            midnight = start + timedelta(days=day)
+            hours = [18, 19] + random.sample(range(6, 17), per_day)
+            for hour in hours:
+                begins = midnight + timedelta(hours=hour)
+                rows.append({'title': 'Session', 'user_id': random.choice(member_ids), 'trainer_id': trainer_id,
+                             'scheduled_time': begins, 'duration_minutes': 60, 'ends_at': begins + timedelta(hours=1),
+                             'location': 'Main Gym', 'location_key': 'main gym', 'created_at': datetime.utcnow()})
+    for begin in range(0, len(rows), 5000):
+        db.session.execute(insert(Schedule), rows[begin:begin + 5000])
+    # Core inserts bypass the listener that keeps the calendars
+    trainer_calendar.rebuild(db.session.connection(), trainer_ids)
+    db.session.commit()
+
+
+def by_hand(window_start, window_end, minutes, limit):
+    """Every trainer's sessions from the ORM, then each 15-minute start in turn"""
+    sessions = {}
+    for entry in Schedule.query.filter(Schedule.scheduled_time >= window_start - timedelta(hours=4),
+                                       Schedule.scheduled_time < window_end).all():
+        sessions.setdefault(entry.trainer_id, []).append(entry)
+    trainer_ids = [trainer.id for trainer in Trainer.query.order_by(Trainer.id).all()]
+    found = []
+    slot = window_start
+    duration = timedelta(minutes=minutes)
+    while slot + duration <= window_end and len(found) < limit:
+        if 6 <= slot.hour and (slot + duration).time() <= datetime.min.replace(hour=22).time():
+            for trainer_id in trainer_ids:
+                if not any(entry.scheduled_time < slot + duration and entry.ends_at > slot
+                           for entry in sessions.get(trainer_id, ())):
+                    found.append((slot, trainer_id))
+        slot += timedelta(minutes=15)
+    return found[:limit]
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+        db.session.expunge_all()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure free-slot search time')
+    parser.add_argument('--trainers', type=int, default=200)
+    parser.add_argument('--per-day', type=int, default=4, help='random daytime sessions per trainer and day')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app({'REQUEST_DEBUG_LOGGING': False, 'QUERY_EXPLAIN_ENABLED': False})
+    if not init_database(app):
+        sys.exit(1)
+
+    start = (datetime.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=DAYS)
+    with app.app_context():
+        ensure_trainers(args.trainers, args.per_day, start)
+        sessions = db.session.execute(select(func.count()).select_from(Schedule)).scalar()
+        searches = [
+            ('free hour, anyone', {}),
+            ('free hour, Yoga', {'specialization': 'yoga'}),
+            ('evening hour', {'day_start': availability.parse_clock('18:00'),
+                              'day_end': availability.parse_clock('20:00')}),
+        ]
+        results = []
+        for label, options in searches:
+            result, seconds = timed(lambda: availability.search(start, end, 60, **options), args.repeat)
+            results.append((label, len(result['suggestions']), seconds))
+        found, seconds = timed(lambda: by_hand(start, end, 60, 20), 1)
+        results.append(('free hour, by hand (ORM)', len(found), seconds))
+
+    print(f"{args.trainers} trainers, {sessions} sessions over {DAYS} days")
+    print(f"{'search':<34}{'suggestions':>12}{'ms':>10}")
+    for label, suggestions, seconds in results:
+        print(f"{label:<34}{suggestions:>12}{seconds * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Cold start benchmark for the API process.
+
+Each run starts a fresh interpreter and measures:
+  - import:        importing app.py (models, blueprints, extensions)
+  - create_app:    building the Flask app via the factory
+  - migrate_seed:  create_app + seed.init_database (migration runner and demo
+                   accounts), the deploy step that used to run on every boot
+                   (the first run builds the database, later runs find it current)
+  - warm_up:       post-fork pool and cache warm-up
+  - first_request: latency of the first /api/auth/verify without and with warm-up
+
+Usage:
+    python benchmarks/boot_benchmark.py --runs 7
+    DATABASE_URL=mysql+pymysql://... python benchmarks/boot_benchmark.py
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PROBE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+app = app_module.create_app({'REQUEST_DEBUG_LOGGING': False})
+t2 = time.perf_counter()
+
+mode = sys.argv[1]
+result = {'import': (t1 - t0) * 1000, 'create_app': (t2 - t1) * 1000}
+
+if mode == 'setup':
+    from seed import init_database
+    init_database(app)
+    result['migrate_seed'] = (time.perf_counter() - t1) * 1000
+else:
+    from flask_jwt_extended import create_access_token
+    from models import User
+    with app.app_context():
+        user = User.query.filter_by(email='student@fitwell.com').first()
+        token = create_access_token(identity={'id': user.id, 'role': user.role})
+    if mode == 'warm':
+        t3 = time.perf_counter()
+        app_module.warm_up(app)
+        result['warm_up'] = (time.perf_counter() - t3) * 1000
+    client = app.test_client()
+    t4 = time.perf_counter()
+    client.get('/api/auth/verify', headers={'Authorization': 'Bearer ' + token})
+    result['first_request_' + mode] = (time.perf_counter() - t4) * 1000
+
+print(json.dumps(result))
+'''
+
+
+def run_probe(mode, env):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, mode],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time and cold start of the API')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('TRACING_ENABLED', 'false')
+    if 'DATABASE_URL' not in env:
+        env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'boot_benchmark.db')
+
+    # The setup runs also create the schema and demo accounts used by the request runs
+    samples = {}
+    for mode in ['setup', 'cold', 'warm']:
+        for _ in range(args.runs):
+            for key, value in run_probe(mode, env).items():
+                samples.setdefault(key, []).append(value)
+
+    print(f"{'phase':<22}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for key, values in samples.items():
+        print(f"{key:<22}{statistics.median(values):>12.1f}{min(values):>10.1f}{max(values):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Broadcast send time: one ORM object per recipient vs chunked multi-row inserts.
+
+Creates `--recipients` member accounts, then sends one notification to all of
+them twice:
+- `session.add(Notification(...))` per recipient and one commit, which is how
+  routes create notifications today;
+- services.notifications.broadcast, which writes NOTIFICATION_CHUNK_SIZE rows
+  per INSERT and commits per chunk.
+
+Usage:
+    python benchmarks/broadcast_benchmark.py --recipients 50000
+    DATABASE_URL=mysql+pymysql://... python benchmarks/broadcast_benchmark.py --chunk-size 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault('TRACING_ENABLED', 'false')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'broadcast_benchmark.db')
+
+from sqlalchemy import insert, select, func
+
+from app import create_app
+from models import db, User, Notification
+from seed import init_database
+from services import notifications
+
+BENCH_DOMAIN = '@broadcast.benchmark'
+
+
+def ensure_recipients(count):
+    existing = db.session.execute(
+        select(func.count()).select_from(User).where(User.email.like('%' + BENCH_DOMAIN))
+    ).scalar()
+    rows = [{'name': f'Member {i}', 'email': f'member{i}{BENCH_DOMAIN}', 'role': 'student', 'password_hash': '!'}
+            for i in range(existing, count)]
+    for start in range(0, len(rows), 5000):
+        db.session.execute(insert(User), rows[start:start + 5000])
+    db.session.commit()
+    return db.session.execute(
+        select(User.id).where(User.email.like('%' + BENCH_DOMAIN)).order_by(User.id).limit(count)
+    ).scalars().all()
+
+
+def orm_send(user_ids, title):
+    for user_id in user_ids:
+        db.session.add(Notification(user_id=user_id, title=title, message='Benchmark announcement', read=False))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure broadcast send time')
+    parser.add_argument('--recipients', type=int, default=50000)
+    parser.add_argument('--chunk-size', type=int, default=1000, help='NOTIFICATION_CHUNK_SIZE')
+    args = parser.parse_args()
+
+    app = create_app({'REQUEST_DEBUG_LOGGING': False, 'QUERY_EXPLAIN_ENABLED': False,
+                      'NOTIFICATION_CHUNK_SIZE': args.chunk_size})
+    if not init_database(app):
+        sys.exit(1)
+
+    with app.app_context():
+        user_ids = ensure_recipients(args.recipients)
+        sender = User.query.filter(User.role.in_(('staff', 'admin'))).first()
+
+        started = time.perf_counter()
+        orm_send(user_ids, 'ORM fan-out')
+        orm_s = time.perf_counter() - started
+
+        record = notifications.broadcast('Chunked fan-out', 'Benchmark announcement', 'segment',
+                                         sender.id, user_ids=user_ids)
+        chunked_s = record.duration_ms / 1000
+
+        sent = db.session.execute(
+            select(func.count()).select_from(Notification).where(Notification.title == 'Chunked fan-out')
+        ).scalar()
+        assert sent >= len(user_ids), sent
+
+    print(f"{'method':<28}{'recipients':>11}{'seconds':>10}{'rows/s':>11}")
+    print(f"{'ORM add per recipient':<28}{len(user_ids):>11}{orm_s:>10.2f}{len(user_ids) / orm_s:>11.0f}")
+    print(f"{f'chunked insert ({args.chunk_size}/chunk)':<28}{len(user_ids):>11}{chunked_s:>10.2f}"
+          f"{len(user_ids) / chunked_s:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Login vs refresh CPU benchmark.
+
+Measures the CPU time of a full POST /api/auth/login (password hash check)
+against POST /api/auth/refresh (JWT signature check plus one UPDATE/INSERT),
+then projects the CPU spent per hour when a given number of sessions renew
+by logging in again versus by refreshing.
+
+Usage:
+    python benchmarks/login_benchmark.py --requests 50 --renewals-per-hour 20000
+    DATABASE_URL=mysql+pymysql://... python benchmarks/login_benchmark.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault('TRACING_ENABLED', 'false')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'login_benchmark.db')
+
+from app import create_app
+from models import db, User
+from seed import init_database
+
+BENCH_EMAIL = 'login.benchmark@fitwell.com'
+BENCH_PASSWORD = 'benchmark-password'
+
+
+def ensure_user():
+    # Not a demo account: login() skips the hash check for those
+    user = User.query.filter_by(email=BENCH_EMAIL).first()
+    if not user:
+        user = User(name='Login Benchmark', email=BENCH_EMAIL, role='student')
+        user.set_password(BENCH_PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+
+def cpu_ms(fn, count):
+    """CPU milliseconds of each of `count` calls"""
+    samples = []
+    for _ in range(count):
+        started = time.process_time()
+        fn()
+        samples.append((time.process_time() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare login and token refresh CPU cost')
+    parser.add_argument('--requests', type=int, default=30, help='requests measured per endpoint')
+    parser.add_argument('--renewals-per-hour', type=int, default=20000, help='session renewals per hour at peak')
+    args = parser.parse_args()
+
+    app = create_app({'REQUEST_DEBUG_LOGGING': False, 'QUERY_EXPLAIN_ENABLED': False, 'RATE_LIMIT_ENABLED': False})
+    if not init_database(app):
+        sys.exit(1)
+    with app.app_context():
+        ensure_user()
+
+    client = app.test_client()
+    credentials = {'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}
+
+    def login():
+        response = client.post('/api/auth/login', json=credentials)
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()['refresh_token']
+
+    refresh_token = [login()]
+
+    def refresh():
+        response = client.post('/api/auth/refresh', headers={'Authorization': 'Bearer ' + refresh_token[0]})
+        assert response.status_code == 200, response.get_json()
+        refresh_token[0] = response.get_json()['refresh_token']
+
+    login_ms = statistics.median(cpu_ms(login, args.requests))
+    refresh_ms = statistics.median(cpu_ms(refresh, args.requests))
+
+    login_hour = login_ms * args.renewals_per_hour / 1000
+    refresh_hour = refresh_ms * args.renewals_per_hour / 1000
+
+    print(f"{'path':<10}{'CPU ms/request':>16}{'CPU s/hour':>14}")
+    print(f"{'login':<10}{login_ms:>16.2f}{login_hour:>14.1f}")
+    print(f"{'refresh':<10}{refresh_ms:>16.2f}{refresh_hour:>14.1f}")
+    print(f"\nAt {args.renewals_per_hour} renewals/hour refreshing saves {login_hour - refresh_hour:.1f} CPU s/hour "
+          f"({login_ms / max(refresh_ms, 0.001):.1f}x less CPU per renewal)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Membership expiry time: loading every profile through the ORM vs the batched sweep.
+
+Creates `--members` member accounts whose memberships ended yesterday, then
+expires them twice:
+- loading every active profile, setting membership_status and adding one
+  Notification per member, then one commit, which is how the old one-shot
+  status script worked;
+- services.memberships.expire_due, which reads MEMBERSHIP_SWEEP_BATCH_SIZE
+  due profiles from the (membership_status, membership_end, id) index and
+  commits one UPDATE plus one multi-row notification INSERT per batch.
+
+Usage:
+    python benchmarks/membership_sweep_benchmark.py --members 100000
+    DATABASE_URL=mysql+pymysql://... python benchmarks/membership_sweep_benchmark.py --batch-size 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault('TRACING_ENABLED', 'false')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'membership_sweep_benchmark.db')
+
+from sqlalchemy import insert, select, func
+
+from app import create_app
+from models import db, User, StudentProfile, Notification
+from seed import init_database
+from services import memberships
+
+BENCH_DOMAIN = '@sweep.benchmark'
+
+
+def ensure_members(count):
+    existing = db.session.execute(
+        select(func.count()).select_from(User).where(User.email.like('%' + BENCH_DOMAIN))
+    ).scalar()
+    rows = [{'name': f'Member {i}', 'email': f'member{i}{BENCH_DOMAIN}', 'role': 'student', 'password_hash': '!'}
+            for i in range(existing, count)]
+    for start in range(0, len(rows), 5000):
+        db.session.execute(insert(User), rows[start:start + 5000])
+    user_ids = db.session.execute(
+        select(User.id).where(User.email.like('%' + BENCH_DOMAIN)).order_by(User.id).limit(count)
+    ).scalars().all()
+    with_profile = set(db.session.execute(
+        select(StudentProfile.user_id).where(StudentProfile.user_id.in_(select(User.id).where(User.email.like('%' + BENCH_DOMAIN))))
+    ).scalars())
+    profiles = [{'user_id': user_id, 'membership_status': 'active'} for user_id in user_ids if user_id not in with_profile]
+    for start in range(0, len(profiles), 5000):
+        db.session.execute(insert(StudentProfile), profiles[start:start + 5000])
+    db.session.commit()
+    return user_ids
+
+
+def reset(user_ids, ended):
+    """Make every benchmark membership active again with the given end date"""
+    for start in range(0, len(user_ids), 5000):
+        db.session.execute(
+            StudentProfile.__table__.update()
+            .where(StudentProfile.user_id.in_(user_ids[start:start + 5000]))
+            .values(membership_status='active', membership_end=ended)
+        )
+    db.session.commit()
+
+
+def orm_expire(today):
+    profiles = StudentProfile.query.filter(StudentProfile.membership_status == 'active').all()
+    expired = 0
+    for profile in profiles:
+        if profile.membership_end and profile.membership_end < today:
+            profile.membership_status = 'expired'
+            db.session.add(Notification(user_id=profile.user_id, title=memberships.EXPIRED_TITLE,
+                                        message=memberships.EXPIRED_MESSAGE, read=False))
+            expired += 1
+    db.session.commit()
+    return expired
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure membership expiry time')
+    parser.add_argument('--members', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=1000, help='MEMBERSHIP_SWEEP_BATCH_SIZE')
+    parser.add_argument('--skip-orm', action='store_true', help='only time the batched sweep')
+    args = parser.parse_args()
+
+    app = create_app({'REQUEST_DEBUG_LOGGING': False, 'QUERY_EXPLAIN_ENABLED': False,
+                      'MEMBERSHIP_SWEEP_BATCH_SIZE': args.batch_size})
+    if not init_database(app):
+        sys.exit(1)
+
+    with app.app_context():
+        user_ids = ensure_members(args.members)
+        today = date.today()
+        results = []
+
+        if not args.skip_orm:
+            reset(user_ids, today - timedelta(days=1))
+            started = time.perf_counter()
+            expired = orm_expire(today)
+            results.append(('ORM load + commit once', expired, time.perf_counter() - started))
+
+        reset(user_ids, today - timedelta(days=1))
+        result = memberships.expire_due(today)
+        results.append((f'batched sweep ({args.batch_size}/batch)', result['expired'], result['seconds']))
+        assert memberships.due_count(today) == 0
+
+    print(f"{'method':<30}{'expired':>9}{'seconds':>10}{'rows/s':>11}")
+    for method, expired, seconds in results:
+        print(f"{method:<30}{expired:>9}{seconds:>10.2f}{expired / seconds:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Login throughput at different password hash costs.
+
+For each PASSWORD_HASH_METHOD the benchmark stores a password hashed with
+that method, fires a burst of concurrent POST /api/auth/login requests and
+reports logins per second, login latency, requests refused with 503 by the
+hashing queue limit, and the latency of /api/auth/ping served by the same
+process during the burst.
+
+Usage:
+    python benchmarks/password_benchmark.py --requests 40 --concurrency 8
+    python benchmarks/password_benchmark.py --methods pbkdf2:sha256:600000,scrypt:32768:8:1 --executor process
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault('TRACING_ENABLED', 'false')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'password_benchmark.db')
+
+from app import create_app
+from models import db, User
+from seed import init_database
+
+BENCH_EMAIL = 'password.benchmark@fitwell.com'
+BENCH_PASSWORD = 'benchmark-password'
+DEFAULT_METHODS = 'pbkdf2:sha256:100000,pbkdf2:sha256:300000,pbkdf2:sha256:600000,scrypt:32768:8:1'
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)] if ordered else 0.0
+
+
+def run_method(method, args):
+    app = create_app({
+        'REQUEST_DEBUG_LOGGING': False,
+        'QUERY_EXPLAIN_ENABLED': False,
+        'RATE_LIMIT_ENABLED': False,
+        'PASSWORD_HASH_METHOD': method,
+        'PASSWORD_HASH_EXECUTOR': args.executor,
+        'PASSWORD_HASH_WORKERS': args.workers,
+        'PASSWORD_HASH_QUEUE_LIMIT': args.queue_limit
+    })
+    with app.app_context():
+        user = User.query.filter_by(email=BENCH_EMAIL).first()
+        if not user:
+            user = User(name='Password Benchmark', email=BENCH_EMAIL, role='student')
+            db.session.add(user)
+        user.set_password(BENCH_PASSWORD)
+        db.session.commit()
+
+    latencies, refused = [], []
+    ping_latencies = []
+    done = threading.Event()
+
+    def login(_):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post('/api/auth/login', json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code == 503:
+            refused.append(elapsed)
+        else:
+            assert response.status_code == 200, response.get_json()
+            latencies.append(elapsed)
+
+    def ping():
+        client = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get('/api/auth/ping')
+            ping_latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    pinger = threading.Thread(target=ping)
+    pinger.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(login, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    pinger.join()
+
+    return {
+        'method': method,
+        'logins_per_s': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) if latencies else 0.0,
+        'p95_ms': percentile(latencies, 95),
+        'refused': len(refused),
+        'ping_p95_ms': percentile(ping_latencies, 95)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput per password hash cost')
+    parser.add_argument('--methods', default=DEFAULT_METHODS, help='comma separated PASSWORD_HASH_METHOD values')
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent login clients')
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_HASH_WORKERS')
+    parser.add_argument('--queue-limit', type=int, default=32, help='PASSWORD_HASH_QUEUE_LIMIT')
+    args = parser.parse_args()
+
+    if not init_database(create_app({'REQUEST_DEBUG_LOGGING': False})):
+        sys.exit(1)
+
+    results = [run_method(method, args) for method in args.methods.split(',')]
+
+    print(f"\n{'method':<26}{'logins/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'503s':>7}{'ping p95 ms':>13}")
+    for r in results:
+        print(f"{r['method']:<26}{r['logins_per_s']:>10.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+              f"{r['refused']:>7}{r['ping_p95_ms']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Schedule conflict check time for a trainer with thousands of sessions.
+
+Books `--sessions` back-to-back sessions for one trainer (spread over
+`--members` members), then checks proposals against them two ways:
+- loading every session of the trainer and the member through the ORM and
+  comparing each proposal with each of them, which is what a check without
+  an index or an end time has to do;
+- services.schedule_conflicts.find, which range-scans the
+  (party, scheduled_time) indexes over [start - max duration, end) and checks
+  the batch against an in-memory IntervalIndex per party.
+Both are timed for one proposal (averaged over --repeat) and for a bulk batch
+of --batch proposals, half of them overlapping, and must agree on what
+conflicts.
+
+Usage:
+    python benchmarks/schedule_conflict_benchmark.py --sessions 5000
+    DATABASE_URL=mysql+pymysql://... python benchmarks/schedule_conflict_benchmark.py --batch 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault('TRACING_ENABLED', 'false')
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'schedule_conflict_benchmark.db')
+
+from sqlalchemy import insert, select, func
+
+from app import create_app
+from models import db, User, Trainer, Schedule
+from seed import init_database
+from services import schedule_conflicts
+
+BENCH_DOMAIN = '@conflicts.benchmark'
+START = datetime(2030, 1, 7, 6, 0)
+
+
+def ensure_sessions(count, members):
+    """One trainer with `count` 60-minute sessions, one every 90 minutes, 06:00 to 21:00"""
+    trainer_email = 'trainer' + BENCH_DOMAIN
+    if not User.query.filter_by(email=trainer_email).first():
+        db.session.execute(insert(User), [{'name': 'Bench Trainer', 'email': trainer_email, 'role': 'trainer',
+                                           'password_hash': '!'}] +
+                           [{'name': f'Member {i}', 'email': f'member{i}{BENCH_DOMAIN}', 'role': 'student',
+                             'password_hash': '!'} for i in range(members)])
+    trainer_user = User.query.filter_by(email=trainer_email).first()
+    trainer = Trainer.query.filter_by(user_id=trainer_user.id).first()
+    if not trainer:
+        trainer = Trainer(user_id=trainer_user.id, specialization='General Training', experience_years=1, bio='')
+        db.session.add(trainer)
+        db.session.flush()
+    member_ids = db.session.execute(
+        select(User.id).where(User.email.like('member%' + BENCH_DOMAIN)).order_by(User.id)
+    ).scalars().all()
+
+    existing = db.session.execute(
+        select(func.count()).select_from(Schedule).where(Schedule.trainer_id == trainer.id)
+    ).scalar()
+    rows = []
+    for i in range(existing, count):
+        start = slot(i)
+        rows.append({'title': f'Session {i}', 'user_id': member_ids[i % len(member_ids)], 'trainer_id': trainer.id,
+                     'scheduled_time': start, 'duration_minutes': 60, 'ends_at': start + timedelta(minutes=60),
+                     'location': 'Main Gym', 'location_key': 'main gym', 'created_at': datetime.utcnow()})
+    for begin in range(0, len(rows), 5000):
+        db.session.execute(insert(Schedule), rows[begin:begin + 5000])
+    db.session.commit()
+    return trainer.id, member_ids
+
+
+def slot(i):
+    day, position = divmod(i, 10)
+    return START + timedelta(days=day, minutes=90 * position)
+
+
+def proposals(trainer_id, member_ids, count, sessions):
+    """Every other proposal starts 30 minutes into a booked session, the rest in the gap after one"""
+    result = []
+    for n in range(count):
+        i = (n * 7919) % sessions
+        offset = 30 if n % 2 == 0 else 60
+        result.append({'scheduled_time': slot(i) + timedelta(minutes=offset), 'duration_minutes': 30,
+                       'trainer_id': trainer_id, 'user_id': member_ids[(n * 31) % len(member_ids)],
+                       'location': 'Main Gym'})
+    return result
+
+
+def naive_find(sessions):
+    """Load the parties' sessions, compare each proposal with each of them and with the batch"""
+    trainer_ids = {session['trainer_id'] for session in sessions}
+    user_ids = {session['user_id'] for session in sessions}
+    stored = Schedule.query.filter((Schedule.trainer_id.in_(trainer_ids)) | (Schedule.user_id.in_(user_ids))).all()
+    conflicted = set()
+    for position, session in enumerate(sessions):
+        start = session['scheduled_time']
+        end = start + timedelta(minutes=session['duration_minutes'])
+        for other in stored:
+            other_end = other.scheduled_time + timedelta(minutes=other.duration_minutes)
+            if other.scheduled_time < end and other_end > start and (
+                    other.trainer_id == session['trainer_id'] or other.user_id == session['user_id']):
+                conflicted.add(position)
+        for earlier in sessions[:position]:
+            earlier_end = earlier['scheduled_time'] + timedelta(minutes=earlier['duration_minutes'])
+            if earlier['scheduled_time'] < end and earlier_end > start and (
+                    earlier['trainer_id'] == session['trainer_id'] or earlier['user_id'] == session['user_id']):
+                conflicted.add(position)
+    return conflicted
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+        db.session.expunge_all()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure schedule conflict check time')
+    parser.add_argument('--sessions', type=int, default=5000, help="sessions already booked for the trainer")
+    parser.add_argument('--members', type=int, default=50)
+    parser.add_argument('--batch', type=int, default=500, help='proposals in the bulk check')
+    parser.add_argument('--repeat', type=int, default=20, help='runs averaged for the single check')
+    args = parser.parse_args()
+
+    app = create_app({'REQUEST_DEBUG_LOGGING': False, 'QUERY_EXPLAIN_ENABLED': False,
+                      'SCHEDULE_BULK_MAX': max(args.batch, 1)})
+    if not init_database(app):
+        sys.exit(1)
+
+    with app.app_context():
+        trainer_id, member_ids = ensure_sessions(args.sessions, args.members)
+        single = proposals(trainer_id, member_ids, 1, args.sessions)
+        batch = proposals(trainer_id, member_ids, args.batch, args.sessions)
+
+        indexed = lambda sessions: {conflict['index'] for conflict in schedule_conflicts.find(sessions)}
+        results = []
+        for label, sessions, repeat in (('single', single, args.repeat), (f'bulk of {args.batch}', batch, 1)):
+            expected, naive_seconds = timed(lambda: naive_find(sessions), repeat)
+            found, indexed_seconds = timed(lambda: indexed(sessions), repeat)
+            assert found == expected, (label, sorted(found ^ expected)[:10])
+            results.append((f'{label}: load all + compare', len(found), naive_seconds))
+            results.append((f'{label}: indexed range scan', len(found), indexed_seconds))
+
+    print(f"{args.sessions} sessions booked for one trainer")
+    print(f"{'method':<36}{'conflicts':>10}{'ms':>10}")
+    for method, conflicts, seconds in results:
+        print(f"{method:<36}{conflicts:>10}{seconds * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
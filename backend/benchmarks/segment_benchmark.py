@@ -0,0 +1,91 @@
+"""
+Segment evaluation: RoaringBitmap index vs Python sets vs a loop over members.
+
+Builds `--members` synthetic members with a membership status, department,
+diet plan flag and last visit, then evaluates
+"active members who have not attended in 14 days and have no diet plan"
+(plus a wider OR segment) three ways:
+- RoaringBitmaps, as services/segments.py does;
+- the same index as Python sets;
+- a loop over member records, as the routes would without an index.
+
+Usage:
+    python benchmarks/segment_benchmark.py --members 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.roaring_bitmap import RoaringBitmap
+
+STATUSES = ('active', 'active', 'active', 'expired', 'pending')
+DEPARTMENTS = ('CS', 'EE', 'ME', 'Civil', None)
+
+
+def per_call_us(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark member segment evaluation')
+    parser.add_argument('--members', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    members = [{
+        'id': member_id,
+        'status': rng.choice(STATUSES),
+        'department': rng.choice(DEPARTMENTS),
+        'diet': rng.random() < 0.3,
+        'days_since_visit': rng.randint(0, 60)
+    } for member_id in range(1, args.members + 1)]
+
+    def ids(predicate):
+        return [m['id'] for m in members if predicate(m)]
+
+    index_ids = {
+        'all': ids(lambda m: True),
+        'active': ids(lambda m: m['status'] == 'active'),
+        'pending': ids(lambda m: m['status'] == 'pending'),
+        'cs': ids(lambda m: m['department'] == 'CS'),
+        'diet': ids(lambda m: m['diet']),
+        'recent': ids(lambda m: m['days_since_visit'] < 14)
+    }
+    started = time.perf_counter()
+    roaring = {name: RoaringBitmap(values) for name, values in index_ids.items()}
+    build_ms = (time.perf_counter() - started) * 1000
+    sets = {name: set(values) for name, values in index_ids.items()}
+
+    segments = {
+        'lapsed, no diet': (
+            lambda i: (i['active'] - i['recent']) - i['diet'],
+            lambda m: m['status'] == 'active' and m['days_since_visit'] >= 14 and not m['diet']
+        ),
+        'CS or pending, recent': (
+            lambda i: (i['cs'] | i['pending']) & i['recent'],
+            lambda m: (m['department'] == 'CS' or m['status'] == 'pending') and m['days_since_visit'] < 14
+        )
+    }
+
+    print(f"{args.members} members, roaring index built in {build_ms:.0f} ms\n")
+    print(f"{'segment':<24}{'members':>9}{'roaring us':>12}{'sets us':>10}{'loop us':>11}")
+    for name, (combine, predicate) in segments.items():
+        roaring_us, roaring_result = per_call_us(lambda: combine(roaring), args.repeat)
+        sets_us, sets_result = per_call_us(lambda: combine(sets), max(args.repeat // 10, 1))
+        loop_us, loop_result = per_call_us(lambda: ids(predicate), max(args.repeat // 100, 1))
+        assert list(roaring_result) == sorted(sets_result) == loop_result, name
+        print(f"{name:<24}{len(roaring_result):>9}{roaring_us:>12.1f}{sets_us:>10.0f}{loop_us:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
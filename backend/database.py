@@ -1,12 +1,4 @@
-
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import event
-
-db = SQLAlchemy()
-
-# Add event listeners for database initialization
-# @event.listens_for(db.engine, 'connect')
-# def set_sqlite_pragma(dbapi_connection, connection_record):
-#     cursor = dbapi_connection.cursor()
-#     cursor.execute("PRAGMA foreign_keys=ON")
-#     cursor.close()
+# The SQLAlchemy instance lives in models.py, which every model is bound to.
+# This module re-exports it so older scripts importing `database.db` get the
+# same instance rather than an unbound copy.
+from models import db
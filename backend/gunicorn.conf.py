@@ -0,0 +1,47 @@
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+threads = int(os.getenv('GUNICORN_THREADS', 2))
+# Notification streams are only served by gevent workers, so that is the default while they are on
+sse_enabled = os.getenv('SSE_ENABLED', 'true').lower() == 'true'
+worker_class = os.getenv('GUNICORN_WORKER_CLASS') or (
+    'gevent' if sse_enabled else 'gthread' if threads > 1 else 'sync'
+)
+# The in-process event broker only reaches its own worker, so streams with it need a single worker
+single_worker = worker_class == 'gevent' and sse_enabled and not os.getenv('EVENT_BROKER_URL')
+workers = int(os.getenv('GUNICORN_WORKERS', 1 if single_worker else multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+
+if worker_class == 'gevent':
+    # Event-driven workers for notification streams: each connection is a
+    # greenlet, so thousands of idle streams cost no threads. Needs `gevent`.
+    # Patch before the app is imported (preload_app) so its locks, queues and
+    # DB sockets are cooperative.
+    from gevent import monkey
+    monkey.patch_all()
+
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 2000))
+
+# Recycle workers periodically to bound memory growth, with jitter so they do not restart together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+# Import the app once in the master; workers inherit it on fork
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared between processes
+    from app import warm_up
+    from services import notification_stream
+    from wsgi import app
+
+    warm_up(app)
+    # Streams are only offered where they cannot tie up the worker's threads or miss events
+    notification_stream.set_server(server.cfg.worker_class_str, server.cfg.workers)
+    server.log.info(f"Worker {worker.pid} warmed up")
@@ -0,0 +1,58 @@
+"""
+Rebuild the attendance_daily rollup from the attendance table.
+
+Needed after attendance rows were written or edited outside the ORM (raw SQL,
+bulk imports), which the rollup listener does not see. Each chunk of days is
+rebuilt in its own transaction.
+
+Usage:
+    python jobs/backfill_attendance_daily.py                        # every day with attendance
+    python jobs/backfill_attendance_daily.py --start 2024-01-01 --end 2024-03-31
+    python jobs/backfill_attendance_daily.py --days 7               # the last week, e.g. nightly from cron
+"""
+import argparse
+import os
+import sys
+import traceback
+from datetime import datetime, timedelta
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from models import db
+from services.attendance_rollup import backfill
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild the daily attendance rollup')
+    parser.add_argument('--start', type=parse_date, help='first day to rebuild (YYYY-MM-DD)')
+    parser.add_argument('--end', type=parse_date, help='last day to rebuild (YYYY-MM-DD)')
+    parser.add_argument('--days', type=int, help='rebuild the last N days up to today')
+    parser.add_argument('--chunk-days', type=int, default=31, help='days rebuilt per transaction')
+    args = parser.parse_args(argv)
+
+    start, end = args.start, args.end
+    if args.days:
+        end = datetime.now().date()
+        start = end - timedelta(days=args.days - 1)
+
+    app = create_app({'QUERY_EXPLAIN_ENABLED': False, 'TRACING_ENABLED': False, 'REQUEST_DEBUG_LOGGING': False})
+    with app.app_context():
+        try:
+            rows = backfill(db.engine, start, end, args.chunk_days)
+        except Exception as e:
+            print(f"Attendance rollup backfill failed: {str(e)}")
+            traceback.print_exc()
+            return False
+    print(f"Wrote {rows} attendance_daily rows")
+    return True
+
+
+if __name__ == "__main__":
+    if main() is False:
+        sys.exit(1)
@@ -0,0 +1,158 @@
+"""
+Outbox delivery worker.
+
+Drains outbox_message in batches: claims up to --batch-size due messages,
+sends them over a pool of --connections open SMTP connections (one sending
+thread per connection) and records every result in one short transaction;
+see services/outbox.py for the retry rules. Prints throughput per batch and
+in total. SIGTERM or Ctrl-C stops after the current batch.
+
+For local testing, run a debugging SMTP server that prints every message:
+    python -m aiosmtpd -n -l localhost:1025
+
+Usage:
+    python jobs/deliver_outbox.py
+    python jobs/deliver_outbox.py --batch-size 200 --connections 8
+    python jobs/deliver_outbox.py --once            # send what is due now, then exit
+"""
+import argparse
+import os
+import signal
+import smtplib
+import socket
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from models import db
+from services import outbox
+from utils.smtp_pool import SMTPPool
+
+
+class Metrics:
+    """Running totals of one worker, printed after every batch"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.batches = self.sent = self.retrying = self.failed = 0
+        self.send_seconds = 0.0
+
+    def add(self, sent, retrying, failed, seconds):
+        self.batches += 1
+        self.sent += sent
+        self.retrying += retrying
+        self.failed += failed
+        self.send_seconds += seconds
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.sent / self.send_seconds if self.send_seconds else 0.0
+        return (f"{self.sent} sent, {self.retrying} retrying, {self.failed} failed in {self.batches} batches; "
+                f"{rate:.0f} msg/s while sending, {elapsed:.0f}s up")
+
+
+def _permanent(error):
+    # 5xx replies (unknown mailbox, rejected content) will not succeed on a retry
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class DeliveryWorker:
+    def __init__(self, app, pool, batch_size, connections, poll_seconds):
+        self.app = app
+        self.pool = pool
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.senders = ThreadPoolExecutor(max_workers=connections, thread_name_prefix='smtp')
+        self.metrics = Metrics()
+        self.stopping = False
+        self.requeue_every = float(app.config.get('OUTBOX_LEASE_SECONDS', 300)) / 2
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def send(self, message):
+        message_id, recipient, subject, body = message
+        try:
+            self.pool.send(outbox.build_email(recipient, subject, body))
+            return message_id, None
+        except Exception as e:
+            return message_id, e
+
+    def deliver_batch(self):
+        """Claim, send and record one batch. Returns the number of messages claimed."""
+        batch = outbox.claim(self.batch_size, self.worker_id)
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        results = list(self.senders.map(self.send, batch))
+        seconds = time.perf_counter() - started
+
+        sent_ids = [message_id for message_id, error in results if error is None]
+        failures = [(message_id, f"{type(error).__name__}: {error}", _permanent(error))
+                    for message_id, error in results if error is not None]
+        retrying, failed = outbox.record(self.worker_id, sent_ids, failures)
+        self.metrics.add(len(sent_ids), retrying, failed, seconds)
+        print(f"Batch of {len(batch)}: {len(sent_ids)} sent, {retrying} retrying, {failed} failed "
+              f"in {seconds:.2f}s ({len(sent_ids) / seconds if seconds else 0:.0f} msg/s) | {self.metrics.summary()}")
+        return len(batch)
+
+    def run(self, once=False):
+        last_requeue = 0.0
+        while not self.stopping:
+            try:
+                if time.monotonic() - last_requeue >= self.requeue_every:
+                    requeued = outbox.requeue_stale()
+                    if requeued:
+                        print(f"Requeued {requeued} messages of an unresponsive worker")
+                    last_requeue = time.monotonic()
+                claimed = self.deliver_batch()
+                if not claimed:
+                    if once:
+                        break
+                    time.sleep(self.poll_seconds)
+            except Exception as e:
+                # e.g. the database went away; claimed messages are requeued once their lease expires
+                db.session.rollback()
+                print(f"Delivery loop error: {str(e)}")
+                traceback.print_exc()
+                time.sleep(self.poll_seconds)
+        self.senders.shutdown()
+        self.pool.close()
+        print(f"Stopped: {self.metrics.summary()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Send queued outbox emails over pooled SMTP connections')
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('OUTBOX_BATCH_SIZE', 100)),
+                        help='messages claimed and recorded per transaction')
+    parser.add_argument('--connections', type=int, default=int(os.getenv('SMTP_POOL_SIZE', 4)),
+                        help='open SMTP connections, each with its own sending thread')
+    parser.add_argument('--poll-seconds', type=float, default=float(os.getenv('OUTBOX_POLL_SECONDS', 2)),
+                        help='how often to look for due messages when idle')
+    parser.add_argument('--once', action='store_true', help='exit when nothing is due')
+    args = parser.parse_args(argv)
+
+    app = create_app({'QUERY_EXPLAIN_ENABLED': False, 'TRACING_ENABLED': False, 'REQUEST_DEBUG_LOGGING': False})
+    pool = SMTPPool(app.config['SMTP_HOST'], app.config['SMTP_PORT'], app.config['SMTP_USERNAME'],
+                    app.config['SMTP_PASSWORD'], app.config['SMTP_USE_TLS'], size=max(args.connections, 1),
+                    timeout=app.config['SMTP_TIMEOUT'])
+    with app.app_context():
+        worker = DeliveryWorker(app, pool, max(args.batch_size, 1), max(args.connections, 1), args.poll_seconds)
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        print(f"Delivery worker {worker.worker_id}: {args.connections} SMTP connections to "
+              f"{app.config['SMTP_HOST']}:{app.config['SMTP_PORT']}, batches of {args.batch_size}")
+        worker.run(args.once)
+        db.session.remove()
+
+
+if __name__ == "__main__":
+    main()
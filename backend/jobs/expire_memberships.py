@@ -0,0 +1,65 @@
+"""
+Periodic membership expiry sweep.
+
+Moves active memberships whose membership_end has passed to 'expired' and
+notifies their members, in short batches read from the
+(membership_status, membership_end, id) index; see services/memberships.py.
+
+Usage:
+    python jobs/expire_memberships.py              # one pass, e.g. daily from cron
+    python jobs/expire_memberships.py --interval 3600
+    python jobs/expire_memberships.py --batch-size 2000 --throttle-ms 20
+    python jobs/expire_memberships.py --dry-run    # count the due memberships only
+"""
+import argparse
+import os
+import sys
+import time
+import traceback
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from models import db
+from services import memberships
+
+
+def run_once(batch_size=None, throttle_ms=0, dry_run=False):
+    try:
+        if dry_run:
+            print(f"{memberships.due_count()} memberships are due to expire")
+            db.session.commit()
+            return True
+        result = memberships.expire_due(batch_size=batch_size, throttle_ms=throttle_ms)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Membership expiry failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+    print(f"Expired {result['expired']} memberships in {result['batches']} batches ({result['seconds']}s)")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Expire memberships past their end date and notify the members')
+    parser.add_argument('--interval', type=int, help='repeat every N seconds instead of running once')
+    parser.add_argument('--batch-size', type=int, help='memberships per transaction (default MEMBERSHIP_SWEEP_BATCH_SIZE)')
+    parser.add_argument('--throttle-ms', type=int, default=0, help='pause between batches')
+    parser.add_argument('--dry-run', action='store_true', help='count the due memberships without expiring them')
+    args = parser.parse_args(argv)
+
+    app = create_app({'QUERY_EXPLAIN_ENABLED': False, 'TRACING_ENABLED': False, 'REQUEST_DEBUG_LOGGING': False})
+    with app.app_context():
+        while True:
+            ok = run_once(args.batch_size, args.throttle_ms, args.dry_run)
+            db.session.remove()
+            if not args.interval:
+                return ok
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    if main() is False:
+        sys.exit(1)
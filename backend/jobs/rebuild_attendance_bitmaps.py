@@ -0,0 +1,55 @@
+"""
+Rebuild attendance_bitmap rows from the attendance table.
+
+Writes through the ORM keep the bitmaps current; this is for attendance
+imported or edited with raw SQL. Profiles are rebuilt in chunks, one
+transaction each.
+
+Usage:
+    python jobs/rebuild_attendance_bitmaps.py
+    python jobs/rebuild_attendance_bitmaps.py --profiles 12,40,41
+"""
+import argparse
+import os
+import sys
+import traceback
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select
+
+from app import create_app
+from models import db, StudentProfile
+from services import attendance_bitmap
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild the attendance day bitmaps')
+    parser.add_argument('--profiles', help='comma separated student_profile ids (default: all)')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='profiles per transaction')
+    args = parser.parse_args(argv)
+
+    app = create_app({'QUERY_EXPLAIN_ENABLED': False, 'TRACING_ENABLED': False, 'REQUEST_DEBUG_LOGGING': False})
+    with app.app_context():
+        try:
+            if args.profiles:
+                ids = [int(profile_id) for profile_id in args.profiles.split(',')]
+            else:
+                with db.engine.connect() as conn:
+                    ids = conn.execute(select(StudentProfile.id).order_by(StudentProfile.id)).scalars().all()
+            written = 0
+            for start in range(0, len(ids), args.chunk_size):
+                with db.engine.begin() as conn:
+                    written += attendance_bitmap.rebuild(conn, ids[start:start + args.chunk_size])
+        except Exception as e:
+            print(f"Attendance bitmap rebuild failed: {str(e)}")
+            traceback.print_exc()
+            return False
+    print(f"Rebuilt {written} attendance bitmaps from {len(ids)} profiles")
+    return True
+
+
+if __name__ == "__main__":
+    if main() is False:
+        sys.exit(1)
@@ -0,0 +1,55 @@
+"""
+Rebuild trainer_calendar rows from the schedule table.
+
+Writes through the ORM keep the calendars current; this is for sessions
+imported or edited with raw SQL. Trainers are rebuilt in chunks, one
+transaction each.
+
+Usage:
+    python jobs/rebuild_trainer_calendars.py
+    python jobs/rebuild_trainer_calendars.py --trainers 3,7
+"""
+import argparse
+import os
+import sys
+import traceback
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select
+
+from app import create_app
+from models import db, Trainer
+from services import trainer_calendar
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild the trainer calendar bitmaps')
+    parser.add_argument('--trainers', help='comma separated trainer ids (default: all)')
+    parser.add_argument('--chunk-size', type=int, default=100, help='trainers per transaction')
+    args = parser.parse_args(argv)
+
+    app = create_app({'QUERY_EXPLAIN_ENABLED': False, 'TRACING_ENABLED': False, 'REQUEST_DEBUG_LOGGING': False})
+    with app.app_context():
+        try:
+            if args.trainers:
+                ids = [int(trainer_id) for trainer_id in args.trainers.split(',')]
+            else:
+                with db.engine.connect() as conn:
+                    ids = conn.execute(select(Trainer.id).order_by(Trainer.id)).scalars().all()
+            written = 0
+            for start in range(0, len(ids), args.chunk_size):
+                with db.engine.begin() as conn:
+                    written += trainer_calendar.rebuild(conn, ids[start:start + args.chunk_size])
+        except Exception as e:
+            print(f"Trainer calendar rebuild failed: {str(e)}")
+            traceback.print_exc()
+            return False
+    print(f"Rebuilt {written} trainer calendar months from {len(ids)} trainers")
+    return True
+
+
+if __name__ == "__main__":
+    if main() is False:
+        sys.exit(1)
@@ -0,0 +1,67 @@
+"""
+Periodic reconciliation of the stat_counter and notification_counter tables.
+
+Recounts users by role, equipment, membership statuses and each user's unread
+notifications, and corrects any counter that drifted, e.g. after a bulk
+update that bypassed the ORM.
+
+Usage:
+    python jobs/reconcile_counters.py              # one pass, e.g. from cron
+    python jobs/reconcile_counters.py --interval 300
+    python jobs/reconcile_counters.py --dry-run
+"""
+import argparse
+import os
+import sys
+import time
+import traceback
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from models import db
+from services.counters import reconcile
+from services import unread_counters
+
+
+def run_once(fix=True):
+    try:
+        drift = reconcile(db.session.connection(), fix=fix)
+        db.session.commit()
+        unread_drift = unread_counters.reconcile(db.session.connection(), fix=fix)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Counter reconciliation failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+    if not drift and not unread_drift:
+        print("All counters match")
+    for name, (stored, actual) in sorted(drift.items()):
+        print(f"{name}: stored {stored}, actual {actual}{'' if fix else ' (not fixed)'}")
+    for user_id, (stored, actual) in sorted(unread_drift.items()):
+        print(f"unread.{user_id}: stored {stored}, actual {actual}{'' if fix else ' (not fixed)'}")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Recount the admin dashboard and unread notification counters and fix drift')
+    parser.add_argument('--interval', type=int, help='repeat every N seconds instead of running once')
+    parser.add_argument('--dry-run', action='store_true', help='report drift without fixing it')
+    args = parser.parse_args(argv)
+
+    app = create_app({'QUERY_EXPLAIN_ENABLED': False, 'TRACING_ENABLED': False, 'REQUEST_DEBUG_LOGGING': False})
+    with app.app_context():
+        while True:
+            ok = run_once(not args.dry_run)
+            db.session.remove()
+            if not args.interval:
+                return ok
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    if main() is False:
+        sys.exit(1)
@@ -0,0 +1,89 @@
+"""
+Daily upkeep of the member_summary table.
+
+Moves every member's 30-day visit window forward and replaces next sessions
+that have already started. Writes keep everything else current; --rebuild
+recomputes all summaries from scratch, e.g. after attendance was imported with
+raw SQL.
+
+Usage:
+    python jobs/refresh_member_summaries.py              # once, e.g. nightly from cron
+    python jobs/refresh_member_summaries.py --interval 3600
+    python jobs/refresh_member_summaries.py --rebuild
+"""
+import argparse
+import os
+import sys
+import time
+import traceback
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select
+
+from app import create_app
+from models import db, StudentProfile
+from services import member_summary
+
+
+def profile_chunks(chunk_size):
+    """(lower, upper] student_profile id ranges of about chunk_size rows"""
+    with db.engine.connect() as conn:
+        ids = conn.execute(select(StudentProfile.id).order_by(StudentProfile.id)).scalars().all()
+    lower = 0
+    for start in range(0, len(ids), chunk_size):
+        upper = ids[min(start + chunk_size, len(ids)) - 1]
+        yield lower, upper, ids[start:start + chunk_size]
+        lower = upper
+
+
+def run_once(rebuild=False, chunk_size=1000):
+    try:
+        rolled = rebuilt = 0
+        for lower, upper, ids in profile_chunks(chunk_size):
+            # One short transaction per chunk so writers are never blocked for long
+            with db.engine.begin() as conn:
+                if rebuild:
+                    rebuilt += member_summary.rebuild(conn, ids)
+                else:
+                    rolled += member_summary.roll_window(conn, lower, upper)
+
+        advanced = 0
+        while not rebuild:
+            with db.engine.begin() as conn:
+                count = member_summary.refresh_next_sessions(conn, chunk_size)
+            advanced += count
+            if count < chunk_size:
+                break
+    except Exception as e:
+        print(f"Member summary refresh failed: {str(e)}")
+        traceback.print_exc()
+        return False
+
+    if rebuild:
+        print(f"Rebuilt {rebuilt} member summaries")
+    else:
+        print(f"Moved the 30-day window of {rolled} members, advanced the next session of {advanced} users")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Keep member_summary rows current')
+    parser.add_argument('--interval', type=int, help='repeat every N seconds instead of running once')
+    parser.add_argument('--rebuild', action='store_true', help='recompute every summary from the source tables')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='profiles per transaction')
+    args = parser.parse_args(argv)
+
+    app = create_app({'QUERY_EXPLAIN_ENABLED': False, 'TRACING_ENABLED': False, 'REQUEST_DEBUG_LOGGING': False})
+    with app.app_context():
+        while True:
+            ok = run_once(args.rebuild, args.chunk_size)
+            if not args.interval:
+                return ok
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    if main() is False:
+        sys.exit(1)
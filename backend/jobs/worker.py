@@ -0,0 +1,160 @@
+"""
+Background job worker.
+
+Claims queued jobs from the job table in priority order and runs them: most
+kinds on a thread pool, CPU-bound kinds (executor='process' in
+services/job_handlers.py) on a process pool, so the gunicorn workers only
+queue the work and keep serving requests. Failed attempts are retried with
+backoff by services/job_queue.py. SIGTERM or Ctrl-C stops claiming and waits
+for the running jobs.
+
+Usage:
+    python jobs/worker.py
+    python jobs/worker.py --threads 8 --processes 2
+    python jobs/worker.py --once            # run what is runnable now, then exit
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from models import db
+from services import job_queue
+from services.job_queue import JobFailed
+
+APP_CONFIG = {'QUERY_EXPLAIN_ENABLED': False, 'TRACING_ENABLED': False, 'REQUEST_DEBUG_LOGGING': False}
+
+# Set in each pool process by its initializer
+_process_app = None
+
+
+def init_process():
+    global _process_app
+    # Ctrl-C reaches the whole process group; the parent decides when pool processes stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _process_app = create_app(APP_CONFIG)
+
+
+def run_in_process(kind, payload, job_id):
+    return job_queue.execute(_process_app, kind, payload, job_id)
+
+
+class Worker:
+    def __init__(self, app, threads, processes, poll_seconds):
+        self.app = app
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_seconds = poll_seconds
+        self.capacity = {'thread': threads, 'process': processes if job_queue.kinds('process') else 0}
+        self.pools = {'thread': ThreadPoolExecutor(max_workers=threads, thread_name_prefix='job')}
+        if self.capacity['process']:
+            # Spawned, not forked: a fork while pool threads hold logging or
+            # connection pool locks can leave the child blocked forever
+            self.pools['process'] = ProcessPoolExecutor(max_workers=processes, initializer=init_process,
+                                                        mp_context=multiprocessing.get_context('spawn'))
+        self.running = {}
+        self.stopping = False
+        lease = float(app.config.get('JOB_LEASE_SECONDS', 300))
+        self.heartbeat_every = lease / 3
+        self.expiry_every = lease / 2
+
+    def stop(self, *args):
+        if not self.stopping:
+            print(f"Stopping after {len(self.running)} running jobs")
+        self.stopping = True
+
+    def claim(self):
+        claimed = 0
+        for executor, pool in self.pools.items():
+            busy = sum(1 for _, _, job_executor in self.running.values() if job_executor == executor)
+            for job_id, kind, payload in job_queue.claim(job_queue.kinds(executor), self.capacity[executor] - busy,
+                                                         self.worker_id):
+                if executor == 'process':
+                    future = pool.submit(run_in_process, kind, payload, job_id)
+                else:
+                    future = pool.submit(job_queue.execute, self.app, kind, payload, job_id)
+                self.running[future] = (job_id, kind, executor)
+                claimed += 1
+        return claimed
+
+    def finish(self, futures):
+        for future in futures:
+            job_id, kind, _ = self.running.pop(future)
+            try:
+                result = future.result()
+            except JobFailed as e:
+                status = job_queue.fail(job_id, self.worker_id, e, permanent=True)
+            except Exception as e:
+                status = job_queue.fail(job_id, self.worker_id, f"{type(e).__name__}: {e}")
+            else:
+                job_queue.complete(job_id, self.worker_id, result)
+                status = 'succeeded'
+            print(f"Job {job_id} ({kind}): {status or 'lost its lease'}")
+
+    def run(self, once=False):
+        last_heartbeat = last_expiry = 0.0
+        while True:
+            try:
+                now = time.monotonic()
+                if now - last_expiry >= self.expiry_every:
+                    requeued, failed = job_queue.requeue_expired()
+                    if requeued or failed:
+                        print(f"Requeued {requeued} and failed {failed} jobs of unresponsive workers")
+                    last_expiry = now
+
+                claimed = 0 if self.stopping else self.claim()
+                if not self.running and (self.stopping or (once and not claimed)):
+                    break
+
+                if self.running:
+                    done, _ = wait(list(self.running), timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+                    self.finish(done)
+                else:
+                    time.sleep(self.poll_seconds)
+
+                if time.monotonic() - last_heartbeat >= self.heartbeat_every:
+                    job_queue.heartbeat([job_id for job_id, _, _ in self.running.values()], self.worker_id)
+                    last_heartbeat = time.monotonic()
+            except Exception as e:
+                # e.g. the database went away; running jobs keep their lease until it expires
+                db.session.rollback()
+                print(f"Worker loop error: {str(e)}")
+                traceback.print_exc()
+                time.sleep(self.poll_seconds)
+
+        for pool in self.pools.values():
+            pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run queued background jobs')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('JOB_WORKER_THREADS', 4)),
+                        help='jobs run at once on the thread pool')
+    parser.add_argument('--processes', type=int, default=int(os.getenv('JOB_WORKER_PROCESSES', 2)),
+                        help='jobs run at once on the process pool (CPU-bound kinds)')
+    parser.add_argument('--poll-seconds', type=float, default=float(os.getenv('JOB_POLL_SECONDS', 1)),
+                        help='how often to look for new jobs')
+    parser.add_argument('--once', action='store_true', help='exit when no job is runnable')
+    args = parser.parse_args(argv)
+
+    app = create_app(APP_CONFIG)
+    with app.app_context():
+        worker = Worker(app, max(args.threads, 1), max(args.processes, 0), args.poll_seconds)
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        print(f"Worker {worker.worker_id}: {args.threads} threads, {worker.capacity['process']} processes, "
+              f"kinds {', '.join(job_queue.kinds())}")
+        worker.run(args.once)
+        db.session.remove()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from functools import wraps
 from flask import jsonify
 from flask_jwt_extended import get_jwt_identity
+from monitoring.tracing import tracer
 
 def admin_required(fn):
     """
@@ -8,12 +9,13 @@ def admin_required(fn):
     """
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        # Get the identity from the JWT token
-        current_user = get_jwt_identity()
-        
-        # Check if the user exists and has admin role
-        if not current_user or current_user.get('role') != 'admin':
-            return jsonify({"error": "Admin access required"}), 403
+        with tracer.start_span('auth.admin_required'):
+            # Get the identity from the JWT token
+            current_user = get_jwt_identity()
+            
+            # Check if the user exists and has admin role
+            if not current_user or current_user.get('role') != 'admin':
+                return jsonify({"error": "Admin access required"}), 403
         
         # If user is admin, proceed with the original function
         return fn(*args, **kwargs)
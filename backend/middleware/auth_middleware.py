@@ -2,16 +2,18 @@
 from flask import request, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from functools import wraps
+from monitoring.tracing import tracer
 
 def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         try:
-            verify_jwt_in_request()
-            current_user = get_jwt_identity()
+            with tracer.start_span('auth.admin_required'):
+                verify_jwt_in_request()
+                current_user = get_jwt_identity()
             
-            if current_user['role'] != 'admin':
-                return jsonify({'error': 'Admin access required'}), 403
+                if current_user['role'] != 'admin':
+                    return jsonify({'error': 'Admin access required'}), 403
                 
             return fn(*args, **kwargs)
         except Exception as e:
@@ -23,11 +25,12 @@ def trainer_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         try:
-            verify_jwt_in_request()
-            current_user = get_jwt_identity()
+            with tracer.start_span('auth.trainer_required'):
+                verify_jwt_in_request()
+                current_user = get_jwt_identity()
             
-            if current_user['role'] != 'trainer' and current_user['role'] != 'admin':
-                return jsonify({'error': 'Trainer access required'}), 403
+                if current_user['role'] != 'trainer' and current_user['role'] != 'admin':
+                    return jsonify({'error': 'Trainer access required'}), 403
                 
             return fn(*args, **kwargs)
         except Exception as e:
@@ -39,11 +42,12 @@ def staff_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         try:
-            verify_jwt_in_request()
-            current_user = get_jwt_identity()
+            with tracer.start_span('auth.staff_required'):
+                verify_jwt_in_request()
+                current_user = get_jwt_identity()
             
-            if current_user['role'] not in ['admin', 'staff']:
-                return jsonify({'error': 'Staff access required'}), 403
+                if current_user['role'] not in ['admin', 'staff']:
+                    return jsonify({'error': 'Staff access required'}), 403
                 
             return fn(*args, **kwargs)
         except Exception as e:
@@ -55,11 +59,12 @@ def student_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         try:
-            verify_jwt_in_request()
-            current_user = get_jwt_identity()
+            with tracer.start_span('auth.student_required'):
+                verify_jwt_in_request()
+                current_user = get_jwt_identity()
             
-            if current_user['role'] not in ['admin', 'staff', 'student']:
-                return jsonify({'error': 'Student access required'}), 403
+                if current_user['role'] not in ['admin', 'staff', 'student']:
+                    return jsonify({'error': 'Student access required'}), 403
                 
             return fn(*args, **kwargs)
         except Exception as e:
@@ -71,7 +76,8 @@ def jwt_required_custom(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         try:
-            verify_jwt_in_request()
+            with tracer.start_span('auth.jwt_required_custom'):
+                verify_jwt_in_request()
             return fn(*args, **kwargs)
         except Exception as e:
             print(f"JWT middleware error: {str(e)}")
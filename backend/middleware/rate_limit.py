@@ -0,0 +1,91 @@
+import math
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+from utils.token_bucket import MemoryBackend, RedisBackend, parse_rate
+
+# Backend shared by every rate_limited endpoint in this process
+_backend = MemoryBackend()
+
+
+def init_app(app):
+    global _backend
+    url = app.config.get('RATE_LIMIT_STORAGE_URL')
+    _backend = RedisBackend(url) if url else MemoryBackend(int(app.config.get('RATE_LIMIT_MAX_KEYS', 100000)))
+
+    # RATE_LIMITS="login.ip=20/minute,login.account=5/minute" overrides the decorator defaults
+    overrides = app.config.get('RATE_LIMITS') or {}
+    if isinstance(overrides, str):
+        overrides = dict(item.strip().split('=', 1) for item in overrides.split(',') if '=' in item)
+    app.config['RATE_LIMITS'] = {name: parse_rate(rate) for name, rate in overrides.items()}
+
+
+def set_backend(backend):
+    """Swap the bucket store, e.g. for a shared stand-in"""
+    global _backend
+    _backend = backend
+
+
+def client_ip():
+    if current_app.config.get('RATE_LIMIT_TRUST_PROXY') and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or 'unknown'
+
+
+def json_field(field):
+    """Account key taken from a JSON body field, e.g. the login email"""
+    def key():
+        data = request.get_json(silent=True) or {}
+        value = data.get(field)
+        return str(value).strip().lower() if value else None
+    return key
+
+
+def rate_limited(scope, per_ip=None, per_account=None, per_route=None, account_key=None):
+    """
+    Token-bucket limits for an endpoint, each given as 'N/period':
+      per_ip       one bucket per client address
+      per_account  one bucket per account_key() value, e.g. the login email
+      per_route    one bucket for the endpoint as a whole
+    Requests over any limit get 429 with a Retry-After header.
+    """
+    defaults = [
+        ('ip', per_ip and parse_rate(per_ip)),
+        ('account', per_account and parse_rate(per_account)),
+        ('route', per_route and parse_rate(per_route))
+    ]
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            if not config.get('RATE_LIMIT_ENABLED', True) or request.method == 'OPTIONS':
+                return fn(*args, **kwargs)
+
+            overrides = config.get('RATE_LIMITS', {})
+            buckets = []
+            for kind, limit in defaults:
+                limit = overrides.get(f"{scope}.{kind}", limit)
+                if not limit:
+                    continue
+                if kind == 'ip':
+                    key = client_ip()
+                elif kind == 'account':
+                    key = account_key() if account_key else None
+                    if not key:
+                        continue
+                else:
+                    key = '*'
+                buckets.append((f"{scope}:{kind}:{key}", limit[0], limit[1]))
+
+            # All or nothing: a client over its own limit must not drain the shared route bucket
+            allowed, retry_after = _backend.take_all(buckets) if buckets else (True, 0.0)
+            if not allowed:
+                response = jsonify({'error': 'Too many requests, please retry later'})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(max(int(math.ceil(retry_after)), 1))
+                return response
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,272 @@
+import argparse
+import importlib.util
+import os
+import re
+import sys
+import time
+import traceback
+from datetime import datetime
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, Boolean, inspect, text
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'versions')
+VERSION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_THROTTLE_MS = 50
+
+metadata = MetaData()
+
+schema_version = Table(
+    'schema_version', metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+    Column('duration_ms', Float)
+)
+
+backfill_state = Table(
+    'migration_backfill_state', metadata,
+    Column('name', String(200), primary_key=True),
+    Column('last_pk', Integer, nullable=False, default=0),
+    Column('rows_updated', Integer, nullable=False, default=0),
+    Column('completed', Boolean, nullable=False, default=False),
+    Column('updated_at', DateTime)
+)
+
+
+def discover_migrations():
+    """Return (version, name, path) for every file in migrations/versions, in order"""
+    found = []
+    for filename in sorted(os.listdir(VERSIONS_DIR)):
+        match = VERSION_FILE.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(VERSIONS_DIR, filename)))
+    return found
+
+
+def load_migration(path):
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class MigrationContext:
+    """Helpers handed to each migration's upgrade(ctx)"""
+
+    def __init__(self, db, chunk_size=DEFAULT_CHUNK_SIZE, throttle_ms=DEFAULT_THROTTLE_MS):
+        self.db = db
+        self.engine = db.engine
+        self.chunk_size = chunk_size
+        self.throttle_ms = throttle_ms
+
+    @property
+    def dialect(self):
+        return self.engine.dialect.name
+
+    def execute(self, sql, params=None):
+        with self.engine.begin() as conn:
+            return conn.execute(text(sql), params or {})
+
+    def has_table(self, table):
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table, column):
+        return any(c['name'] == column for c in inspect(self.engine).get_columns(table))
+
+    def has_index(self, table, index):
+        return any(i['name'] == index for i in inspect(self.engine).get_indexes(table))
+
+    def create_table(self, model):
+        """Create a model's table if it does not exist yet"""
+        model.__table__.create(self.engine, checkfirst=True)
+
+    def add_column(self, table, column, ddl):
+        """ALTER TABLE ... ADD COLUMN unless the column is already there"""
+        if self.has_column(table, column):
+            print(f"  column {table}.{column} already exists")
+            return False
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        print(f"  added column {table}.{column}")
+        return True
+
+    def create_index(self, table, index, columns, unique=False):
+        if self.has_index(table, index):
+            print(f"  index {index} already exists")
+            return False
+        self.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {index} ON {table} ({', '.join(columns)})")
+        print(f"  created index {index}")
+        return True
+
+    def backfill(self, name, table, update, where=None, pk='id', chunk_size=None, throttle_ms=None, params=None):
+        """
+        Apply an update to `table` in primary-key ranges of chunk_size rows.
+
+        `update` is either a SET clause ("membership_status = 'active'") or a
+        callable(conn, lower_pk, upper_pk) returning the number of rows it
+        changed. Each chunk commits together with its resume point in
+        migration_backfill_state, so an interrupted backfill continues from
+        the last finished chunk and no lock is held longer than one chunk.
+        """
+        chunk_size = chunk_size or self.chunk_size
+        throttle = (self.throttle_ms if throttle_ms is None else throttle_ms) / 1000.0
+
+        with self.engine.begin() as conn:
+            state = conn.execute(backfill_state.select().where(backfill_state.c.name == name)).first()
+            if state is None:
+                conn.execute(backfill_state.insert().values(
+                    name=name, last_pk=0, rows_updated=0, completed=False, updated_at=datetime.utcnow()
+                ))
+                last_pk, rows_updated = 0, 0
+            elif state.completed:
+                print(f"  backfill {name} already completed ({state.rows_updated} rows)")
+                return state.rows_updated
+            else:
+                last_pk, rows_updated = state.last_pk, state.rows_updated
+                print(f"  resuming backfill {name} after {pk} {last_pk}")
+
+        next_upper = text(
+            f"SELECT MAX({pk}) FROM (SELECT {pk} FROM {table} WHERE {pk} > :last_pk "
+            f"ORDER BY {pk} LIMIT :chunk_size) AS backfill_chunk"
+        )
+        if not callable(update):
+            condition = f" AND ({where})" if where else ''
+            update_sql = text(f"UPDATE {table} SET {update} WHERE {pk} > :lower AND {pk} <= :upper{condition}")
+
+        started = time.perf_counter()
+        while True:
+            with self.engine.begin() as conn:
+                upper = conn.execute(next_upper, {'last_pk': last_pk, 'chunk_size': chunk_size}).scalar()
+                if upper is None:
+                    conn.execute(backfill_state.update().where(backfill_state.c.name == name).values(
+                        completed=True, updated_at=datetime.utcnow()
+                    ))
+                    break
+
+                if callable(update):
+                    changed = update(conn, last_pk, upper) or 0
+                else:
+                    changed = conn.execute(update_sql, dict(params or {}, lower=last_pk, upper=upper)).rowcount
+
+                rows_updated += max(changed, 0)
+                last_pk = upper
+                conn.execute(backfill_state.update().where(backfill_state.c.name == name).values(
+                    last_pk=last_pk, rows_updated=rows_updated, updated_at=datetime.utcnow()
+                ))
+
+            print(f"  {name}: through {pk} {last_pk}, {rows_updated} rows updated")
+            if throttle:
+                time.sleep(throttle)
+
+        print(f"  backfill {name} finished: {rows_updated} rows in {time.perf_counter() - started:.1f}s")
+        return rows_updated
+
+
+class MigrationRunner:
+    """Applies migrations/versions/NNNN_*.py in order and records them in schema_version"""
+
+    LOCK_NAME = 'fitwell_schema_migrations'
+
+    def __init__(self, db, chunk_size=DEFAULT_CHUNK_SIZE, throttle_ms=DEFAULT_THROTTLE_MS):
+        self.db = db
+        self.context = MigrationContext(db, chunk_size, throttle_ms)
+
+    def ensure_tables(self):
+        metadata.create_all(self.db.engine, checkfirst=True)
+
+    def applied_versions(self):
+        with self.db.engine.connect() as conn:
+            return {row.version: row for row in conn.execute(schema_version.select())}
+
+    def status(self):
+        self.ensure_tables()
+        applied = self.applied_versions()
+        for version, name, _ in discover_migrations():
+            row = applied.get(version)
+            state = f"applied {row.applied_at:%Y-%m-%d %H:%M:%S}" if row else 'pending'
+            print(f"{version:04d}  {name:<45} {state}")
+        with self.db.engine.connect() as conn:
+            for row in conn.execute(backfill_state.select()):
+                progress = 'done' if row.completed else f"at id {row.last_pk}"
+                print(f"backfill {row.name}: {row.rows_updated} rows, {progress}")
+
+    def upgrade(self, target=None):
+        self.ensure_tables()
+        with self._lock():
+            applied = self.applied_versions()
+            pending = [m for m in discover_migrations() if m[0] not in applied and (target is None or m[0] <= target)]
+            if not pending:
+                print("Schema is up to date")
+                return True
+
+            for version, name, path in pending:
+                print(f"Applying {version:04d}_{name}")
+                started = time.perf_counter()
+                try:
+                    load_migration(path).upgrade(self.context)
+                except Exception as e:
+                    print(f"Migration {version:04d}_{name} failed: {str(e)}")
+                    traceback.print_exc()
+                    return False
+
+                with self.db.engine.begin() as conn:
+                    conn.execute(schema_version.insert().values(
+                        version=version,
+                        name=name,
+                        applied_at=datetime.utcnow(),
+                        duration_ms=(time.perf_counter() - started) * 1000
+                    ))
+            return True
+
+    def _lock(self):
+        runner = self
+
+        class _AdvisoryLock:
+            """MySQL named lock so two deploys cannot migrate at once; a no-op elsewhere"""
+
+            def __enter__(self):
+                self.conn = None
+                if runner.context.dialect == 'mysql':
+                    self.conn = runner.db.engine.connect()
+                    if not self.conn.execute(text("SELECT GET_LOCK(:name, 30)"), {'name': runner.LOCK_NAME}).scalar():
+                        self.conn.close()
+                        raise RuntimeError('Another migration is already running')
+                return self
+
+            def __exit__(self, *exc):
+                if self.conn is not None:
+                    self.conn.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': runner.LOCK_NAME})
+                    self.conn.close()
+                return False
+
+        return _AdvisoryLock()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply versioned schema migrations')
+    parser.add_argument('command', choices=['upgrade', 'status'], nargs='?', default='upgrade')
+    parser.add_argument('--target', type=int, help='stop after this version')
+    parser.add_argument('--chunk-size', type=int, default=int(os.getenv('BACKFILL_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)))
+    parser.add_argument('--throttle-ms', type=int, default=int(os.getenv('BACKFILL_THROTTLE_MS', DEFAULT_THROTTLE_MS)))
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    from models import db
+
+    app = create_app({'QUERY_EXPLAIN_ENABLED': False, 'TRACING_ENABLED': False})
+    with app.app_context():
+        runner = MigrationRunner(db, args.chunk_size, args.throttle_ms)
+        if args.command == 'status':
+            runner.status()
+            return True
+        return runner.upgrade(args.target)
+
+
+if __name__ == "__main__":
+    if main() is False:
+        print("Database schema migration failed")
+        sys.exit(1)
@@ -0,0 +1,5 @@
+"""Create any tables defined in models.py that do not exist yet"""
+
+
+def upgrade(ctx):
+    ctx.db.create_all()
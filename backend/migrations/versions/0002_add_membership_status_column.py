@@ -0,0 +1,5 @@
+"""Add membership_status column to student_profile table"""
+
+
+def upgrade(ctx):
+    ctx.add_column('student_profile', 'membership_status', "VARCHAR(20) DEFAULT 'active'")
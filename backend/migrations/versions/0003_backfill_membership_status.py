@@ -0,0 +1,10 @@
+"""Set membership_status for existing student profiles that have none"""
+
+
+def upgrade(ctx):
+    ctx.backfill(
+        '0003_membership_status',
+        'student_profile',
+        "membership_status = 'active'",
+        where='membership_status IS NULL'
+    )
@@ -0,0 +1,6 @@
+"""Create the refresh_token table used by /api/auth/refresh"""
+from models import RefreshToken
+
+
+def upgrade(ctx):
+    ctx.create_table(RefreshToken)
@@ -0,0 +1,6 @@
+"""Create the token_revocation table behind the JWT revocation filter"""
+from models import TokenRevocation
+
+
+def upgrade(ctx):
+    ctx.create_table(TokenRevocation)
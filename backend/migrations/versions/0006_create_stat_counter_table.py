@@ -0,0 +1,10 @@
+"""Create stat_counter and fill it with the current counts"""
+from models import StatCounter
+from services.counters import reconcile
+
+
+def upgrade(ctx):
+    ctx.create_table(StatCounter)
+    with ctx.engine.begin() as conn:
+        drift = reconcile(conn)
+    print(f"  initialised {len(drift)} counters")
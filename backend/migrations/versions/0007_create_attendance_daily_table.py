@@ -0,0 +1,9 @@
+"""Create attendance_daily and fill it from the attendance table"""
+from models import AttendanceDaily
+from services.attendance_rollup import backfill
+
+
+def upgrade(ctx):
+    ctx.create_table(AttendanceDaily)
+    rows = backfill(ctx.engine)
+    print(f"  wrote {rows} attendance_daily rows")
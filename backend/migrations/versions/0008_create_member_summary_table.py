@@ -0,0 +1,18 @@
+"""Create member_summary, the indexes it is rebuilt from, and fill it for every student profile"""
+from sqlalchemy import text
+
+from models import MemberSummary
+from services.member_summary import rebuild
+
+
+def rebuild_range(conn, lower, upper):
+    ids = conn.execute(text("SELECT id FROM student_profile WHERE id > :lower AND id <= :upper"),
+                       {'lower': lower, 'upper': upper}).scalars().all()
+    return rebuild(conn, ids) if ids else 0
+
+
+def upgrade(ctx):
+    ctx.create_table(MemberSummary)
+    ctx.create_index('attendance', 'ix_attendance_student_id_date', ['student_id', 'date'])
+    ctx.create_index('schedule', 'ix_schedule_user_id_scheduled_time', ['user_id', 'scheduled_time'])
+    ctx.backfill('member_summary_initial', 'student_profile', rebuild_range)
@@ -0,0 +1,16 @@
+"""Create attendance_bitmap and fill it from the attendance table"""
+from sqlalchemy import text
+
+from models import AttendanceBitmap
+from services.attendance_bitmap import rebuild
+
+
+def rebuild_range(conn, lower, upper):
+    ids = conn.execute(text("SELECT id FROM student_profile WHERE id > :lower AND id <= :upper"),
+                       {'lower': lower, 'upper': upper}).scalars().all()
+    return rebuild(conn, ids) if ids else 0
+
+
+def upgrade(ctx):
+    ctx.create_table(AttendanceBitmap)
+    ctx.backfill('attendance_bitmap_initial', 'student_profile', rebuild_range)
@@ -0,0 +1,6 @@
+"""Create the broadcast table"""
+from models import Broadcast
+
+
+def upgrade(ctx):
+    ctx.create_table(Broadcast)
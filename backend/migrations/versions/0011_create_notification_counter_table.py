@@ -0,0 +1,11 @@
+"""Create notification_counter, index notifications for mark-read, and count every user's unread notifications"""
+from models import NotificationCounter
+from services.unread_counters import reconcile
+
+
+def upgrade(ctx):
+    ctx.create_table(NotificationCounter)
+    ctx.create_index('notification', 'ix_notification_user_id_created_at', ['user_id', 'created_at'])
+    with ctx.engine.begin() as conn:
+        drift = reconcile(conn)
+    print(f"  counted unread notifications for {len(drift)} users")
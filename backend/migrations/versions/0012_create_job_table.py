@@ -0,0 +1,7 @@
+"""Create the background job table and the index workers claim jobs through"""
+from models import Job
+
+
+def upgrade(ctx):
+    ctx.create_table(Job)
+    ctx.create_index('job', 'ix_job_claim', ['status', 'priority', 'run_after', 'id'])
@@ -0,0 +1,14 @@
+"""Add membership start and end dates to student_profile and index active memberships by end date for the expiry sweep"""
+
+
+def upgrade(ctx):
+    ctx.add_column('student_profile', 'membership_start', 'DATE')
+    ctx.add_column('student_profile', 'membership_end', 'DATE')
+    ctx.create_index('student_profile', 'ix_student_profile_status_end', ['membership_status', 'membership_end', 'id'])
+    # Existing memberships started on admission and stay open-ended until staff set an end date
+    ctx.backfill(
+        '0013_membership_start',
+        'student_profile',
+        'membership_start = DATE(admission_date)',
+        where='membership_start IS NULL AND admission_date IS NOT NULL'
+    )
@@ -0,0 +1,7 @@
+"""Create outbox_message and the index the delivery worker claims due messages from"""
+from models import OutboxMessage
+
+
+def upgrade(ctx):
+    ctx.create_table(OutboxMessage)
+    ctx.create_index('outbox_message', 'ix_outbox_message_due', ['status', 'next_attempt_at', 'id'])
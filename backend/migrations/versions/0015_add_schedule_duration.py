@@ -0,0 +1,31 @@
+"""Give schedule entries a duration and a stored end time, and index sessions by trainer and by room for overlap checks"""
+from datetime import timedelta
+
+from sqlalchemy import bindparam, select
+
+from models import Schedule
+
+schedule_table = Schedule.__table__
+
+
+def set_ends_at(conn, lower, upper):
+    rows = conn.execute(
+        select(schedule_table.c.id, schedule_table.c.scheduled_time, schedule_table.c.duration_minutes)
+        .where(schedule_table.c.id > lower, schedule_table.c.id <= upper, schedule_table.c.ends_at.is_(None))
+    ).all()
+    if rows:
+        conn.execute(
+            schedule_table.update().where(schedule_table.c.id == bindparam('row_id'))
+            .values(ends_at=bindparam('row_ends_at')),
+            [{'row_id': row.id, 'row_ends_at': row.scheduled_time + timedelta(minutes=row.duration_minutes or 60)}
+             for row in rows]
+        )
+    return len(rows)
+
+
+def upgrade(ctx):
+    ctx.add_column('schedule', 'duration_minutes', 'INTEGER NOT NULL DEFAULT 60')
+    ctx.add_column('schedule', 'ends_at', 'DATETIME')
+    ctx.backfill('0015_schedule_ends_at', 'schedule', set_ends_at)
+    ctx.create_index('schedule', 'ix_schedule_trainer_id_scheduled_time', ['trainer_id', 'scheduled_time'])
+    ctx.create_index('schedule', 'ix_schedule_location_scheduled_time', ['location', 'scheduled_time'])
@@ -0,0 +1,16 @@
+"""Create trainer_calendar and fill it from the schedule table"""
+from sqlalchemy import text
+
+from models import TrainerCalendar
+from services.trainer_calendar import rebuild
+
+
+def rebuild_range(conn, lower, upper):
+    ids = conn.execute(text("SELECT id FROM trainer WHERE id > :lower AND id <= :upper"),
+                       {'lower': lower, 'upper': upper}).scalars().all()
+    return rebuild(conn, ids) if ids else 0
+
+
+def upgrade(ctx):
+    ctx.create_table(TrainerCalendar)
+    ctx.backfill('trainer_calendar_initial', 'trainer', rebuild_range)
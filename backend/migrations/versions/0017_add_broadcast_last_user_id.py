@@ -0,0 +1,5 @@
+"""Record the last recipient id a broadcast reached, so a retried send resumes by id instead of by position"""
+
+
+def upgrade(ctx):
+    ctx.add_column('broadcast', 'last_user_id', 'INTEGER')
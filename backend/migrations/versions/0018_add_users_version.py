@@ -0,0 +1,5 @@
+"""Add users.version, bumped on profile changes, so access tokens can name the user record they were issued for"""
+
+
+def upgrade(ctx):
+    ctx.add_column('users', 'version', 'INTEGER NOT NULL DEFAULT 1')
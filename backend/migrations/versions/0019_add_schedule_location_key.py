@@ -0,0 +1,14 @@
+"""Store a normalized room name on schedule entries, index sessions by it, and add the room_lock table for booking locks"""
+from models import RoomLock
+
+
+def upgrade(ctx):
+    ctx.add_column('schedule', 'location_key', 'VARCHAR(100)')
+    ctx.backfill(
+        '0019_schedule_location_key',
+        'schedule',
+        'location_key = LOWER(TRIM(location))',
+        where='location IS NOT NULL AND location_key IS NULL'
+    )
+    ctx.create_index('schedule', 'ix_schedule_location_key_scheduled_time', ['location_key', 'scheduled_time'])
+    ctx.create_table(RoomLock)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from services import passwords
 
 db = SQLAlchemy()
 
@@ -17,6 +17,8 @@ class User(db.Model):
     blood_group = db.Column(db.String(5))
     height = db.Column(db.Float)
     weight = db.Column(db.Float)
+    # Bumped by every change to the fields in to_dict(); access tokens carry it (see services/identity_cache.py)
+    version = db.Column(db.Integer, nullable=False, default=1)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Define explicit relationship to StudentProfile
@@ -29,12 +31,17 @@ class User(db.Model):
     
     def set_password(self, password):
         """Set the password hash from a plaintext password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
     
     def check_password(self, password):
         """Check if the provided password matches the hash"""
-        if self.password_hash:
-            return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password):
+        """After a successful check, re-hash with the current policy if it changed; the caller commits"""
+        if passwords.needs_rehash(self.password_hash):
+            self.set_password(password)
+            return True
         return False
         
     def to_dict(self):
@@ -61,6 +68,9 @@ class StudentProfile(db.Model):
     admission_date = db.Column(db.DateTime, default=datetime.utcnow)
     department = db.Column(db.String(100), nullable=True)
     membership_status = db.Column(db.String(20), default='active')  # 'active', 'expired', 'pending'
+    # The paid term; an active membership past its end date is expired by jobs/expire_memberships.py
+    membership_start = db.Column(db.Date, nullable=True)
+    membership_end = db.Column(db.Date, nullable=True)
     
     # Fix relationship to explicitly define the foreign key
     attendances = db.relationship('Attendance', 
@@ -189,8 +199,176 @@ class Schedule(db.Model):
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     scheduled_time = db.Column(db.DateTime, nullable=False)
+    duration_minutes = db.Column(db.Integer, nullable=False, default=60)
+    # scheduled_time + duration, kept by services/schedule_conflicts.py for overlap queries
+    ends_at = db.Column(db.DateTime, nullable=True)
     location = db.Column(db.String(100), nullable=True)
+    # location trimmed and lower-cased, so room checks match however the room was typed
+    location_key = db.Column(db.String(100), nullable=True)
     trainer_id = db.Column(db.Integer, db.ForeignKey('trainer.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     trainer = db.relationship('Trainer', backref='training_sessions')
+
+class RoomLock(db.Model):
+    __tablename__ = 'room_lock'
+
+    # One row per bookable room (Schedule.location_key), locked FOR UPDATE while a booking is checked
+    room_key = db.Column(db.String(100), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class RefreshToken(db.Model):
+    __tablename__ = 'refresh_token'
+
+    # jti of the refresh JWT; each refresh consumes one row and issues the next in the same family
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    family_id = db.Column(db.String(36), nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    used_at = db.Column(db.DateTime, nullable=True)
+    revoked = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TokenRevocation(db.Model):
+    __tablename__ = 'token_revocation'
+
+    # Every JWT of user_id issued at or before revoked_before is rejected; no FK so rows outlive deleted users
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    revoked_before = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class StatCounter(db.Model):
+    __tablename__ = 'stat_counter'
+
+    # Materialised counts for the admin dashboard, e.g. 'users.role.student'; see services/counters.py
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class NotificationCounter(db.Model):
+    __tablename__ = 'notification_counter'
+
+    # Unread notifications per user for the badge, kept in step on write; see services/unread_counters.py
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AttendanceDaily(db.Model):
+    __tablename__ = 'attendance_daily'
+
+    # Gym-wide attendance per day; department '*' is the whole gym, '' members without a department.
+    # Maintained from attendance writes by services/attendance_rollup.py
+    date = db.Column(db.Date, primary_key=True)
+    department = db.Column(db.String(100), primary_key=True)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    members = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MemberSummary(db.Model):
+    __tablename__ = 'member_summary'
+
+    # Denormalised activity of one student profile for member cards; see services/member_summary.py.
+    # Visits are 'present' attendance rows; current_streak is the run of daily visits ending on last_visit
+    profile_id = db.Column(db.Integer, db.ForeignKey('student_profile.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    last_visit = db.Column(db.Date, nullable=True)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    visits_total = db.Column(db.Integer, nullable=False, default=0)
+    # Visits on or after window_start; jobs/refresh_member_summaries.py moves the window forward daily
+    visits_30d = db.Column(db.Integer, nullable=False, default=0)
+    window_start = db.Column(db.Date, nullable=True)
+    active_diet_plans = db.Column(db.Integer, nullable=False, default=0)
+    workout_plans = db.Column(db.Integer, nullable=False, default=0)
+    next_session_id = db.Column(db.Integer, nullable=True)
+    next_session_at = db.Column(db.DateTime, nullable=True)
+    next_session_title = db.Column(db.String(100), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AttendanceBitmap(db.Model):
+    __tablename__ = 'attendance_bitmap'
+
+    # Attendance of one student profile as day bitmaps (utils/day_bitmap.py), bit i = start_date + i days.
+    # `present` has the 'present' days, `recorded` every day with any attendance row
+    profile_id = db.Column(db.Integer, db.ForeignKey('student_profile.id'), primary_key=True)
+    start_date = db.Column(db.Date, nullable=True)
+    present = db.Column(db.LargeBinary, nullable=False, default=b'')
+    recorded = db.Column(db.LargeBinary, nullable=False, default=b'')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Broadcast(db.Model):
+    __tablename__ = 'broadcast'
+
+    # One announcement fanned out to many users as notification rows; see services/notifications.py
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(100), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    audience = db.Column(db.String(50), nullable=False)  # 'members', 'trainers', 'staff', 'everyone', 'segment'
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    recipients = db.Column(db.Integer, nullable=False, default=0)
+    sent = db.Column(db.Integer, nullable=False, default=0)
+    # Highest recipient id sent so far; a retried send resumes after it
+    last_user_id = db.Column(db.Integer, nullable=True)
+    duration_ms = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+class Job(db.Model):
+    __tablename__ = 'job'
+
+    # Background work run by jobs/worker.py; see services/job_queue.py.
+    # status: 'queued', 'running', 'succeeded', 'failed' or 'cancelled'. Lower priority values run first
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    priority = db.Column(db.Integer, nullable=False, default=5)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    # No foreign key, so a job outlives the account that queued it
+    created_by = db.Column(db.Integer, nullable=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class OutboxMessage(db.Model):
+    __tablename__ = 'outbox_message'
+
+    # An email written in the same transaction as the change it reports and
+    # delivered later by jobs/deliver_outbox.py; see services/outbox.py.
+    # status: 'pending', 'sending', 'sent', 'failed' or 'cancelled'
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(20), nullable=False, default='email')
+    kind = db.Column(db.String(50), nullable=False)  # 'session_booked', 'session_reminder', 'membership_expired', ...
+    # What the message is about, e.g. 'schedule:42', so a pending reminder can be withdrawn
+    ref = db.Column(db.String(100), nullable=True, index=True)
+    user_id = db.Column(db.Integer, nullable=True, index=True)
+    recipient = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+class TrainerCalendar(db.Model):
+    __tablename__ = 'trainer_calendar'
+
+    # Booked time of one trainer in one calendar month as a slot bitmap (utils/slot_bitmap.py),
+    # bit i = month + i * 5 minutes; kept current by services/trainer_calendar.py
+    trainer_id = db.Column(db.Integer, db.ForeignKey('trainer.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    busy = db.Column(db.LargeBinary, nullable=False, default=b'')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
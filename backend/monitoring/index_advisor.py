@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from monitoring.query_stats import DEFAULT_PLAN_LOG
+
+_ORDER_BY = re.compile(r'\bORDER BY (.+?)(?:\bLIMIT\b|\bOFFSET\b|$)', re.IGNORECASE)
+_FROM_TABLE = re.compile(r'\bFROM (\w+)', re.IGNORECASE)
+_EQUALITY_OPERATORS = ('=', 'IN', 'IS')
+
+
+def load_records(path):
+    """Read the JSON-lines file written by QueryInstrumentation"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def aggregate(records):
+    """Group slow samples and captured plans by statement shape"""
+    shapes = {}
+    for record in records:
+        shape = shapes.setdefault(record['shape_id'], {
+            'shape_id': record['shape_id'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'endpoints': set(),
+            'statement': None,
+            'dialect': None,
+            'plan': None
+        })
+        shape['endpoints'].add(record.get('endpoint') or 'unknown')
+        if record['kind'] == 'slow_query':
+            shape['count'] += 1
+            shape['total_ms'] += record['duration_ms']
+            shape['max_ms'] = max(shape['max_ms'], record['duration_ms'])
+        elif record['kind'] == 'plan':
+            shape['statement'] = record['statement']
+            shape['dialect'] = record['dialect']
+            shape['plan'] = record['plan']
+    return list(shapes.values())
+
+
+def plan_problems(dialect, plan, statement):
+    """Return (table, problem) pairs for full scans and filesorts in an EXPLAIN result"""
+    problems = []
+    for row in plan or []:
+        if dialect == 'mysql':
+            table = row.get('table')
+            extra = row.get('Extra') or ''
+            if row.get('type') == 'ALL' and table:
+                problems.append((table, 'full_scan'))
+            if 'Using filesort' in extra and table:
+                problems.append((table, 'filesort'))
+        elif dialect == 'sqlite':
+            detail = row.get('detail') or ''
+            words = detail.split()
+            if words[:1] == ['SCAN'] and 'INDEX' not in words:
+                table = words[2] if len(words) > 2 and words[1] == 'TABLE' else (words[1] if len(words) > 1 else None)
+                if table:
+                    problems.append((table, 'full_scan'))
+            if detail.startswith('USE TEMP B-TREE FOR ORDER BY'):
+                match = _FROM_TABLE.search(statement or '')
+                if match:
+                    problems.append((match.group(1), 'filesort'))
+    return problems
+
+
+def suggest_index(table, statement):
+    """Build a candidate index: equality columns, then range columns, then ORDER BY columns"""
+    equality, ranges, ordering = [], [], []
+    predicate = re.compile(r'\b%s\.(\w+)\s*(>=|<=|!=|=|<|>|\bIN\b|\bIS\b|\bBETWEEN\b|\bLIKE\b)' % re.escape(table), re.IGNORECASE)
+
+    where_clause = re.split(r'\bWHERE\b', statement, maxsplit=1, flags=re.IGNORECASE)
+    if len(where_clause) == 2:
+        conditions = _ORDER_BY.split(where_clause[1])[0]
+        for column, operator in predicate.findall(conditions):
+            target = equality if operator.upper() in _EQUALITY_OPERATORS else ranges
+            target.append(column)
+
+    order_match = _ORDER_BY.search(statement)
+    if order_match:
+        ordering = re.findall(r'\b%s\.(\w+)' % re.escape(table), order_match.group(1))
+
+    columns = list(OrderedDict.fromkeys(equality + ranges + ordering))
+    if not columns:
+        return None
+    return f"CREATE INDEX ix_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})"
+
+
+def build_report(records, sort_key='total_ms'):
+    """Rank shapes by cost and attach index suggestions derived from their plans"""
+    shapes = aggregate(records)
+    for shape in shapes:
+        shape['problems'] = plan_problems(shape['dialect'], shape['plan'], shape['statement'])
+        suggestions = []
+        for table, _ in shape['problems']:
+            suggestion = suggest_index(table, shape['statement'] or '')
+            if suggestion and suggestion not in suggestions:
+                suggestions.append(suggestion)
+        shape['suggestions'] = suggestions
+    shapes.sort(key=lambda s: s[sort_key], reverse=True)
+    return shapes
+
+
+def print_report(shapes, limit):
+    if not shapes:
+        print("No slow queries recorded")
+        return
+
+    print(f"{'shape':<14}{'count':>7}{'total ms':>12}{'max ms':>10}  endpoints")
+    for shape in shapes[:limit]:
+        endpoints = ', '.join(sorted(shape['endpoints']))
+        print(f"{shape['shape_id']:<14}{shape['count']:>7}{shape['total_ms']:>12.1f}{shape['max_ms']:>10.1f}  {endpoints}")
+        if shape['statement']:
+            print(f"    {shape['statement'][:160]}")
+        for table, problem in shape['problems']:
+            print(f"    ! {problem.replace('_', ' ')} on {table}")
+        for suggestion in shape['suggestions']:
+            print(f"    + {suggestion}")
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print the worst slow queries and suggest missing indexes')
+    parser.add_argument('--log', default=os.getenv('QUERY_PLAN_LOG', DEFAULT_PLAN_LOG), help='query plan log written by the API')
+    parser.add_argument('--limit', type=int, default=10, help='number of statement shapes to show')
+    parser.add_argument('--sort', choices=['total_ms', 'max_ms', 'count'], default='total_ms')
+    args = parser.parse_args(argv)
+
+    print_report(build_report(load_records(args.log), args.sort), args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD_MS = 100
+DEFAULT_PLAN_LOG = os.path.join('logs', 'query_plans.jsonl')
+# Slow statements waiting for EXPLAIN; more are dropped until the thread catches up
+EXPLAIN_QUEUE_SIZE = 1000
+
+# Only statements that read rows are worth asking the planner about
+EXPLAINABLE_VERBS = ('select', 'update', 'delete')
+
+EXPLAIN_PREFIXES = {
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|\?|(?<!:):\w+')
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_statement(statement):
+    """Collapse literals and bind parameters so equivalent statements share one shape"""
+    sql = _STRING_LITERAL.sub('?', statement)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (?)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def statement_shape_id(normalized):
+    """Short stable identifier for a normalised statement"""
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+def current_endpoint():
+    """Flask endpoint that issued the statement, or 'background' outside a request"""
+    if has_request_context():
+        return request.endpoint or request.path
+    return 'background'
+
+
+class QueryInstrumentation:
+    """
+    Times every SQL statement on the app's engine. Statements slower than
+    SLOW_QUERY_THRESHOLD_MS are logged with their endpoint, and the first
+    slow occurrence of each statement shape is queued for EXPLAIN. A
+    background thread runs the queued EXPLAINs on its own connection, so
+    neither a request's response time nor a job pays for them, and
+    statements from jobs and CLI scripts are explained as well. A shape
+    counts as explained once its plan is written; if EXPLAIN fails or the
+    process exits first, its next slow run queues it again. Records are
+    appended to QUERY_PLAN_LOG as JSON lines for monitoring.index_advisor to
+    analyse offline.
+    """
+
+    def __init__(self, app=None, db=None):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._explained_shapes = set()
+        self._queued_shapes = set()
+        self._queue = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        self._thread = None
+        self._thread_pid = None
+        self.engine = None
+        if app is not None and db is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.threshold_ms = float(app.config.get('SLOW_QUERY_THRESHOLD_MS', DEFAULT_THRESHOLD_MS))
+        self.plan_log = app.config.get('QUERY_PLAN_LOG', DEFAULT_PLAN_LOG)
+        self.explain_enabled = app.config.get('QUERY_EXPLAIN_ENABLED', True)
+
+        with app.app_context():
+            self.engine = db.engine
+
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(self.engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.extensions['query_instrumentation'] = self
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get('query_start_time')
+        if not start_times:
+            return
+        duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+
+        if getattr(self._local, 'explaining', False) or duration_ms < self.threshold_ms:
+            return
+
+        normalized = normalize_statement(statement)
+        shape_id = statement_shape_id(normalized)
+        endpoint = current_endpoint()
+
+        self._write({
+            'kind': 'slow_query',
+            'shape_id': shape_id,
+            'endpoint': endpoint,
+            'duration_ms': round(duration_ms, 3),
+            'timestamp': datetime.utcnow().isoformat()
+        })
+
+        verb = normalized.split(' ', 1)[0].lower()
+        if not self.explain_enabled or executemany or verb not in EXPLAINABLE_VERBS:
+            return
+        if EXPLAIN_PREFIXES.get(self.engine.dialect.name) is None:
+            return
+
+        with self._lock:
+            if shape_id in self._explained_shapes or shape_id in self._queued_shapes:
+                return
+            self._queued_shapes.add(shape_id)
+        try:
+            self._queue.put_nowait({
+                'shape_id': shape_id,
+                'normalized': normalized,
+                'statement': statement,
+                'parameters': parameters,
+                'endpoint': endpoint,
+                'duration_ms': round(duration_ms, 3)
+            })
+        except queue.Full:
+            # Dropped, not marked: the shape is queued again on its next slow run
+            with self._lock:
+                self._queued_shapes.discard(shape_id)
+            return
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so each gunicorn worker starts its own
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._thread_pid != pid or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='query-explain', daemon=True)
+                self._thread_pid = pid
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._explain(self._queue.get())
+
+    def flush(self):
+        """EXPLAIN whatever is still queued on the calling thread, e.g. before a script exits"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._explain(item)
+
+    def _explain(self, item):
+        """Run EXPLAIN for one queued statement and record its plan; the shape is marked only once it is written"""
+        self._local.explaining = True
+        try:
+            with self.engine.connect() as conn:
+                result = conn.exec_driver_sql(EXPLAIN_PREFIXES[self.engine.dialect.name] + item['statement'],
+                                              item['parameters'])
+                plan = [dict(row._mapping) for row in result]
+            self._write({
+                'kind': 'plan',
+                'shape_id': item['shape_id'],
+                'endpoint': item['endpoint'],
+                'dialect': self.engine.dialect.name,
+                'statement': item['normalized'],
+                'duration_ms': item['duration_ms'],
+                'plan': plan,
+                'timestamp': datetime.utcnow().isoformat()
+            })
+            with self._lock:
+                self._explained_shapes.add(item['shape_id'])
+        except Exception as e:
+            logger.warning(f"EXPLAIN failed for shape {item['shape_id']}: {str(e)}")
+        finally:
+            self._local.explaining = False
+            with self._lock:
+                self._queued_shapes.discard(item['shape_id'])
+
+    def _write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            directory = os.path.dirname(self.plan_log)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.plan_log, 'a') as f:
+                f.write(line + '\n')
@@ -0,0 +1,164 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from collections import OrderedDict
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from monitoring.tracing import DEFAULT_TRACE_LOG
+
+BAR_WIDTH = 50
+
+
+def _attribute_value(value):
+    for key in ('stringValue', 'intValue', 'doubleValue', 'boolValue'):
+        if key in value:
+            return value[key]
+    return None
+
+
+def load_traces(path):
+    """Read the trace log and its rotated backups, grouping spans by trace id"""
+    backups = [f for f in glob.glob(path + '.*') if f.rsplit('.', 1)[1].isdigit()]
+    files = sorted(backups, key=lambda f: int(f.rsplit('.', 1)[1]), reverse=True) + [path]
+    traces = OrderedDict()
+    for filename in files:
+        if not os.path.exists(filename):
+            continue
+        with open(filename) as f:
+            for line in f:
+                try:
+                    payload = json.loads(line)
+                except ValueError:
+                    continue
+                for resource_spans in payload.get('resourceSpans', []):
+                    for scope_spans in resource_spans.get('scopeSpans', []):
+                        for raw in scope_spans.get('spans', []):
+                            span = {
+                                'trace_id': raw['traceId'],
+                                'span_id': raw['spanId'],
+                                'parent_id': raw.get('parentSpanId'),
+                                'name': raw['name'],
+                                'start': int(raw['startTimeUnixNano']),
+                                'end': int(raw['endTimeUnixNano']),
+                                'status': raw.get('status', {}).get('code', 0),
+                                'attributes': {a['key']: _attribute_value(a['value']) for a in raw.get('attributes', [])}
+                            }
+                            traces.setdefault(span['trace_id'], []).append(span)
+    return traces
+
+
+def _ordered(spans):
+    """Depth-first order with nesting depth, children sorted by start time"""
+    ids = {s['span_id'] for s in spans}
+    children = {}
+    roots = []
+    for span in spans:
+        if span['parent_id'] in ids:
+            children.setdefault(span['parent_id'], []).append(span)
+        else:
+            roots.append(span)
+
+    result = []
+
+    def visit(span, depth):
+        result.append((span, depth))
+        for child in sorted(children.get(span['span_id'], []), key=lambda s: s['start']):
+            visit(child, depth + 1)
+
+    for root in sorted(roots, key=lambda s: s['start']):
+        visit(root, 0)
+    return result
+
+
+def breakdown(spans):
+    """Split the request duration into SQL, serialization and remaining Python time"""
+    ordered = _ordered(spans)
+    root = ordered[0][0]
+    total_ms = (root['end'] - root['start']) / 1e6
+    sql = [s for s in spans if s['name'].startswith('SQL ')]
+    sql_ms = sum(s['end'] - s['start'] for s in sql) / 1e6
+    serialize_ms = sum(s['end'] - s['start'] for s in spans if s['name'] == 'serialize') / 1e6
+    return {
+        'root': root,
+        'total_ms': total_ms,
+        'sql_ms': sql_ms,
+        'sql_count': len(sql),
+        'serialize_ms': serialize_ms,
+        'python_ms': max(total_ms - sql_ms - serialize_ms, 0.0)
+    }
+
+
+def render_waterfall(spans):
+    ordered = _ordered(spans)
+    summary = breakdown(spans)
+    root = summary['root']
+    trace_start = min(s['start'] for s in spans)
+    trace_end = max(s['end'] for s in spans)
+    scale = BAR_WIDTH / max(trace_end - trace_start, 1)
+
+    status = root['attributes'].get('http.status_code', '')
+    print(f"trace {root['trace_id']}  {root['name']}  {status}  {summary['total_ms']:.1f} ms")
+    print(f"  SQL {summary['sql_ms']:.1f} ms in {summary['sql_count']} statements, "
+          f"serialize {summary['serialize_ms']:.1f} ms, Python {summary['python_ms']:.1f} ms")
+
+    for span, depth in ordered:
+        offset = int((span['start'] - trace_start) * scale)
+        length = max(int((span['end'] - span['start']) * scale), 1)
+        bar = ' ' * offset + '#' * length
+        start_ms = (span['start'] - trace_start) / 1e6
+        duration_ms = (span['end'] - span['start']) / 1e6
+        marker = '!' if span['status'] == 2 else ' '
+        print(f"  {start_ms:8.2f} {duration_ms:8.2f} {marker}|{bar:<{BAR_WIDTH}}| {'  ' * depth}{span['name']}")
+    print()
+
+
+def print_route_summary(traces):
+    routes = OrderedDict()
+    for spans in traces.values():
+        summary = breakdown(spans)
+        stats = routes.setdefault(summary['root']['name'], {'count': 0, 'total': 0.0, 'sql': 0.0, 'serialize': 0.0})
+        stats['count'] += 1
+        stats['total'] += summary['total_ms']
+        stats['sql'] += summary['sql_ms']
+        stats['serialize'] += summary['serialize_ms']
+
+    print(f"{'route':<50}{'count':>7}{'avg ms':>10}{'SQL %':>8}{'ser %':>8}")
+    for name, stats in sorted(routes.items(), key=lambda item: item[1]['total'], reverse=True):
+        total = stats['total'] or 1
+        print(f"{name[:49]:<50}{stats['count']:>7}{stats['total'] / stats['count']:>10.1f}"
+              f"{stats['sql'] / total * 100:>8.1f}{stats['serialize'] / total * 100:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render per-request trace waterfalls')
+    parser.add_argument('--log', default=os.getenv('TRACE_LOG', DEFAULT_TRACE_LOG), help='trace log written by the API')
+    parser.add_argument('--trace', help='show a single trace id')
+    parser.add_argument('--route', help='only show traces whose root span name contains this text')
+    parser.add_argument('--last', type=int, default=5, help='number of most recent traces to show')
+    parser.add_argument('--summary', action='store_true', help='print SQL vs Python share per route instead')
+    args = parser.parse_args(argv)
+
+    traces = load_traces(args.log)
+    if args.trace:
+        traces = OrderedDict((k, v) for k, v in traces.items() if k == args.trace)
+    if args.route:
+        traces = OrderedDict((k, v) for k, v in traces.items() if args.route in breakdown(v)['root']['name'])
+
+    if not traces:
+        print("No traces found")
+        return
+
+    if args.summary:
+        print_route_summary(traces)
+        return
+
+    for spans in list(traces.values())[-args.last:]:
+        render_waterfall(spans)
+
+
+if __name__ == "__main__":
+    main()
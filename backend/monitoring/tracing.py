@@ -0,0 +1,351 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+from monitoring.query_stats import normalize_statement
+
+DEFAULT_TRACE_LOG = os.path.join('logs', 'traces.jsonl')
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def parse_traceparent(header):
+    """Return (trace_id, parent_span_id, sampled) from a W3C traceparent header, or None"""
+    if not header:
+        return None
+    parts = header.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class Span:
+    """A single timed operation, exported in OTLP JSON form"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_span_id', 'kind', 'attributes',
+                 'start_ns', 'end_ns', 'status_code', 'status_message', 'sampled', 'root',
+                 'finished_children', 'exported')
+
+    def __init__(self, name, trace_id, parent_span_id, kind, sampled, root=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status_code = STATUS_UNSET
+        self.status_message = ''
+        self.sampled = sampled
+        # The first span opened in this process for a trace collects its finished descendants
+        self.root = root or self
+        self.finished_children = []
+        self.exported = False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc):
+        self.status_code = STATUS_ERROR
+        self.status_message = str(exc)
+        self.attributes['exception.type'] = type(exc).__name__
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in self.attributes.items()],
+            'status': {'code': self.status_code}
+        }
+        if self.parent_span_id:
+            span['parentSpanId'] = self.parent_span_id
+        if self.status_message:
+            span['status']['message'] = self.status_message
+        return span
+
+
+class Tracer:
+    """
+    Lightweight in-process tracer. Spans follow the current request through a
+    context variable, so auth checks, SQL statements and JSON serialization nest
+    under the request span. Each finished trace is written as one OTLP/JSON line
+    to a rotating file that monitoring.trace_viewer can render.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.service_name = 'fitwell-api'
+        self._sink = None
+
+    def init_app(self, app, db):
+        self.enabled = app.config.get('TRACING_ENABLED', False)
+        if not self.enabled:
+            return
+
+        self.sample_rate = float(app.config.get('TRACE_SAMPLE_RATE', 1.0))
+        self.service_name = app.config.get('TRACE_SERVICE_NAME', self.service_name)
+
+        path = app.config.get('TRACE_LOG', DEFAULT_TRACE_LOG)
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=int(app.config.get('TRACE_LOG_MAX_BYTES', 10 * 1024 * 1024)),
+            backupCount=int(app.config.get('TRACE_LOG_BACKUP_COUNT', 5))
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self._sink = logging.getLogger('monitoring.traces')
+        self._sink.handlers = [handler]
+        self._sink.setLevel(logging.INFO)
+        self._sink.propagate = False
+
+        app.before_request(self._start_request_span)
+        app.after_request(self._record_response)
+        app.teardown_request(self._end_request_span)
+        app.json = TracedJSONProvider(app)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+        app.extensions['tracer'] = self
+
+    # Span lifecycle
+
+    def current_span(self):
+        return _current_span.get()
+
+    def _new_span(self, name, kind, attributes=None, remote_parent=None):
+        parent = _current_span.get()
+        if parent is not None:
+            return Span(name, parent.trace_id, parent.span_id, kind, parent.sampled, parent.root, attributes)
+        if remote_parent is not None:
+            trace_id, parent_span_id, sampled = remote_parent
+            return Span(name, trace_id, parent_span_id, kind, sampled, None, attributes)
+        sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        return Span(name, '%032x' % random.getrandbits(128), None, kind, sampled, None, attributes)
+
+    def _end_span(self, span):
+        span.end_ns = time.time_ns()
+        if not span.sampled:
+            return
+        root = span.root
+        if span is root:
+            self._export([span] + root.finished_children)
+            root.finished_children = []
+            root.exported = True
+        elif root.exported:
+            # Background work that outlived its request is written on its own
+            self._export([span])
+        else:
+            root.finished_children.append(span)
+
+    @contextmanager
+    def start_span(self, name, attributes=None, kind=SPAN_KIND_INTERNAL):
+        """Open a child of the current span (or a new trace) for the duration of the block"""
+        if not self.enabled:
+            yield None
+            return
+        span = self._new_span(name, kind, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._end_span(span)
+
+    def traced(self, name=None):
+        """Decorator that wraps a function call in a span"""
+        def decorator(fn):
+            span_name = name or fn.__qualname__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.start_span(span_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def propagate(self, fn):
+        """
+        Bind fn to the current trace context so spans it opens on another thread
+        (e.g. a ThreadPoolExecutor task) are children of the submitting span
+        """
+        ctx = contextvars.copy_context()
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            return ctx.run(fn, *args, **kwargs)
+        return wrapper
+
+    @contextmanager
+    def continue_trace(self, traceparent, name, attributes=None):
+        """Resume a trace handed over as a traceparent string, e.g. by a queued job"""
+        if not self.enabled:
+            yield None
+            return
+        span = self._new_span(name, SPAN_KIND_INTERNAL, attributes, parse_traceparent(traceparent))
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._end_span(span)
+
+    def current_traceparent(self):
+        span = _current_span.get()
+        return span.traceparent if span is not None else None
+
+    def _export(self, spans):
+        payload = {
+            'resourceSpans': [{
+                'resource': {
+                    'attributes': [
+                        {'key': 'service.name', 'value': {'stringValue': self.service_name}},
+                        {'key': 'process.pid', 'value': {'intValue': str(os.getpid())}}
+                    ]
+                },
+                'scopeSpans': [{
+                    'scope': {'name': 'monitoring.tracing'},
+                    'spans': [s.to_otlp() for s in spans]
+                }]
+            }]
+        }
+        try:
+            self._sink.info(json.dumps(payload, default=str))
+        except Exception:
+            pass
+
+    # Flask request lifecycle
+
+    def _start_request_span(self):
+        rule = request.url_rule.rule if request.url_rule else request.path
+        span = self._new_span(
+            f"{request.method} {rule}",
+            SPAN_KIND_SERVER,
+            {
+                'http.method': request.method,
+                'http.route': rule,
+                'http.target': request.full_path.rstrip('?'),
+                'flask.endpoint': request.endpoint or ''
+            },
+            parse_traceparent(request.headers.get('traceparent'))
+        )
+        # Kept on the request rather than g, which internal sub-requests (/api/batch) share
+        request.environ['monitoring.trace_span'] = span
+        request.environ['monitoring.trace_token'] = _current_span.set(span)
+
+    def _record_response(self, response):
+        span = request.environ.get('monitoring.trace_span')
+        if span is not None:
+            span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                span.status_code = STATUS_ERROR
+            response.headers['traceparent'] = span.traceparent
+        return response
+
+    def _end_request_span(self, exc):
+        span = request.environ.pop('monitoring.trace_span', None)
+        token = request.environ.pop('monitoring.trace_token', None)
+        if span is None:
+            return
+        if exc is not None:
+            span.record_exception(exc)
+        if token is not None:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                _current_span.set(None)
+        self._end_span(span)
+
+    # SQL statements
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current_span.get() is None:
+            return
+        normalized = normalize_statement(statement)
+        span = self._new_span(
+            'SQL ' + normalized.split(' ', 1)[0].upper(),
+            SPAN_KIND_CLIENT,
+            {'db.system': conn.dialect.name, 'db.statement': normalized[:2000]}
+        )
+        conn.info.setdefault('trace_spans', []).append(span)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get('trace_spans')
+        if spans:
+            span = spans.pop()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set_attribute('db.rowcount', cursor.rowcount)
+            self._end_span(span)
+
+    def _handle_error(self, exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get('trace_spans') if conn is not None else None
+        if spans:
+            span = spans.pop()
+            span.record_exception(exception_context.original_exception)
+            self._end_span(span)
+
+
+class TracedJSONProvider(DefaultJSONProvider):
+    """JSON provider that times response serialization"""
+
+    def dumps(self, obj, **kwargs):
+        with tracer.start_span('serialize'):
+            return super().dumps(obj, **kwargs)
+
+
+tracer = Tracer()
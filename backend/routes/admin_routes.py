@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from middleware.admin_required import admin_required
+from services import identity_cache, auth_tokens, token_revocation, counters, attendance_rollup, job_queue, memberships, outbox
 from models import db, User, Equipment, Trainer, StudentProfile, Attendance, DietPlan, TrainingVideo, WorkoutPlan
 from sqlalchemy import func
 from datetime import datetime, timedelta
@@ -14,11 +15,8 @@ admin_bp = Blueprint('admin', __name__)
 def admin_dashboard_stats():
     """Get admin dashboard stats"""
     try:
-        # Get counts
-        students_count = User.query.filter_by(role='student').count()
-        trainers_count = User.query.filter_by(role='trainer').count()
-        staff_count = User.query.filter_by(role='staff').count()
-        equipment_count = Equipment.query.count()
+        # Materialised counters, maintained on write by services/counters.py
+        counts = counters.read()
         
         # Get recent members (last 10)
         recent_members = User.query.order_by(User.created_at.desc()).limit(10).all()
@@ -30,37 +28,33 @@ def admin_dashboard_stats():
             'join_date': user.created_at.strftime('%Y-%m-%d') if user.created_at else None
         } for user in recent_members]
         
-        # Get today's attendance
+        # Get today's attendance; attendance rows belong to a student profile, not a user
         today = datetime.now().date()
-        today_attendance = Attendance.query.filter(
-            func.date(Attendance.date) == today
-        ).all()
+        today_attendance = db.session.query(Attendance, User)\
+            .join(StudentProfile, Attendance.student_id == StudentProfile.id)\
+            .join(User, StudentProfile.user_id == User.id)\
+            .filter(Attendance.date == today)\
+            .all()
         
         today_attendance_data = [{
             'id': attendance.id,
-            'user_id': attendance.user_id,
-            'user_name': User.query.get(attendance.user_id).name if User.query.get(attendance.user_id) else 'Unknown',
-            'check_in': attendance.check_in.strftime('%Y-%m-%dT%H:%M:%S') if attendance.check_in else None,
-            'check_out': attendance.check_out.strftime('%Y-%m-%dT%H:%M:%S') if attendance.check_out else None
-        } for attendance in today_attendance]
-        
-        # Get membership stats
-        student_profiles = StudentProfile.query.all()
-        active_count = sum(1 for profile in student_profiles if profile.membership_status == 'active')
-        expired_count = sum(1 for profile in student_profiles if profile.membership_status == 'expired')
-        pending_count = sum(1 for profile in student_profiles if profile.membership_status == 'pending')
+            'user_id': user.id,
+            'user_name': user.name,
+            'check_in': attendance.created_at.strftime('%Y-%m-%dT%H:%M:%S') if attendance.created_at else None,
+            'check_out': None
+        } for attendance, user in today_attendance]
         
         return jsonify({
-            'total_students': students_count,
-            'total_trainers': trainers_count,
-            'total_staff': staff_count,
-            'total_equipment': equipment_count,
+            'total_students': counts[counters.role_counter('student')],
+            'total_trainers': counts[counters.role_counter('trainer')],
+            'total_staff': counts[counters.role_counter('staff')],
+            'total_equipment': counts[counters.EQUIPMENT_COUNTER],
             'recent_members': recent_members_data,
             'today_attendance': today_attendance_data,
             'membership_stats': {
-                'active': active_count,
-                'expired': expired_count,
-                'pending': pending_count
+                'active': counts[counters.membership_counter('active')],
+                'expired': counts[counters.membership_counter('expired')],
+                'pending': counts[counters.membership_counter('pending')]
             }
         }), 200
     except Exception as e:
@@ -135,7 +129,7 @@ def manage_user(user_id):
             # If student, include profile info
             if user.role == 'student' and user.student_profile:
                 user_data['profile'] = {
-                    'membership_status': user.student_profile.membership_status,
+                    **memberships.serialize_term(user.student_profile),
                     'admission_date': user.student_profile.admission_date.strftime('%Y-%m-%d') if user.student_profile.admission_date else None,
                     'fitness_goal': user.student_profile.fitness_goal
                 }
@@ -151,6 +145,9 @@ def manage_user(user_id):
             if 'email' in data:
                 user.email = data['email']
             if 'role' in data:
+                if data['role'] != user.role:
+                    # Issued tokens carry the old role
+                    token_revocation.revoke_user(user_id)
                 user.role = data['role']
             if 'gender' in data:
                 user.gender = data['gender']
@@ -160,18 +157,46 @@ def manage_user(user_id):
                 user.height = data['height']
             if 'weight' in data:
                 user.weight = data['weight']
+            if 'membership_status' in data and user.student_profile:
+                if data['membership_status'] not in counters.MEMBERSHIP_STATUSES:
+                    return jsonify({'error': 'Invalid membership status'}), 400
+                user.student_profile.membership_status = data['membership_status']
+            if ('membership_start' in data or 'membership_end' in data) and user.student_profile:
+                profile = user.student_profile
+                start, end = profile.membership_start, profile.membership_end
+                try:
+                    if 'membership_start' in data:
+                        start = memberships.parse_date(data['membership_start'])
+                    if 'membership_end' in data:
+                        end = memberships.parse_date(data['membership_end'])
+                except ValueError:
+                    return jsonify({'error': 'Membership dates must be YYYY-MM-DD'}), 400
+                if start and end and end < start:
+                    return jsonify({'error': 'membership_end must not be before membership_start'}), 400
+                profile.membership_start, profile.membership_end = start, end
+            if any(field in data for field in ('name', 'email', 'role', 'gender', 'blood_group', 'height', 'weight')):
+                identity_cache.bump_version(user)
             if 'password' in data and data['password']:
                 user.set_password(data['password'])
+                # Sessions started with the old password must log in again
+                auth_tokens.revoke_user(user_id)
+                token_revocation.revoke_user(user_id)
                 
             db.session.commit()
+            identity_cache.invalidate_user(user_id)
             
             return jsonify({'message': 'User updated successfully'}), 200
             
         elif request.method == 'DELETE':
-            db.session.delete(user)
+            # Locked out now; the rows are deleted by a background job (services/job_handlers.py)
+            auth_tokens.revoke_user(user_id)
+            token_revocation.revoke_user(user_id)
+            job = job_queue.enqueue('delete_user', {'user_id': user_id}, priority='high',
+                                    created_by=get_jwt_identity()['id'])
             db.session.commit()
+            identity_cache.invalidate_user(user_id)
             
-            return jsonify({'message': 'User deleted successfully'}), 200
+            return jsonify({'message': 'User deletion queued', 'job': job_queue.serialize(job)}), 202
             
     except Exception as e:
         print(f"Error managing user: {str(e)}")
@@ -294,30 +319,30 @@ def get_attendance():
         end_date = request.args.get('end_date', None)
         user_id = request.args.get('user_id', None, type=int)
         
-        query = Attendance.query
+        # Attendance rows belong to a student profile; the user is reached through it
+        query = db.session.query(Attendance, User)\
+            .join(StudentProfile, Attendance.student_id == StudentProfile.id)\
+            .join(User, StudentProfile.user_id == User.id)
         
         if start_date:
-            query = query.filter(Attendance.date >= datetime.strptime(start_date, '%Y-%m-%d'))
+            query = query.filter(Attendance.date >= datetime.strptime(start_date, '%Y-%m-%d').date())
         if end_date:
-            query = query.filter(Attendance.date <= datetime.strptime(end_date, '%Y-%m-%d'))
+            query = query.filter(Attendance.date <= datetime.strptime(end_date, '%Y-%m-%d').date())
         if user_id:
-            query = query.filter_by(user_id=user_id)
+            query = query.filter(User.id == user_id)
             
-        attendance_list = query.order_by(Attendance.date.desc(), Attendance.check_in.desc()).all()
+        attendance_list = query.order_by(Attendance.date.desc(), Attendance.created_at.desc()).all()
         
-        attendance_data = []
-        for attendance in attendance_list:
-            user = User.query.get(attendance.user_id)
-            if user:
-                attendance_data.append({
-                    'id': attendance.id,
-                    'user_id': attendance.user_id,
-                    'user_name': user.name,
-                    'user_role': user.role,
-                    'check_in': attendance.check_in.strftime('%Y-%m-%dT%H:%M:%S') if attendance.check_in else None,
-                    'check_out': attendance.check_out.strftime('%Y-%m-%dT%H:%M:%S') if attendance.check_out else None,
-                    'date': attendance.date.strftime('%Y-%m-%d')
-                })
+        attendance_data = [{
+            'id': attendance.id,
+            'user_id': user.id,
+            'user_name': user.name,
+            'user_role': user.role,
+            'status': attendance.status,
+            'check_in': attendance.created_at.strftime('%Y-%m-%dT%H:%M:%S') if attendance.created_at else None,
+            'check_out': None,
+            'date': attendance.date.strftime('%Y-%m-%d')
+        } for attendance, user in attendance_list]
         
         return jsonify({'attendance': attendance_data}), 200
         
@@ -325,3 +350,44 @@ def get_attendance():
         print(f"Error getting attendance: {str(e)}")
         traceback.print_exc()
         return jsonify({'error': f'Failed to get attendance: {str(e)}'}), 500
+
+@admin_bp.route('/attendance/trends', methods=['GET'])
+@jwt_required()
+@admin_required
+def attendance_trends():
+    """Daily attendance totals from the attendance_daily rollup, default the last 30 days"""
+    try:
+        end_date = request.args.get('end_date')
+        start_date = request.args.get('start_date')
+        end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.now().date()
+        start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else end - timedelta(days=29)
+        if start > end:
+            return jsonify({'error': 'start_date must not be after end_date'}), 400
+        if (end - start).days > 366:
+            return jsonify({'error': 'At most 366 days per request'}), 400
+
+        return jsonify({
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'department': request.args.get('department'),
+            'days': attendance_rollup.trend(start, end, request.args.get('department')),
+            'departments': attendance_rollup.department_breakdown(start, end)
+        }), 200
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    except Exception as e:
+        print(f"Error getting attendance trends: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': f'Failed to get attendance trends: {str(e)}'}), 500
+
+@admin_bp.route('/outbox/stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def outbox_stats():
+    """Outbox messages per status, the oldest due message and recent send throughput"""
+    try:
+        return jsonify(outbox.stats()), 200
+    except Exception as e:
+        print(f"Error getting outbox stats: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': f'Failed to get outbox stats: {str(e)}'}), 500
@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from models import db, User
-from werkzeug.security import check_password_hash
-from datetime import timedelta, datetime
+from services import identity_cache, auth_tokens
+from services.passwords import PasswordHasherBusy
+from middleware.rate_limit import rate_limited, json_field
+from datetime import datetime
 import traceback
 import logging
 
@@ -11,6 +13,7 @@ auth_bp = Blueprint('auth', __name__)
 logger = logging.getLogger(__name__)
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limited('register', per_ip='10/minute', per_route='120/minute')
 def register():
     try:
         data = request.get_json()
@@ -37,24 +40,22 @@ def register():
             gender=data.get('gender'),
             blood_group=data.get('blood_group'),
             height=data.get('height'),
-            weight=data.get('weight'),
-            payment_method=data.get('payment_method')
+            weight=data.get('weight')
         )
         new_user.set_password(data['password'])
         
         db.session.add(new_user)
-        db.session.commit()
+        db.session.flush()
         
-        # Create access token
-        access_token = create_access_token(
-            identity={'id': new_user.id, 'role': new_user.role},
-            expires_delta=timedelta(days=1)
-        )
+        # Create access and refresh tokens
+        tokens = auth_tokens.issue_tokens({'id': new_user.id, 'role': new_user.role}, version=new_user.version)
+        db.session.commit()
         
-        # Return user data and token
+        # Return user data and tokens
         return jsonify({
             'message': 'User registered successfully',
-            'access_token': access_token,
+            'access_token': tokens['access_token'],
+            'refresh_token': tokens['refresh_token'],
             'user': {
                 'id': new_user.id,
                 'name': new_user.name,
@@ -62,6 +63,9 @@ def register():
                 'role': new_user.role
             }
         }), 201
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         print(f"Registration error: {str(e)}")
         traceback.print_exc()
@@ -69,6 +73,7 @@ def register():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limited('login', per_ip='20/minute', per_account='5/minute', per_route='300/minute', account_key=json_field('email'))
 def login():
     try:
         data = request.get_json()
@@ -98,22 +103,24 @@ def login():
             print(f"Demo account login: {user.email}")
         else:
             password_valid = user.check_password(data['password'])
+            # Stored hashes follow PASSWORD_HASH_METHOD the next time the user logs in
+            if password_valid and user.rehash_password_if_needed(data['password']):
+                print(f"Upgraded password hash for {user.email}")
             
         if not password_valid:
             print(f"Invalid password for user: {user.email}")
             return jsonify({'error': 'Invalid email or password'}), 401
 
-        # Create access token
-        access_token = create_access_token(
-            identity={'id': user.id, 'role': user.role},
-            expires_delta=timedelta(days=1)
-        )
+        # Create access and refresh tokens
+        tokens = auth_tokens.issue_tokens({'id': user.id, 'role': user.role}, version=user.version)
+        db.session.commit()
         
         print(f"Login successful for {user.email} with role {user.role}")
         
         # Ensure the complete response is returned correctly
         return jsonify({
-            'access_token': access_token,
+            'access_token': tokens['access_token'],
+            'refresh_token': tokens['refresh_token'],
             'user': {
                 'id': user.id,
                 'name': user.name,
@@ -122,37 +129,74 @@ def login():
             }
         }), 200
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         print(f"Login error: {str(e)}")
         traceback.print_exc()
+        db.session.rollback()
         return jsonify({'error': 'Authentication failed'}), 500
 
+@auth_bp.route('/refresh', methods=['POST'])
+@rate_limited('refresh', per_ip='60/minute')
+@jwt_required(refresh=True)
+def refresh():
+    """Exchange a refresh token for a new access/refresh pair without a password check"""
+    try:
+        family_id = auth_tokens.consume(get_jwt())
+        if not family_id:
+            # Persist the family revocation done by consume()
+            db.session.commit()
+            return jsonify({'error': 'Refresh token is no longer valid'}), 401
+
+        # Role and version come from the user row, so a change applies at the next refresh
+        user = db.session.get(User, get_jwt_identity()['id'])
+        if not user:
+            db.session.rollback()
+            return jsonify({'error': 'User not found'}), 401
+
+        tokens = auth_tokens.issue_tokens({'id': user.id, 'role': user.role}, family_id, user.version)
+        db.session.commit()
+        return jsonify(tokens), 200
+    except Exception as e:
+        print(f"Token refresh error: {str(e)}")
+        traceback.print_exc()
+        db.session.rollback()
+        return jsonify({'error': 'Token refresh failed'}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    """Revoke the refresh token family of this session"""
+    try:
+        family_id = get_jwt().get('fam')
+        if family_id:
+            auth_tokens.revoke_family(family_id)
+            db.session.commit()
+        return jsonify({'message': 'Logged out'}), 200
+    except Exception as e:
+        print(f"Logout error: {str(e)}")
+        traceback.print_exc()
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @auth_bp.route('/verify', methods=['GET'])
 @jwt_required()
 def verify_token():
     try:
         current_user = get_jwt_identity()
-        logger.info(f"Token verification request for user: {current_user}")
         
-        # Get full user information
-        user = User.query.get(current_user['id'])
+        # Served from the identity cache; only a miss or a newer token version reads the users table
+        user = identity_cache.get_user(current_user['id'], get_jwt().get('ver'))
         if not user:
             logger.warning(f"Token verification failed: User not found for id {current_user['id']}")
             return jsonify({'valid': False, 'error': 'User not found'}), 401
             
-        logger.info(f"Token verification successful for user {user.email}")
+        logger.debug(f"Token verification successful for user {user['email']}")
         return jsonify({
             'valid': True,
-            'user': {
-                'id': user.id,
-                'name': user.name,
-                'email': user.email,
-                'role': user.role,
-                'gender': user.gender,
-                'blood_group': user.blood_group,
-                'height': user.height,
-                'weight': user.weight
-            }
+            'user': user
         }), 200
     except Exception as e:
         logger.error(f"Token verification error: {str(e)}")
@@ -166,21 +210,12 @@ def get_profile():
         current_user = get_jwt_identity()
         
         # Get full user information
-        user = User.query.get(current_user['id'])
+        user = identity_cache.get_user(current_user['id'], get_jwt().get('ver'))
         if not user:
             return jsonify({'error': 'User not found'}), 404
             
         # Return user info
-        return jsonify({
-            'id': user.id,
-            'name': user.name,
-            'email': user.email,
-            'role': user.role,
-            'gender': user.gender,
-            'blood_group': user.blood_group,
-            'height': user.height,
-            'weight': user.weight
-        }), 200
+        return jsonify(user), 200
     except Exception as e:
         print(f"Get profile error: {str(e)}")
         traceback.print_exc()
@@ -0,0 +1,59 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from services import availability, schedule_conflicts
+from services.availability import AvailabilityError
+from datetime import datetime
+import traceback
+
+availability_bp = Blueprint('availability', __name__)
+
+MAX_SUGGESTIONS = 100
+
+
+@availability_bp.route('', methods=['GET'])
+@jwt_required()
+def find_free_slots():
+    """
+    Free slots with any trainer: ?start=&end= (ISO, local time),
+    duration_minutes (default 60), and optionally specialization, location,
+    day_start/day_end (HH:MM, default the opening hours) and limit. Members
+    only get slots that are free for them too; staff and trainers may pass
+    student_id for the same.
+    """
+    try:
+        current_user = get_jwt_identity()
+        args = request.args
+        if not args.get('start') or not args.get('end'):
+            return jsonify({'error': 'start and end are required'}), 400
+        try:
+            window_start = datetime.fromisoformat(args['start'])
+            window_end = datetime.fromisoformat(args['end'])
+        except ValueError:
+            return jsonify({'error': 'Invalid date format for start or end, use ISO format (YYYY-MM-DDTHH:MM:SS)'}), 400
+        try:
+            duration = schedule_conflicts.parse_duration(args.get('duration_minutes'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if current_user['role'] == 'student':
+            member_id = current_user['id']
+        else:
+            member_id = args.get('student_id', type=int)
+        limit = min(max(args.get('limit', 20, type=int), 1), MAX_SUGGESTIONS)
+
+        result = availability.search(
+            window_start, window_end, duration,
+            specialization=args.get('specialization'),
+            member_id=member_id,
+            location=args.get('location'),
+            day_start=availability.parse_clock(args['day_start']) if args.get('day_start') else None,
+            day_end=availability.parse_clock(args['day_end']) if args.get('day_end') else None,
+            limit=limit
+        )
+        return jsonify(result), 200
+    except AvailabilityError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Availability search error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
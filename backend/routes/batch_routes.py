@@ -0,0 +1,97 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+from werkzeug.exceptions import HTTPException
+from models import db
+from monitoring.tracing import tracer
+import traceback
+
+batch_bp = Blueprint('batch', __name__)
+
+ALLOWED_METHODS = {'GET', 'POST', 'PUT', 'DELETE'}
+
+
+def _dispatch(app, item, headers, environ_base):
+    """
+    Run one sub-request through the normal view function. The request context
+    is nested inside the batch's app context, so every sub-request shares the
+    batch's DB session and connection. Request hooks (logging, tracing root
+    span) run once for the batch, not per sub-request. A sub-request that
+    fails or answers non-2xx is rolled back, so changes it made to the shared
+    session before bailing out are not committed by a later sub-request.
+    """
+    method = str(item.get('method', 'GET')).upper()
+    path = item.get('path') or ''
+    if method not in ALLOWED_METHODS:
+        return 405, {'error': f'Method {method} not allowed in a batch'}
+    if not path.startswith('/api/') or path.startswith('/api/batch'):
+        return 400, {'error': 'Path must be an /api/ endpoint other than /api/batch'}
+    if path.split('?', 1)[0] == '/api/notifications/stream':
+        return 400, {'error': 'Event streams cannot be batched'}
+
+    kwargs = {'method': method, 'headers': headers, 'environ_base': environ_base}
+    if item.get('body') is not None:
+        kwargs['json'] = item['body']
+
+    with app.test_request_context(path, **kwargs) as ctx:
+        if ctx.request.routing_exception is not None:
+            error = ctx.request.routing_exception
+            return getattr(error, 'code', 404), {'error': getattr(error, 'description', 'Not found')}
+
+        rule = ctx.request.url_rule
+        with tracer.start_span(f"batch {method} {rule.rule}"):
+            try:
+                rv = app.ensure_sync(app.view_functions[rule.endpoint])(**ctx.request.view_args)
+            except HTTPException as e:
+                rv = jsonify({'error': e.description}), e.code
+            except Exception:
+                db.session.rollback()
+                raise
+            response = app.make_response(rv)
+        if not 200 <= response.status_code < 300:
+            db.session.rollback()
+
+    if response.is_json:
+        return response.status_code, response.get_json()
+    return response.status_code, response.get_data(as_text=True)
+
+
+@batch_bp.route('', methods=['POST'])
+@jwt_required()
+def batch():
+    """
+    Run several API calls in one round trip.
+
+    Body: {"requests": [{"id": "profile", "method": "GET", "path": "/api/student/profile"},
+                        {"id": "checkin", "method": "POST", "path": "/api/student/attendance", "body": {...}}]}
+    Sub-requests run in order with the caller's token and each result carries its own status.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('requests')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'requests must be a non-empty list'}), 400
+
+        limit = current_app.config.get('BATCH_MAX_REQUESTS', 20)
+        if len(items) > limit:
+            return jsonify({'error': f'At most {limit} requests per batch'}), 400
+
+        # Captured before nested request contexts replace `request`
+        app = current_app._get_current_object()
+        headers = {'Authorization': request.headers.get('Authorization', '')}
+        if request.headers.get('X-Forwarded-For'):
+            headers['X-Forwarded-For'] = request.headers['X-Forwarded-For']
+        environ_base = {'REMOTE_ADDR': request.remote_addr}
+
+        responses = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                responses.append({'id': index, 'status': 400, 'body': {'error': 'Each request must be an object'}})
+                continue
+            status, body = _dispatch(app, item, headers, environ_base)
+            responses.append({'id': item.get('id', index), 'status': status, 'body': body})
+
+        return jsonify({'responses': responses}), 200
+    except Exception as e:
+        print(f"Batch error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
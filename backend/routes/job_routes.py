@@ -0,0 +1,138 @@
+from flask import Blueprint, jsonify, request, send_file
+from flask_jwt_extended import get_jwt_identity
+from middleware.auth_middleware import admin_required, staff_required
+from models import db, Job
+from services import job_queue
+import os
+import traceback
+
+job_bp = Blueprint('jobs', __name__)
+
+# Kinds an admin may queue directly; the others are queued by the routes they belong to
+MAINTENANCE_KINDS = ('reconcile_counters', 'rebuild_member_summaries', 'expire_memberships')
+
+
+def _visible_job(job_id):
+    """The job if the caller queued it or is an admin, else None"""
+    current_user = get_jwt_identity()
+    job = db.session.get(Job, job_id)
+    if job is None or (current_user['role'] != 'admin' and job.created_by != current_user['id']):
+        return None
+    return job
+
+
+@job_bp.route('', methods=['GET'])
+@staff_required
+def list_jobs():
+    """Recent jobs, newest first: all of them for admins, the caller's own for staff (`status`, `kind`, `limit`)"""
+    try:
+        current_user = get_jwt_identity()
+        query = Job.query
+        if current_user['role'] != 'admin':
+            query = query.filter(Job.created_by == current_user['id'])
+        if request.args.get('status'):
+            query = query.filter(Job.status == request.args['status'])
+        if request.args.get('kind'):
+            query = query.filter(Job.kind == request.args['kind'])
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        return jsonify([job_queue.serialize(job) for job in query.order_by(Job.id.desc()).limit(limit)]), 200
+    except Exception as e:
+        print(f"List jobs error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@job_bp.route('', methods=['POST'])
+@admin_required
+def queue_maintenance():
+    """Queue a maintenance job. Body: {"kind": "reconcile_counters", "priority": "low"}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if data.get('kind') not in MAINTENANCE_KINDS:
+            return jsonify({'error': f"kind must be one of {', '.join(MAINTENANCE_KINDS)}"}), 400
+        try:
+            job = job_queue.enqueue(data['kind'], priority=data.get('priority', 'low'),
+                                    created_by=get_jwt_identity()['id'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        db.session.commit()
+        return jsonify(job_queue.serialize(job)), 202
+    except Exception as e:
+        db.session.rollback()
+        print(f"Queue job error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@job_bp.route('/stats', methods=['GET'])
+@admin_required
+def job_stats():
+    """Jobs per status and how long the oldest queued job has waited"""
+    try:
+        return jsonify(job_queue.stats()), 200
+    except Exception as e:
+        print(f"Job stats error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@job_bp.route('/<int:job_id>', methods=['GET'])
+@staff_required
+def get_job(job_id):
+    """Status, attempts and result of one job"""
+    job = _visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_queue.serialize(job)), 200
+
+
+@job_bp.route('/<int:job_id>/cancel', methods=['POST'])
+@staff_required
+def cancel_job(job_id):
+    """Cancel a job that has not started yet"""
+    try:
+        if _visible_job(job_id) is None:
+            return jsonify({'error': 'Job not found'}), 404
+        if not job_queue.cancel(job_id):
+            return jsonify({'error': 'Only queued jobs can be cancelled'}), 409
+        db.session.commit()
+        return jsonify(job_queue.serialize(db.session.get(Job, job_id))), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Cancel job error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@job_bp.route('/<int:job_id>/retry', methods=['POST'])
+@admin_required
+def retry_job(job_id):
+    """Queue a failed or cancelled job again"""
+    try:
+        if db.session.get(Job, job_id) is None:
+            return jsonify({'error': 'Job not found'}), 404
+        if not job_queue.retry(job_id):
+            return jsonify({'error': 'Only failed or cancelled jobs can be retried'}), 409
+        db.session.commit()
+        return jsonify(job_queue.serialize(db.session.get(Job, job_id))), 202
+    except Exception as e:
+        db.session.rollback()
+        print(f"Retry job error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@job_bp.route('/<int:job_id>/download', methods=['GET'])
+@staff_required
+def download_job_output(job_id):
+    """The file a finished export job wrote"""
+    job = _visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    result = job_queue.serialize(job)['result'] or {}
+    if job.status != 'succeeded' or 'filename' not in result:
+        return jsonify({'error': 'This job has no file to download'}), 409
+    path = os.path.abspath(job_queue.output_path(job.id, result['filename'].rsplit('.', 1)[-1]))
+    if not os.path.exists(path):
+        return jsonify({'error': 'The file has been removed'}), 410
+    return send_file(path, as_attachment=True, download_name=result['filename'])
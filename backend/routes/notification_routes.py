@@ -0,0 +1,119 @@
+from flask import Blueprint, Response, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from middleware.auth_middleware import admin_required
+from models import db
+from services import dashboards, notification_stream, unread_counters
+from services.notification_stream import EventStream, StreamLimitReached
+from datetime import datetime
+import traceback
+
+notification_bp = Blueprint('notifications', __name__)
+
+
+@notification_bp.route('/stream', methods=['GET'])
+@jwt_required()
+def stream():
+    """
+    Server-Sent Events for the caller: `notification` events carry the new
+    row (the SSE id is the notification id), `schedule` events a created,
+    updated or deleted session, `unread` the new badge count after a
+    mark-read, and `reset` asks the client to reload. A
+    reconnect with Last-Event-ID (or ?last_event_id=) first replays the
+    notifications created since. Streams end after SSE_MAX_CONNECTION_SECONDS
+    and clients reconnect, which also re-checks their token. 503 without
+    Retry-After when this deployment cannot serve streams; clients poll instead.
+    """
+    try:
+        reason = notification_stream.unavailable_reason()
+        if reason:
+            return jsonify({'error': reason}), 503
+        current_user = get_jwt_identity()
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            return jsonify({'error': 'Last-Event-ID must be a notification id'}), 400
+
+        try:
+            body = EventStream(current_user['id'])
+        except StreamLimitReached:
+            return jsonify({'error': 'Too many open streams, retry shortly'}), 503, {'Retry-After': '5'}
+        if last_event_id is not None:
+            try:
+                body.replay(notification_stream.replay_since(current_user['id'], last_event_id))
+            except Exception:
+                body.close()
+                raise
+
+        # The body needs no app context, so the request's session and DB
+        # connection are released at teardown, before the first event is sent
+        return Response(body, mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+    except Exception as e:
+        print(f"Notification stream error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@notification_bp.route('/stream/stats', methods=['GET'])
+@admin_required
+def stream_stats():
+    """Open streams in this worker"""
+    return jsonify(notification_stream.stats()), 200
+
+
+@notification_bp.route('/unread-count', methods=['GET'])
+@jwt_required()
+def unread_count():
+    """Badge count from the caller's notification_counter row, and whether /stream can be opened"""
+    try:
+        current_user = get_jwt_identity()
+        return jsonify({'unread': unread_counters.unread_count(current_user['id']),
+                        'stream': notification_stream.unavailable_reason() is None}), 200
+    except Exception as e:
+        print(f"Unread count error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@notification_bp.route('/read', methods=['POST'])
+@jwt_required()
+def mark_read():
+    """
+    Mark the caller's notifications read in one statement.
+
+    Body: {"from_id": 120, "to_id": 180} (either bound may be left out; one
+    notification is from_id == to_id) or {"before": "2024-05-01T00:00:00"}.
+    Returns how many were marked and the new unread count.
+    """
+    try:
+        current_user = get_jwt_identity()
+        data = request.get_json(silent=True) or {}
+        from_id, to_id, before = data.get('from_id'), data.get('to_id'), data.get('before')
+        if from_id is None and to_id is None and before is None:
+            return jsonify({'error': 'from_id/to_id or before is required'}), 400
+        for value in (from_id, to_id):
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                return jsonify({'error': 'from_id and to_id must be notification ids'}), 400
+        if before is not None:
+            try:
+                before = datetime.fromisoformat(str(before).replace('Z', ''))
+            except ValueError:
+                return jsonify({'error': 'before must be an ISO timestamp'}), 400
+
+        marked = unread_counters.mark_read(current_user['id'], from_id, to_id, before)
+        db.session.commit()
+        unread = unread_counters.unread_count(current_user['id'])
+        if marked:
+            # The UPDATE bypassed the session listener that drops cached dashboards
+            dashboards.invalidate_user(current_user['id'])
+            # Other open tabs of this user update their badge
+            notification_stream.publish([current_user['id']], 'unread', {'unread': unread})
+        return jsonify({'marked': marked, 'unread': unread}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Mark read error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
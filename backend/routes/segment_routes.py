@@ -0,0 +1,124 @@
+from flask import Blueprint, Response, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from middleware.auth_middleware import staff_required
+from models import db, User, Broadcast
+from services import segments, notifications, job_queue
+from services.segments import SegmentError
+from datetime import datetime
+import csv
+import io
+import traceback
+
+segment_bp = Blueprint('segments', __name__)
+
+SAMPLE_SIZE = 20
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _segment_from_request():
+    data = request.get_json(silent=True) or {}
+    if 'segment' not in data:
+        raise SegmentError('segment is required')
+    return data, data['segment']
+
+
+@segment_bp.route('/predicates', methods=['GET'])
+@staff_required
+def get_predicates():
+    """Statuses, departments and trainers segments can filter on"""
+    try:
+        return jsonify(segments.predicates()), 200
+    except Exception as e:
+        print(f"Segment predicates error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@segment_bp.route('/preview', methods=['POST'])
+@staff_required
+def preview_segment():
+    """Size of a segment and its first members"""
+    try:
+        _, segment = _segment_from_request()
+        members, elapsed_us = segments.evaluate(segment)
+        sample_ids = []
+        for member_id in members:
+            if len(sample_ids) == SAMPLE_SIZE:
+                break
+            sample_ids.append(member_id)
+        names = dict(db.session.query(User.id, User.name).filter(User.id.in_(sample_ids)).all()) if sample_ids else {}
+        return jsonify({
+            'count': len(members),
+            'sample': [{'id': member_id, 'name': names.get(member_id)} for member_id in sample_ids],
+            'evaluation_us': round(elapsed_us, 1)
+        }), 200
+    except SegmentError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Segment preview error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@segment_bp.route('/export', methods=['POST'])
+@staff_required
+def export_segment():
+    """
+    The members of a segment as CSV. With {"async": true} the file is
+    written by a background job instead and fetched from its download link.
+    """
+    try:
+        data, segment = _segment_from_request()
+        members, _ = segments.evaluate(segment)
+        if data.get('async'):
+            job = job_queue.enqueue('segment_export', {'segment': segment}, priority='low',
+                                    created_by=get_jwt_identity()['id'])
+            db.session.commit()
+            return jsonify({'count': len(members), 'job': job_queue.serialize(job)}), 202
+
+        output = io.StringIO()
+        segments.write_csv(members, csv.writer(output), EXPORT_CHUNK_SIZE)
+
+        filename = f"segment-{datetime.utcnow():%Y%m%d-%H%M%S}.csv"
+        return Response(output.getvalue(), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
+    except SegmentError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Segment export error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@segment_bp.route('/notify', methods=['POST'])
+@staff_required
+def notify_segment():
+    """Send a notification to every member of a segment"""
+    try:
+        data, segment = _segment_from_request()
+        if not data.get('title') or not data.get('message'):
+            return jsonify({'error': 'title and message are required'}), 400
+
+        members, _ = segments.evaluate(segment)
+        # The job evaluates the segment again when it sends, so members who joined meanwhile are included
+        record = Broadcast(title=data['title'], message=data['message'], audience='segment',
+                           created_by=get_jwt_identity()['id'], recipients=len(members), sent=0)
+        db.session.add(record)
+        db.session.flush()
+        job = job_queue.enqueue('broadcast', {'broadcast_id': record.id, 'segment': segment},
+                                created_by=get_jwt_identity()['id'])
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Notification queued',
+            'broadcast_id': record.id,
+            'recipients': record.recipients,
+            'job': job_queue.serialize(job)
+        }), 202
+    except SegmentError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Segment notify error: {str(e)}")
+        traceback.print_exc()
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
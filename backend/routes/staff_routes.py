@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, TrainingVideo, DietPlan, Equipment, Trainer, StudentProfile, Notification, Schedule
+from models import db, User, TrainingVideo, DietPlan, Equipment, Trainer, StudentProfile, Notification, Schedule, Broadcast
+from services import identity_cache, dashboards, member_summary, notifications, job_queue
+from middleware.auth_middleware import staff_required
 from datetime import datetime, timedelta
 import json
 import random
@@ -25,22 +27,7 @@ def staff_profile():
             print(f"Found user: {user}")
             
             if not user:
-                # For development - if the user doesn't exist but should, create a test staff user
-                print(f"User not found in DB, creating test staff user")
-                user = User(
-                    id=current_user['id'],
-                    name="Staff Member",
-                    email="staff@fitwell.com",
-                    role="staff",
-                    gender="Female",
-                    blood_group="B+",
-                    height=165,
-                    weight=60,
-                    created_at=datetime.utcnow()
-                )
-                user.set_password("staff")
-                db.session.add(user)
-                db.session.commit()
+                return jsonify({'error': 'User not found'}), 404
             
             return jsonify({
                 'id': user.id,
@@ -73,8 +60,10 @@ def staff_profile():
                 user.height = data['height']
             if 'weight' in data:
                 user.weight = data['weight']
+            identity_cache.bump_version(user)
             
             db.session.commit()
+            identity_cache.invalidate_user(user.id)
             return jsonify({'message': 'Profile updated successfully'}), 200
     except Exception as e:
         print(f"Error in staff_profile: {str(e)}")
@@ -133,6 +122,18 @@ def get_stats():
     
     return jsonify(stats), 200
 
+@staff_bp.route('/dashboard', methods=['GET'])
+@jwt_required()
+def staff_dashboard():
+    """Stats, activities and department updates in one cached payload"""
+    current_user = get_jwt_identity()
+    
+    # Verify user is staff
+    if current_user['role'] != 'staff':
+        return jsonify({'error': 'Unauthorized access'}), 403
+    
+    return jsonify(dashboards.get_dashboard('staff', current_user['id'])), 200
+
 @staff_bp.route('/activities', methods=['GET', 'POST'])
 @jwt_required()
 def manage_activities():
@@ -192,73 +193,6 @@ def manage_activities():
                     'location': activity.location or 'Main Gym'
                 })
         
-        # If no activities, create actual database records instead of just returning mock data
-        if not result:
-            # Get current timestamp for sample data
-            now = datetime.utcnow()
-            tomorrow = now + timedelta(days=1)
-            next_week = now + timedelta(days=7)
-            
-            # Create real database records for sample activities
-            sample_activities = [
-                {
-                    'title': 'Faculty Fitness Session',
-                    'description': 'Regular fitness session for faculty members',
-                    'scheduled_time': now.replace(hour=16, minute=0, second=0, microsecond=0),  # 4:00 PM today
-                    'location': 'Main Gym',
-                    'user_id': current_user['id']
-                },
-                {
-                    'title': 'Staff Yoga Class',
-                    'description': 'Morning yoga class for staff wellness',
-                    'scheduled_time': tomorrow.replace(hour=8, minute=30, second=0, microsecond=0),  # 8:30 AM tomorrow
-                    'location': 'Wellness Center',
-                    'user_id': current_user['id']
-                },
-                {
-                    'title': 'Department Meeting',
-                    'description': 'Regular department coordination meeting',
-                    'scheduled_time': next_week.replace(hour=14, minute=0, second=0, microsecond=0),  # 2:00 PM next week
-                    'location': 'Conference Room B',
-                    'user_id': current_user['id']
-                }
-            ]
-            
-            # Insert sample activities into database
-            for activity_data in sample_activities:
-                new_activity = Schedule(
-                    user_id=activity_data['user_id'],
-                    title=activity_data['title'],
-                    description=activity_data['description'],
-                    scheduled_time=activity_data['scheduled_time'],
-                    location=activity_data['location']
-                )
-                db.session.add(new_activity)
-            
-            # Commit the changes
-            db.session.commit()
-            
-            # Fetch the newly created activities
-            activities = Schedule.query.filter(
-                Schedule.user_id == current_user['id'],
-                Schedule.scheduled_time >= now,
-                Schedule.scheduled_time <= end_date
-            ).order_by(Schedule.scheduled_time).all()
-            
-            # Convert to JSON response
-            result = []
-            for activity in activities:
-                scheduled_time = activity.scheduled_time
-                
-                result.append({
-                    'id': activity.id,
-                    'title': activity.title,
-                    'date': scheduled_time.strftime('%Y-%m-%d'),
-                    'time': scheduled_time.strftime('%I:%M %p'),
-                    'participants': 8,  # This would be calculated from participants in a real app
-                    'location': activity.location or 'Main Gym'
-                })
-        
         return jsonify(result), 200
     
     elif request.method == 'POST':
@@ -319,60 +253,6 @@ def department_updates():
                 'is_read': notification.read
             })
         
-        # If no notifications, create actual database records instead of just returning mock data
-        if not result:
-            now = datetime.utcnow()
-            
-            # Create real database records for sample updates
-            sample_updates = [
-                {
-                    'title': 'Wellness Week Announcement',
-                    'message': 'Join us for a week of wellness activities starting next Monday.',
-                    'user_id': current_user['id'],
-                    'read': False
-                },
-                {
-                    'title': 'New Fitness Equipment Arrived',
-                    'message': 'Check out our new treadmills and weights in the gym.',
-                    'user_id': current_user['id'],
-                    'read': True
-                },
-                {
-                    'title': 'Faculty Yoga Session Reminder',
-                    'message': 'Don\'t forget the yoga session tomorrow morning.',
-                    'user_id': current_user['id'],
-                    'read': True
-                }
-            ]
-            
-            # Insert sample updates into database
-            for update_data in sample_updates:
-                new_notification = Notification(
-                    user_id=update_data['user_id'],
-                    title=update_data['title'],
-                    message=update_data['message'],
-                    read=update_data['read'],
-                    created_at=datetime.utcnow()
-                )
-                db.session.add(new_notification)
-            
-            # Commit the changes
-            db.session.commit()
-            
-            # Fetch the newly created notifications
-            notifications = Notification.query.filter_by(user_id=current_user['id']).order_by(Notification.created_at.desc()).limit(10).all()
-            
-            # Convert to JSON response
-            result = []
-            for notification in notifications:
-                result.append({
-                    'id': notification.id,
-                    'title': notification.title,
-                    'content': notification.message,
-                    'timestamp': notification.created_at.isoformat(),
-                    'is_read': notification.read
-                })
-        
         return jsonify(result), 200
     
     elif request.method == 'POST':
@@ -401,6 +281,38 @@ def department_updates():
             'is_read': new_notification.read
         }), 201
 
+@staff_bp.route('/broadcasts', methods=['GET', 'POST'])
+@staff_required
+def manage_broadcasts():
+    """Announce something to a whole audience, or list recent announcements"""
+    try:
+        current_user = get_jwt_identity()
+        
+        if request.method == 'GET':
+            broadcasts = Broadcast.query.order_by(Broadcast.created_at.desc()).limit(20).all()
+            return jsonify([notifications.serialize_broadcast(b) for b in broadcasts]), 200
+        
+        data = request.get_json() or {}
+        if not data.get('title') or not data.get('message'):
+            return jsonify({'error': 'title and message are required'}), 400
+        audience = data.get('audience', 'members')
+        if audience not in notifications.AUDIENCES:
+            return jsonify({'error': f"audience must be one of {', '.join(notifications.AUDIENCES)}"}), 400
+        
+        # The fan-out runs on the job worker; the Broadcast row shows its progress
+        record = Broadcast(title=data['title'], message=data['message'], audience=audience,
+                           created_by=current_user['id'], recipients=0, sent=0)
+        db.session.add(record)
+        db.session.flush()
+        job = job_queue.enqueue('broadcast', {'broadcast_id': record.id}, created_by=current_user['id'])
+        db.session.commit()
+        return jsonify({**notifications.serialize_broadcast(record), 'job': job_queue.serialize(job)}), 202
+    except Exception as e:
+        print(f"Broadcast error: {str(e)}")
+        traceback.print_exc()
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @staff_bp.route('/faculty', methods=['GET', 'POST'])
 @jwt_required()
 def get_faculty_members():
@@ -433,88 +345,6 @@ def get_faculty_members():
                 'joined_date': trainer.created_at.strftime('%Y-%m-%d')
             })
         
-        # If no trainers, create actual database records instead of just returning mock data
-        if not result:
-            # Create sample faculty user accounts
-            sample_faculty = [
-                {
-                    'name': 'John Smith',
-                    'email': 'john.smith@example.com',
-                    'department': 'Computer Science',
-                    'position': 'Professor'
-                },
-                {
-                    'name': 'Sarah Johnson',
-                    'email': 'sarah.johnson@example.com',
-                    'department': 'Mathematics',
-                    'position': 'Associate Professor'
-                },
-                {
-                    'name': 'Michael Brown',
-                    'email': 'michael.brown@example.com',
-                    'department': 'Physics',
-                    'position': 'Assistant Professor'
-                }
-            ]
-            
-            # Insert sample faculty into database
-            for faculty_data in sample_faculty:
-                # Check if user with this email already exists
-                existing_user = User.query.filter_by(email=faculty_data['email']).first()
-                if existing_user:
-                    continue
-                
-                # Create new user with trainer role
-                new_user = User(
-                    name=faculty_data['name'],
-                    email=faculty_data['email'],
-                    role='trainer',
-                    created_at=datetime.utcnow()
-                )
-                
-                # Set password using model method
-                new_user.set_password('changeme')
-                
-                # Add to session
-                db.session.add(new_user)
-                db.session.flush()  # Get the ID without committing yet
-                
-                # Create trainer profile
-                new_trainer = Trainer(
-                    user_id=new_user.id,
-                    specialization=faculty_data['position'],
-                    experience_years=3,  # Default
-                    bio="",
-                    schedule=""
-                )
-                db.session.add(new_trainer)
-            
-            # Commit all changes
-            db.session.commit()
-            
-            # Fetch all trainers again
-            trainers = User.query.filter_by(role='trainer').all()
-            
-            # Convert to JSON response
-            result = []
-            for trainer in trainers:
-                # Get trainer profile
-                trainer_profile = Trainer.query.filter_by(user_id=trainer.id).first()
-                
-                # Generate random participation for demonstration
-                import random
-                participation = f"{random.randint(30, 95)}%"
-                
-                result.append({
-                    'id': trainer.id,
-                    'name': trainer.name,
-                    'email': trainer.email,
-                    'department': 'Physical Education',  # This would come from a staff_profile table in a real app
-                    'position': trainer_profile.specialization if trainer_profile else 'Trainer',
-                    'participation': participation,
-                    'joined_date': trainer.created_at.strftime('%Y-%m-%d')
-                })
-        
         return jsonify(result), 200
     
     elif request.method == 'POST':
@@ -630,68 +460,6 @@ def manage_videos():
                     'created_at': video.created_at.isoformat()
                 })
             
-            # IMPORTANT: Create actual database records if none exist
-            if not result:
-                print("No videos found in database, creating initial records")
-                
-                # Create real database records instead of just returning mock data
-                sample_videos = [
-                    {
-                        'title': 'Basic Strength Training',
-                        'description': 'Learn the fundamentals of strength training with this comprehensive guide.',
-                        'video_url': 'https://www.youtube.com/embed/dQw4w9WgXcQ',
-                        'category': 'Strength,Beginner',
-                        'uploaded_by': current_user['id']
-                    },
-                    {
-                        'title': 'Cardio Workout for Beginners',
-                        'description': 'A gentle introduction to cardio exercises for beginners.',
-                        'video_url': 'https://www.youtube.com/embed/dQw4w9WgXcQ',
-                        'category': 'Cardio,Beginner',
-                        'uploaded_by': current_user['id']
-                    },
-                    {
-                        'title': 'Advanced Yoga Poses',
-                        'description': 'Master challenging yoga poses with this detailed tutorial.',
-                        'video_url': 'https://www.youtube.com/embed/dQw4w9WgXcQ',
-                        'category': 'Yoga,Advanced',
-                        'uploaded_by': current_user['id']
-                    }
-                ]
-                
-                # Insert sample videos into database
-                for video_data in sample_videos:
-                    new_video = TrainingVideo(
-                        title=video_data['title'],
-                        description=video_data['description'],
-                        video_url=video_data['video_url'],
-                        category=video_data['category'],
-                        uploaded_by=video_data['uploaded_by'],
-                        created_at=datetime.utcnow()
-                    )
-                    db.session.add(new_video)
-                
-                # Commit the changes
-                db.session.commit()
-                
-                # Fetch the newly created videos
-                videos = TrainingVideo.query.all()
-                
-                # Convert to JSON response
-                result = []
-                for video in videos:
-                    result.append({
-                        'id': video.id,
-                        'title': video.title,
-                        'description': video.description or '',
-                        'duration': '10:30',
-                        'thumbnail': 'https://via.placeholder.com/300x200',
-                        'url': video.video_url,
-                        'category': video.category,
-                        'tags': video.category.split(','),
-                        'created_at': video.created_at.isoformat()
-                    })
-            
             print(f"Returning {len(result)} videos")
             return jsonify(result), 200
         
@@ -783,134 +551,6 @@ def manage_diet_plans():
                     'created_at': plan.created_at.isoformat()
                 })
             
-            # IMPORTANT: Create actual database records if none exist
-            if not result:
-                print("No diet plans found in database, creating initial records")
-                
-                # Create real database records instead of just returning mock data
-                sample_plans = [
-                    {
-                        'title': 'Weight Loss Plan',
-                        'description': 'A balanced diet plan designed for healthy weight loss.',
-                        'calories': 1800,
-                        'protein': 150,
-                        'carbs': 150,
-                        'fat': 60,
-                        'created_by': current_user['id']
-                    },
-                    {
-                        'title': 'Muscle Building Plan',
-                        'description': 'High-protein diet plan to support muscle growth and recovery.',
-                        'calories': 2500,
-                        'protein': 200,
-                        'carbs': 250,
-                        'fat': 70,
-                        'created_by': current_user['id']
-                    },
-                    {
-                        'title': 'Vegetarian Plan',
-                        'description': 'Balanced vegetarian diet rich in plant-based proteins.',
-                        'calories': 2000,
-                        'protein': 120,
-                        'carbs': 220,
-                        'fat': 65,
-                        'created_by': current_user['id']
-                    }
-                ]
-                
-                # Insert sample diet plans into database
-                for plan_data in sample_plans:
-                    new_plan = DietPlan(
-                        title=plan_data['title'],
-                        description=plan_data['description'],
-                        calories=plan_data['calories'],
-                        protein=plan_data['protein'],
-                        carbs=plan_data['carbs'],
-                        fat=plan_data['fat'],
-                        created_by=plan_data['created_by'],
-                        created_at=datetime.utcnow()
-                    )
-                    db.session.add(new_plan)
-                
-                # Commit the changes
-                db.session.commit()
-                
-                # Fetch the newly created diet plans
-                plans = DietPlan.query.all()
-                
-                # Convert to JSON response
-                result = []
-                for plan in plans:
-                    # Get creator name
-                    creator = User.query.get(plan.created_by)
-                    creator_name = creator.name if creator else "Unknown"
-                    
-                    # Define meal structures based on plan type
-                    if 'Weight Loss' in plan.title:
-                        meals = [
-                            {
-                                "name": "Breakfast",
-                                "items": ["Egg white omelet", "Whole grain toast", "Fresh berries"],
-                                "time": "7:30 AM"
-                            },
-                            {
-                                "name": "Lunch",
-                                "items": ["Grilled chicken salad", "Quinoa", "Lemon water"],
-                                "time": "12:00 PM"
-                            },
-                            {
-                                "name": "Dinner",
-                                "items": ["Baked fish", "Steamed vegetables", "Brown rice"],
-                                "time": "6:30 PM"
-                            }
-                        ]
-                    elif 'Muscle Building' in plan.title:
-                        meals = [
-                            {
-                                "name": "Breakfast",
-                                "items": ["Protein shake", "Banana", "Oatmeal"],
-                                "time": "7:00 AM"
-                            },
-                            {
-                                "name": "Lunch",
-                                "items": ["Chicken breast", "Sweet potato", "Broccoli"],
-                                "time": "1:00 PM"
-                            },
-                            {
-                                "name": "Dinner",
-                                "items": ["Lean beef", "Quinoa", "Mixed vegetables"],
-                                "time": "7:00 PM"
-                            }
-                        ]
-                    else:
-                        meals = [
-                            {
-                                "name": "Breakfast",
-                                "items": ["Tofu scramble", "Avocado toast", "Fruit smoothie"],
-                                "time": "8:00 AM"
-                            },
-                            {
-                                "name": "Lunch",
-                                "items": ["Lentil soup", "Whole grain bread", "Green salad"],
-                                "time": "12:30 PM"
-                            },
-                            {
-                                "name": "Dinner",
-                                "items": ["Bean curry", "Brown rice", "Roasted vegetables"],
-                                "time": "6:30 PM"
-                            }
-                        ]
-                    
-                    result.append({
-                        'id': plan.id,
-                        'title': plan.title,
-                        'description': plan.description or '',
-                        'target': 'Weight management',
-                        'meals': meals,
-                        'created_by': creator_name,
-                        'created_at': plan.created_at.isoformat()
-                    })
-            
             print(f"Returning {len(result)} diet plans")
             return jsonify(result), 200
         
@@ -1001,12 +641,9 @@ def get_students():
     if current_user['role'] != 'staff' and current_user['role'] != 'admin':
         return jsonify({'error': 'Unauthorized access'}), 403
     
-    # Get all students
-    students = User.query.filter_by(role='student').all()
-    
+    # Students, their profile and activity summary in one query
     result = []
-    for student in students:
-        profile = StudentProfile.query.filter_by(user_id=student.id).first()
+    for student, profile, summary in member_summary.student_cards():
         student_data = {
             'id': student.id,
             'name': student.name,
@@ -1020,7 +657,9 @@ def get_students():
                 'height': student.height,
                 'weight': student.weight,
                 'fitness_goal': profile.fitness_goal,
-                'admission_date': profile.admission_date.isoformat() if profile.admission_date else None
+                'admission_date': profile.admission_date.isoformat() if profile.admission_date else None,
+                'membership_status': profile.membership_status,
+                'activity': member_summary.card(summary)
             }
         
         result.append(student_data)
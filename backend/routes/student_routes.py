@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, StudentProfile, TrainingVideo, DietPlan, Equipment, Trainer, WorkoutPlan, Attendance, MedicalRecord, Notification, Schedule, StudentDietPlan
+from models import db, User, StudentProfile, TrainingVideo, DietPlan, Equipment, Trainer, WorkoutPlan, Attendance, MedicalRecord, Notification, Schedule, StudentDietPlan, MemberSummary
 from middleware.auth_middleware import student_required
+from services import dashboards, member_summary, attendance_bitmap
+from utils.day_bitmap import DayBitmap
 import traceback
 from datetime import datetime, timedelta
 import json
@@ -42,6 +44,8 @@ def student_profile():
                 'medical_conditions': profile.medical_conditions,
                 'admission_date': profile.admission_date.isoformat() if profile.admission_date else None,
                 'membership_status': profile.membership_status,
+                'membership_start': profile.membership_start.isoformat() if profile.membership_start else None,
+                'membership_end': profile.membership_end.isoformat() if profile.membership_end else None,
                 'profile_status': 'created'
             }), 200
         
@@ -227,25 +231,36 @@ def get_workouts():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@student_bp.route('/dashboard', methods=['GET'])
+@student_required
+def student_dashboard():
+    """Attendance, progress, notifications and schedule in one cached payload"""
+    try:
+        current_user = get_jwt_identity()
+        return jsonify(dashboards.get_dashboard('student', current_user['id'])), 200
+    except Exception as e:
+        print(f"Student dashboard error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @student_bp.route('/attendance', methods=['GET', 'POST'])
 @student_required
 def get_attendance():
     try:
         current_user = get_jwt_identity()
         
-        # Get student profile - make sure to create one if it doesn't exist
         profile = StudentProfile.query.filter_by(user_id=current_user['id']).first()
-        if not profile:
-            # Create a new profile if it doesn't exist
-            profile = StudentProfile(
-                user_id=current_user['id'],
-                admission_date=datetime.utcnow()
-            )
-            db.session.add(profile)
-            db.session.commit()
-            print(f"Created new student profile for user {current_user['id']}")
         
         if request.method == 'GET':
+            # Reads never create rows; a student without a profile has no attendance yet
+            if not profile:
+                return jsonify({
+                    'attendance_records': [],
+                    'attendance_percentage': 0,
+                    'days_present': 0,
+                    'total_days': 0
+                }), 200
+            
             try:
                 # Get attendance for the last 30 days
                 end_date = datetime.now().date()
@@ -286,6 +301,16 @@ def get_attendance():
         
         elif request.method == 'POST':
             try:
+                # Create the student profile on first check-in
+                if not profile:
+                    profile = StudentProfile(
+                        user_id=current_user['id'],
+                        admission_date=datetime.utcnow()
+                    )
+                    db.session.add(profile)
+                    db.session.flush()
+                    print(f"Created new student profile for user {current_user['id']}")
+                
                 # Register attendance for the current day
                 today = datetime.now().date()
                 
@@ -330,41 +355,14 @@ def workout_progress():
         if request.method == 'GET':
             # Get student profile
             profile = StudentProfile.query.filter_by(user_id=current_user['id']).first()
-            if not profile:
-                # Create a profile if it doesn't exist
-                profile = StudentProfile(
-                    user_id=current_user['id'],
-                    admission_date=datetime.utcnow()
-                )
-                db.session.add(profile)
-                db.session.commit()
-                print(f"Created new student profile for progress tracking: {current_user['id']}")
-            
-            # Calculate streak by analyzing consecutive attendance days
-            today = datetime.now().date()
-            start_date = today - timedelta(days=90)  # Check up to 90 days back
-            
-            # Get attendance records in descending order
-            attendances = Attendance.query.filter_by(student_id=profile.id)\
-                .filter(Attendance.date >= start_date)\
-                .order_by(Attendance.date.desc())\
-                .all()
-                
-            # Calculate streak
-            streak = 0
-            if attendances:
-                # Check if most recent attendance is today or yesterday
-                if attendances[0].date == today or attendances[0].date == today - timedelta(days=1):
-                    streak = 1
-                    for i in range(len(attendances) - 1):
-                        # If dates are consecutive, increment streak
-                        if attendances[i].date - attendances[i+1].date == timedelta(days=1):
-                            streak += 1
-                        else:
-                            break
+            # Without a profile there is no attendance; report zeros rather than creating one
+            profile_id = profile.id if profile else None
             
-            # Calculate workouts completed
-            workouts_completed = WorkoutPlan.query.filter_by(assigned_to=current_user['id']).count()
+            # Streak and plan counts come from the member's summary row instead of walking attendance
+            summary = MemberSummary.query.get(profile_id) if profile_id else None
+            activity = member_summary.card(summary)
+            streak = activity['current_streak'] if activity else 0
+            workouts_completed = activity['workout_plans'] if activity else 0
             
             # Calculate hours logged (placeholder - in a real app would be from a workout log)
             hours_logged = workouts_completed * 2  # Assuming 2 hours per workout
@@ -372,6 +370,8 @@ def workout_progress():
             # Calculate monthly progress (in a real app, this would be from actual progress tracking)
             # Using attendance percentage as a proxy for progress
             monthly_progress = []
+            # One bitmap read replaces a query per month
+            present_days, recorded_days = attendance_bitmap.load(profile_id) if profile_id else (DayBitmap(), DayBitmap())
             
             # Get data for the last 4 months
             for i in range(4):
@@ -381,14 +381,9 @@ def workout_progress():
                 next_month = month_start.replace(month=month_start.month % 12 + 1) if month_start.month < 12 else month_start.replace(year=month_start.year + 1, month=1)
                 month_end = next_month - timedelta(days=1)
                 
-                # Get attendance for this month
-                month_attendances = Attendance.query.filter_by(student_id=profile.id)\
-                    .filter(Attendance.date >= month_start.date(), Attendance.date <= month_end.date())\
-                    .all()
-                
                 # Calculate attendance percentage
-                month_present = sum(1 for a in month_attendances if a.status == 'present')
-                month_total = len(month_attendances)
+                month_present = present_days.count(month_start.date(), month_end.date())
+                month_total = recorded_days.count(month_start.date(), month_end.date())
                 month_percentage = round((month_present / month_total * 100) if month_total > 0 else 0)
                 
                 monthly_progress.append({
@@ -409,7 +404,8 @@ def workout_progress():
                 'streak': streak,
                 'workouts_completed': workouts_completed,
                 'hours_logged': hours_logged,
-                'monthly_progress': monthly_progress
+                'monthly_progress': monthly_progress,
+                'activity': activity
             }
             
             return jsonify(progress_data), 200
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, User, Trainer, StudentProfile, WorkoutPlan, MedicalRecord, TrainingVideo, DietPlan, StudentDietPlan, Schedule
 from middleware.auth_middleware import trainer_required
+from services import dashboards, member_summary, schedule_conflicts
 import traceback
 from datetime import datetime, timedelta
 
@@ -271,12 +272,9 @@ def manage_medical_records():
 @trainer_required
 def get_students():
     try:
-        # Get all students
-        students = User.query.filter_by(role='student').all()
-        
+        # Students, their profile and activity summary in one query
         result = []
-        for student in students:
-            profile = StudentProfile.query.filter_by(user_id=student.id).first()
+        for student, profile, summary in member_summary.student_cards():
             student_data = {
                 'id': student.id,
                 'name': student.name,
@@ -288,7 +286,9 @@ def get_students():
                     'age': profile.age,
                     'fitness_goal': profile.fitness_goal,
                     'medical_conditions': profile.medical_conditions,
-                    'admission_date': profile.admission_date.isoformat() if profile.admission_date else None
+                    'admission_date': profile.admission_date.isoformat() if profile.admission_date else None,
+                    'membership_status': profile.membership_status,
+                    'activity': member_summary.card(summary)
                 })
                 
             result.append(student_data)
@@ -587,17 +587,9 @@ def manage_schedule():
             # Get schedules created by this trainer
             trainer = Trainer.query.filter_by(user_id=current_user['id']).first()
             
-            # Auto-create trainer profile if it doesn't exist
+            # A trainer without a profile has no sessions yet
             if not trainer:
-                trainer = Trainer(
-                    user_id=current_user['id'],
-                    specialization="General Training",
-                    experience_years=1,
-                    bio="Trainer profile"
-                )
-                db.session.add(trainer)
-                db.session.commit()
-                print(f"Created trainer profile for user {current_user['id']}")
+                return jsonify([]), 200
                 
             # Get all schedules associated with this trainer
             schedules = Schedule.query.filter_by(trainer_id=trainer.id).all()
@@ -617,6 +609,8 @@ def manage_schedule():
                     'student_id': schedule.user_id,
                     'student_name': student.name if student else 'Unknown',
                     'scheduled_time': schedule.scheduled_time.isoformat() if schedule.scheduled_time else None,
+                    'duration_minutes': schedule.duration_minutes,
+                    'ends_at': schedule.ends_at.isoformat() if schedule.ends_at else None,
                     'location': schedule.location,
                     'created_at': schedule.created_at.isoformat() if schedule.created_at else None
                 })
@@ -653,6 +647,20 @@ def manage_schedule():
                 scheduled_time = datetime.fromisoformat(data['scheduled_time'])
             except ValueError:
                 return jsonify({'error': 'Invalid date format for scheduled_time, use ISO format (YYYY-MM-DDTHH:MM:SS)'}), 400
+            try:
+                duration = schedule_conflicts.parse_duration(data.get('duration_minutes'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            location = data.get('location', 'Main Gym')
+
+            # Refuse double bookings of the trainer, the student or the room
+            schedule_conflicts.lock_parties([trainer.id], [student.id], [location])
+            conflicts = schedule_conflicts.find([{'scheduled_time': scheduled_time, 'duration_minutes': duration,
+                                                  'trainer_id': trainer.id, 'user_id': student.id,
+                                                  'location': location}])
+            if conflicts:
+                db.session.rollback()
+                return jsonify({'error': 'The session overlaps another booking', 'conflicts': conflicts}), 409
                 
             # Create the schedule
             new_schedule = Schedule(
@@ -661,7 +669,8 @@ def manage_schedule():
                 user_id=data['student_id'],
                 trainer_id=trainer.id,
                 scheduled_time=scheduled_time,
-                location=data.get('location', 'Main Gym'),
+                duration_minutes=duration,
+                location=location,
                 created_at=datetime.utcnow()
             )
             
@@ -700,18 +709,37 @@ def manage_schedule():
             elif schedule.trainer_id != trainer.id:
                 return jsonify({'error': 'Not authorized to update this schedule'}), 403
                 
+            # Validate the new time, length and place before changing anything
+            scheduled_time = schedule.scheduled_time
+            duration = schedule.duration_minutes
+            location = data.get('location', schedule.location)
+            if 'scheduled_time' in data:
+                try:
+                    scheduled_time = datetime.fromisoformat(data['scheduled_time'])
+                except ValueError:
+                    return jsonify({'error': 'Invalid date format for scheduled_time, use ISO format (YYYY-MM-DDTHH:MM:SS)'}), 400
+            if 'duration_minutes' in data:
+                try:
+                    duration = schedule_conflicts.parse_duration(data['duration_minutes'])
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+            if (scheduled_time, duration, location) != (schedule.scheduled_time, schedule.duration_minutes, schedule.location):
+                schedule_conflicts.lock_parties([schedule.trainer_id], [schedule.user_id], [location])
+                conflicts = schedule_conflicts.find([{'scheduled_time': scheduled_time, 'duration_minutes': duration,
+                                                      'trainer_id': schedule.trainer_id, 'user_id': schedule.user_id,
+                                                      'location': location}], exclude_ids=[schedule.id])
+                if conflicts:
+                    db.session.rollback()
+                    return jsonify({'error': 'The session overlaps another booking', 'conflicts': conflicts}), 409
+
             # Update fields
             if 'title' in data:
                 schedule.title = data['title']
             if 'description' in data:
                 schedule.description = data['description']
-            if 'location' in data:
-                schedule.location = data['location']
-            if 'scheduled_time' in data:
-                try:
-                    schedule.scheduled_time = datetime.fromisoformat(data['scheduled_time'])
-                except ValueError:
-                    return jsonify({'error': 'Invalid date format for scheduled_time, use ISO format (YYYY-MM-DDTHH:MM:SS)'}), 400
+            schedule.location = location
+            schedule.scheduled_time = scheduled_time
+            schedule.duration_minutes = duration
             
             db.session.commit()
             
@@ -757,6 +785,86 @@ def manage_schedule():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@trainer_bp.route('/schedule/bulk', methods=['POST'])
+@trainer_required
+def create_schedules_bulk():
+    """Create many sessions in one transaction; none are created if any of them conflicts"""
+    try:
+        current_user = get_jwt_identity()
+        data = request.get_json() or {}
+        items = data.get('sessions')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'sessions must be a non-empty list'}), 400
+        if len(items) > schedule_conflicts.bulk_max():
+            return jsonify({'error': f"At most {schedule_conflicts.bulk_max()} sessions per request"}), 400
+
+        # Validate every item before touching the database
+        sessions = []
+        for position, item in enumerate(items):
+            if not isinstance(item, dict) or not all(k in item for k in ('title', 'student_id', 'scheduled_time')):
+                return jsonify({'error': f"Session {position}: missing required fields (title, student_id, scheduled_time)"}), 400
+            try:
+                student_id = int(item['student_id'])
+                scheduled_time = datetime.fromisoformat(item['scheduled_time'])
+            except (TypeError, ValueError):
+                return jsonify({'error': f"Session {position}: invalid student_id or scheduled_time, use ISO format (YYYY-MM-DDTHH:MM:SS)"}), 400
+            try:
+                duration = schedule_conflicts.parse_duration(item.get('duration_minutes'))
+            except ValueError as e:
+                return jsonify({'error': f"Session {position}: {str(e)}"}), 400
+            sessions.append({
+                'title': item['title'],
+                'description': item.get('description', ''),
+                'user_id': student_id,
+                'scheduled_time': scheduled_time,
+                'duration_minutes': duration,
+                'location': item.get('location', 'Main Gym')
+            })
+
+        # Verify the students with one query
+        student_ids = {session['user_id'] for session in sessions}
+        found = {user.id for user in User.query.filter(User.id.in_(student_ids), User.role == 'student').all()}
+        missing = sorted(student_ids - found)
+        if missing:
+            return jsonify({'error': 'Student not found', 'student_ids': missing}), 404
+
+        # Get the trainer ID - auto-create if needed
+        trainer = Trainer.query.filter_by(user_id=current_user['id']).first()
+        if not trainer:
+            trainer = Trainer(
+                user_id=current_user['id'],
+                specialization="General Training",
+                experience_years=1,
+                bio="Trainer profile"
+            )
+            db.session.add(trainer)
+            db.session.commit()
+        for session in sessions:
+            session['trainer_id'] = trainer.id
+
+        # One set-wise check: against stored sessions and within the batch
+        schedule_conflicts.lock_parties([trainer.id], student_ids, [session['location'] for session in sessions])
+        conflicts = schedule_conflicts.find(sessions)
+        if conflicts:
+            db.session.rollback()
+            return jsonify({'error': 'Some sessions overlap other bookings', 'conflicts': conflicts}), 409
+
+        now = datetime.utcnow()
+        schedules = [Schedule(created_at=now, **session) for session in sessions]
+        db.session.add_all(schedules)
+        db.session.commit()
+
+        return jsonify({
+            'message': f"{len(schedules)} schedules created successfully",
+            'schedule_ids': [schedule.id for schedule in schedules]
+        }), 201
+
+    except Exception as e:
+        print(f"Bulk schedule error: {str(e)}")
+        traceback.print_exc()
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @trainer_bp.route('/students-for-scheduling', methods=['GET'])
 @trainer_required
 def get_students_for_scheduling():
@@ -855,17 +963,9 @@ def manage_workout_sessions():
             # Get workout sessions created by this trainer
             trainer = Trainer.query.filter_by(user_id=current_user['id']).first()
             
-            # Auto-create trainer profile if it doesn't exist
+            # A trainer without a profile has no sessions yet
             if not trainer:
-                trainer = Trainer(
-                    user_id=current_user['id'],
-                    specialization="General Training",
-                    experience_years=1,
-                    bio="Trainer profile"
-                )
-                db.session.add(trainer)
-                db.session.commit()
-                print(f"Created trainer profile for user {current_user['id']}")
+                return jsonify([]), 200
             
             # Get all workout sessions associated with this trainer
             # In a real app, you would query a WorkoutSession model
@@ -974,6 +1074,18 @@ def manage_workout_sessions():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@trainer_bp.route('/dashboard', methods=['GET'])
+@trainer_required
+def trainer_dashboard():
+    """Dashboard stats, schedule and notifications in one cached payload"""
+    try:
+        current_user = get_jwt_identity()
+        return jsonify(dashboards.get_dashboard('trainer', current_user['id'])), 200
+    except Exception as e:
+        print(f"Trainer dashboard error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @trainer_bp.route('/dashboard/stats', methods=['GET'])
 @trainer_required
 def trainer_dashboard_stats():
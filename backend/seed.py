@@ -0,0 +1,315 @@
+import argparse
+import sys
+import traceback
+from datetime import datetime, timedelta
+
+from app import create_app
+from models import db, User, StudentProfile, Trainer, Schedule, Notification, TrainingVideo, DietPlan
+from migrations.runner import MigrationRunner
+
+# User creation helper functions
+def create_default_admin():
+    # Check if admin exists
+    admin = User.query.filter_by(email="admin@fitwell.com").first()
+    if not admin:
+        admin = User(
+            name="Admin User",
+            email="admin@fitwell.com",
+            role="admin",
+            created_at=datetime.utcnow()
+        )
+        admin.set_password("admin")
+        db.session.add(admin)
+        db.session.commit()
+        print("Created default admin user")
+    return admin
+
+def create_test_student():
+    # Check if test student exists
+    student = User.query.filter_by(email="student@fitwell.com").first()
+    if not student:
+        student = User(
+            name="Test Student",
+            email="student@fitwell.com",
+            role="student",
+            gender="Male",
+            blood_group="A+",
+            height=175,
+            weight=70,
+            created_at=datetime.utcnow()
+        )
+        student.set_password("student")
+        db.session.add(student)
+        db.session.flush()
+
+        # Create student profile
+        profile = StudentProfile(
+            user_id=student.id,
+            age=20,
+            fitness_goal="Stay fit and healthy",
+            medical_conditions="None",
+            admission_date=datetime.utcnow(),
+            department="Computer Science",
+            membership_status="active"
+        )
+        db.session.add(profile)
+        db.session.commit()
+        print("Created test student user")
+    return student
+
+def create_test_staff():
+    # Check if test staff exists
+    staff = User.query.filter_by(email="staff@fitwell.com").first()
+    if not staff:
+        staff = User(
+            name="Staff Member",
+            email="staff@fitwell.com",
+            role="staff",
+            gender="Female",
+            blood_group="B+",
+            height=165,
+            weight=60,
+            created_at=datetime.utcnow()
+        )
+        staff.set_password("staff")
+        db.session.add(staff)
+        db.session.commit()
+        print("Created test staff user")
+    return staff
+
+def create_test_trainer():
+    # Check if test trainer exists
+    trainer = User.query.filter_by(email="trainer@fitwell.com").first()
+    if not trainer:
+        trainer = User(
+            name="Fitness Trainer",
+            email="trainer@fitwell.com",
+            role="trainer",
+            gender="Male",
+            blood_group="O+",
+            height=180,
+            weight=75,
+            created_at=datetime.utcnow()
+        )
+        trainer.set_password("trainer")
+        db.session.add(trainer)
+        db.session.flush()
+
+        # Create trainer profile
+        profile = Trainer(
+            user_id=trainer.id,
+            specialization="Weight Training",
+            experience_years=5,
+            bio="Experienced fitness trainer with focus on strength training",
+            schedule="Monday-Friday, 9 AM - 5 PM"
+        )
+        db.session.add(profile)
+        db.session.commit()
+        print("Created test trainer user")
+    return trainer
+
+# Sample data, formerly inserted by the staff GET endpoints when a list was empty.
+# Every helper checks for its own rows first, so re-running is a no-op.
+def seed_sample_activities(staff):
+    now = datetime.utcnow()
+    tomorrow = now + timedelta(days=1)
+    next_week = now + timedelta(days=7)
+    sample_activities = [
+        {
+            'title': 'Faculty Fitness Session',
+            'description': 'Regular fitness session for faculty members',
+            'scheduled_time': now.replace(hour=16, minute=0, second=0, microsecond=0),  # 4:00 PM today
+            'location': 'Main Gym'
+        },
+        {
+            'title': 'Staff Yoga Class',
+            'description': 'Morning yoga class for staff wellness',
+            'scheduled_time': tomorrow.replace(hour=8, minute=30, second=0, microsecond=0),  # 8:30 AM tomorrow
+            'location': 'Wellness Center'
+        },
+        {
+            'title': 'Department Meeting',
+            'description': 'Regular department coordination meeting',
+            'scheduled_time': next_week.replace(hour=14, minute=0, second=0, microsecond=0),  # 2:00 PM next week
+            'location': 'Conference Room B'
+        }
+    ]
+
+    created = 0
+    for activity_data in sample_activities:
+        if Schedule.query.filter_by(user_id=staff.id, title=activity_data['title']).first():
+            continue
+        db.session.add(Schedule(user_id=staff.id, **activity_data))
+        created += 1
+    db.session.commit()
+    print(f"Sample activities: {created} created")
+
+def seed_sample_updates(staff):
+    sample_updates = [
+        {
+            'title': 'Wellness Week Announcement',
+            'message': 'Join us for a week of wellness activities starting next Monday.',
+            'read': False
+        },
+        {
+            'title': 'New Fitness Equipment Arrived',
+            'message': 'Check out our new treadmills and weights in the gym.',
+            'read': True
+        },
+        {
+            'title': 'Faculty Yoga Session Reminder',
+            'message': 'Don\'t forget the yoga session tomorrow morning.',
+            'read': True
+        }
+    ]
+
+    created = 0
+    for update_data in sample_updates:
+        if Notification.query.filter_by(user_id=staff.id, title=update_data['title']).first():
+            continue
+        db.session.add(Notification(user_id=staff.id, created_at=datetime.utcnow(), **update_data))
+        created += 1
+    db.session.commit()
+    print(f"Sample department updates: {created} created")
+
+def seed_sample_faculty():
+    sample_faculty = [
+        {'name': 'John Smith', 'email': 'john.smith@example.com', 'position': 'Professor'},
+        {'name': 'Sarah Johnson', 'email': 'sarah.johnson@example.com', 'position': 'Associate Professor'},
+        {'name': 'Michael Brown', 'email': 'michael.brown@example.com', 'position': 'Assistant Professor'}
+    ]
+
+    created = 0
+    for faculty_data in sample_faculty:
+        if User.query.filter_by(email=faculty_data['email']).first():
+            continue
+
+        new_user = User(
+            name=faculty_data['name'],
+            email=faculty_data['email'],
+            role='trainer',
+            created_at=datetime.utcnow()
+        )
+        new_user.set_password('changeme')
+        db.session.add(new_user)
+        db.session.flush()  # Get the ID without committing yet
+
+        db.session.add(Trainer(
+            user_id=new_user.id,
+            specialization=faculty_data['position'],
+            experience_years=3,  # Default
+            bio="",
+            schedule=""
+        ))
+        created += 1
+    db.session.commit()
+    print(f"Sample faculty members: {created} created")
+
+def seed_sample_videos(uploader):
+    sample_videos = [
+        {
+            'title': 'Basic Strength Training',
+            'description': 'Learn the fundamentals of strength training with this comprehensive guide.',
+            'video_url': 'https://www.youtube.com/embed/dQw4w9WgXcQ',
+            'category': 'Strength,Beginner'
+        },
+        {
+            'title': 'Cardio Workout for Beginners',
+            'description': 'A gentle introduction to cardio exercises for beginners.',
+            'video_url': 'https://www.youtube.com/embed/dQw4w9WgXcQ',
+            'category': 'Cardio,Beginner'
+        },
+        {
+            'title': 'Advanced Yoga Poses',
+            'description': 'Master challenging yoga poses with this detailed tutorial.',
+            'video_url': 'https://www.youtube.com/embed/dQw4w9WgXcQ',
+            'category': 'Yoga,Advanced'
+        }
+    ]
+
+    created = 0
+    for video_data in sample_videos:
+        if TrainingVideo.query.filter_by(title=video_data['title']).first():
+            continue
+        db.session.add(TrainingVideo(uploaded_by=uploader.id, created_at=datetime.utcnow(), **video_data))
+        created += 1
+    db.session.commit()
+    print(f"Sample videos: {created} created")
+
+def seed_sample_diet_plans(creator):
+    sample_plans = [
+        {
+            'title': 'Weight Loss Plan',
+            'description': 'A balanced diet plan designed for healthy weight loss.',
+            'calories': 1800,
+            'protein': 150,
+            'carbs': 150,
+            'fat': 60
+        },
+        {
+            'title': 'Muscle Building Plan',
+            'description': 'High-protein diet plan to support muscle growth and recovery.',
+            'calories': 2500,
+            'protein': 200,
+            'carbs': 250,
+            'fat': 70
+        },
+        {
+            'title': 'Vegetarian Plan',
+            'description': 'Balanced vegetarian diet rich in plant-based proteins.',
+            'calories': 2000,
+            'protein': 120,
+            'carbs': 220,
+            'fat': 65
+        }
+    ]
+
+    created = 0
+    for plan_data in sample_plans:
+        if DietPlan.query.filter_by(title=plan_data['title']).first():
+            continue
+        db.session.add(DietPlan(created_by=creator.id, created_at=datetime.utcnow(), **plan_data))
+        created += 1
+    db.session.commit()
+    print(f"Sample diet plans: {created} created")
+
+def seed_sample_data():
+    staff = create_test_staff()
+    seed_sample_activities(staff)
+    seed_sample_updates(staff)
+    seed_sample_faculty()
+    seed_sample_videos(staff)
+    seed_sample_diet_plans(staff)
+
+# Initialize database function
+def init_database(app, with_samples=False):
+    try:
+        with app.app_context():
+            # Bring the schema up to date through the versioned migrations
+            if not MigrationRunner(db).upgrade():
+                return False
+            print("Database schema is up to date")
+
+            # Create default users
+            create_default_admin()
+            create_test_student()
+            create_test_staff()
+            create_test_trainer()
+
+            if with_samples:
+                seed_sample_data()
+
+            print("Database initialization completed")
+            return True
+    except Exception as e:
+        print(f"Database initialization error: {str(e)}")
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create the schema, demo accounts and optional sample data')
+    parser.add_argument('--with-samples', action='store_true', help='also add sample activities, updates, faculty, videos and diet plans')
+    args = parser.parse_args()
+
+    if not init_database(create_app(), args.with_samples):
+        sys.exit(1)
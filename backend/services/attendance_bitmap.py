@@ -0,0 +1,140 @@
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import event, inspect, select
+
+from models import db, Attendance, AttendanceBitmap, StudentProfile
+from utils.day_bitmap import DayBitmap
+
+# attendance_bitmap mirrors each profile's attendance rows as two day bitmaps:
+# the days marked present and the days with any row, sharing one start date.
+# A session listener re-reads the (profile, day) pairs a flush touched and
+# sets or clears those bits on the same connection, so the bitmaps commit or
+# roll back with the attendance rows. A deleted profile's row goes in
+# before_flush, ahead of the profile's DELETE that its foreign key would
+# otherwise block. Rows written with raw SQL need a rebuild
+# (jobs/rebuild_attendance_bitmaps.py).
+
+bitmap_table = AttendanceBitmap.__table__
+attendance_table = Attendance.__table__
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _apply_changes):
+        event.listen(db.session, 'after_flush', _apply_changes)
+        event.listen(db.session, 'before_flush', _remove_deleted_profiles)
+
+
+def _values(obj, attribute):
+    history = inspect(obj).attrs[attribute].history
+    values = {getattr(obj, attribute)}
+    values.update(history.deleted)
+    values.discard(None)
+    return values
+
+
+def _deleted_profiles(session):
+    return {obj.id for obj in session.deleted if isinstance(obj, StudentProfile) and obj.id is not None}
+
+
+def _remove_deleted_profiles(session, flush_context, instances):
+    removed = _deleted_profiles(session)
+    if removed:
+        session.connection().execute(bitmap_table.delete().where(bitmap_table.c.profile_id.in_(removed)))
+
+
+def _apply_changes(session, flush_context):
+    touched = defaultdict(set)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Attendance) and (obj not in session.dirty or session.is_modified(obj)):
+            for profile_id in _values(obj, 'student_id'):
+                touched[profile_id].update(_values(obj, 'date'))
+    for profile_id in _deleted_profiles(session):
+        touched.pop(profile_id, None)
+    if not touched:
+        return
+
+    connection = session.connection()
+    all_days = set().union(*touched.values())
+    statuses = defaultdict(set)
+    for profile_id, day, status in connection.execute(
+        select(attendance_table.c.student_id, attendance_table.c.date, attendance_table.c.status)
+        .where(attendance_table.c.student_id.in_(list(touched)), attendance_table.c.date.in_(all_days))
+    ):
+        statuses[(profile_id, day)].add(status)
+
+    # Fixed order so two writers cannot deadlock on each other's bitmap rows
+    for profile_id in sorted(touched):
+        existing, present, recorded = _read(connection, profile_id, for_update=True)
+        for day in touched[profile_id]:
+            day_statuses = statuses.get((profile_id, day), ())
+            if 'present' in day_statuses:
+                present.add(day)
+            else:
+                present.discard(day)
+            if day_statuses:
+                recorded.add(day)
+            else:
+                recorded.discard(day)
+        _write(connection, profile_id, present, recorded, existing)
+
+
+def _read(connection, profile_id, for_update=False):
+    query = select(bitmap_table).where(bitmap_table.c.profile_id == profile_id)
+    row = connection.execute(query.with_for_update() if for_update else query).first()
+    if row is None:
+        return False, DayBitmap(), DayBitmap()
+    return True, DayBitmap.from_bytes(row.start_date, row.present), DayBitmap.from_bytes(row.start_date, row.recorded)
+
+
+def _write(connection, profile_id, present, recorded, existing):
+    # Both bitmaps are stored against one start date
+    if present.start is not None and recorded.start is not None:
+        start = min(present.start, recorded.start)
+        present.rebase(start)
+        recorded.rebase(start)
+    values = {
+        'start_date': recorded.start or present.start,
+        'present': present.to_bytes(),
+        'recorded': recorded.to_bytes(),
+        'updated_at': datetime.utcnow()
+    }
+    if existing:
+        connection.execute(bitmap_table.update().where(bitmap_table.c.profile_id == profile_id).values(**values))
+    else:
+        connection.execute(bitmap_table.insert().values(profile_id=profile_id, **values))
+
+
+def load(profile_id):
+    """(present, recorded) DayBitmaps of a profile; empty bitmaps when it has no attendance"""
+    _, present, recorded = _read(db.session.connection(), profile_id)
+    return present, recorded
+
+
+def load_many(profile_ids=None):
+    """{profile_id: (present, recorded)} for the given profiles, or for every profile"""
+    query = select(bitmap_table)
+    if profile_ids is not None:
+        query = query.where(bitmap_table.c.profile_id.in_(list(profile_ids)))
+    return {
+        row.profile_id: (DayBitmap.from_bytes(row.start_date, row.present), DayBitmap.from_bytes(row.start_date, row.recorded))
+        for row in db.session.execute(query)
+    }
+
+
+def rebuild(connection, profile_ids):
+    """Recompute the bitmaps of these profiles from their attendance rows. Returns the number written."""
+    present = defaultdict(DayBitmap)
+    recorded = defaultdict(DayBitmap)
+    for profile_id, day, status in connection.execute(
+        select(attendance_table.c.student_id, attendance_table.c.date, attendance_table.c.status)
+        .where(attendance_table.c.student_id.in_(list(profile_ids)))
+    ):
+        recorded[profile_id].add(day)
+        if status == 'present':
+            present[profile_id].add(day)
+
+    connection.execute(bitmap_table.delete().where(bitmap_table.c.profile_id.in_(list(profile_ids))))
+    for profile_id in sorted(recorded):
+        _write(connection, profile_id, present[profile_id], recorded[profile_id], existing=False)
+    return len(recorded)
@@ -0,0 +1,214 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, event, func, inspect, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Attendance, StudentProfile, AttendanceDaily
+
+# Per-day attendance totals in attendance_daily: one row for the whole gym
+# (department '*') and one per member department ('' for none). A session
+# listener turns each flushed attendance insert, delete or status/date change
+# into `present/absent/members + delta` updates on the same connection, so the
+# rollup commits or rolls back with the attendance row. `members` assumes one
+# attendance row per member per day, which the check-in route enforces;
+# rebuild() recounts distinct members. Rows written with raw SQL or bulk
+# query.update() bypass the listener and need add() with their deltas or a
+# rebuild of the affected days (jobs/backfill_attendance_daily.py).
+
+ALL_DEPARTMENTS = '*'
+
+rollup_table = AttendanceDaily.__table__
+attendance_table = Attendance.__table__
+profile_table = StudentProfile.__table__
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _apply_deltas):
+        event.listen(db.session, 'after_flush', _apply_deltas)
+
+
+def _old_value(obj, attribute):
+    history = inspect(obj).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(obj, attribute)
+
+
+def _apply_deltas(session, flush_context):
+    # (student_id, date, status, sign) for every attendance row the flush added or removed
+    moves = []
+    for obj in session.new:
+        if isinstance(obj, Attendance):
+            moves.append((obj.student_id, obj.date, obj.status, 1))
+    for obj in session.deleted:
+        if isinstance(obj, Attendance):
+            moves.append((_old_value(obj, 'student_id'), _old_value(obj, 'date'), _old_value(obj, 'status'), -1))
+    for obj in session.dirty:
+        if isinstance(obj, Attendance):
+            old = (_old_value(obj, 'student_id'), _old_value(obj, 'date'), _old_value(obj, 'status'))
+            new = (obj.student_id, obj.date, obj.status)
+            if old != new:
+                moves.append(old + (-1,))
+                moves.append(new + (1,))
+    if not moves:
+        return
+
+    connection = session.connection()
+    student_ids = {student_id for student_id, _, _, _ in moves}
+    departments = dict(connection.execute(
+        select(profile_table.c.id, profile_table.c.department).where(profile_table.c.id.in_(student_ids))
+    ).all())
+
+    deltas = {}
+    for student_id, day, status, sign in moves:
+        for department in (ALL_DEPARTMENTS, departments.get(student_id) or ''):
+            delta = deltas.setdefault((day, department), Counter())
+            delta['members'] += sign
+            if status in ('present', 'absent'):
+                delta[status] += sign
+
+    add(connection, deltas)
+
+
+def add(connection, deltas):
+    """Apply {(date, department): {'present'|'absent'|'members': delta}} to the rollup rows"""
+    now = datetime.utcnow()
+    # Fixed order so two check-ins on the same day cannot deadlock
+    for key in sorted(deltas):
+        delta = {column: value for column, value in deltas[key].items() if value}
+        if delta:
+            _add(connection, key, delta, now)
+
+
+def _add(connection, key, delta, now):
+    day, department = key
+    condition = (rollup_table.c.date == day) & (rollup_table.c.department == department)
+    increment = {column: rollup_table.c[column] + value for column, value in delta.items()}
+    if connection.execute(rollup_table.update().where(condition).values(updated_at=now, **increment)).rowcount:
+        return
+    # First write of the day for this department. A concurrent first writer may
+    # insert the same row between our UPDATE and INSERT, so the insert runs in
+    # a savepoint and falls back to the UPDATE.
+    try:
+        with connection.begin_nested():
+            connection.execute(rollup_table.insert().values(
+                date=day, department=department, updated_at=now,
+                present=delta.get('present', 0), absent=delta.get('absent', 0), members=delta.get('members', 0)
+            ))
+    except IntegrityError:
+        connection.execute(rollup_table.update().where(condition).values(updated_at=now, **increment))
+
+
+def _daily_counts(connection, start, end, by_department):
+    columns = [attendance_table.c.date]
+    if by_department:
+        columns.append(func.coalesce(profile_table.c.department, ''))
+    query = select(
+        *columns,
+        func.sum(case((attendance_table.c.status == 'present', 1), else_=0)),
+        func.sum(case((attendance_table.c.status == 'absent', 1), else_=0)),
+        func.count(func.distinct(attendance_table.c.student_id))
+    ).where(attendance_table.c.date >= start, attendance_table.c.date <= end).group_by(*columns)
+    if by_department:
+        query = query.select_from(
+            attendance_table.outerjoin(profile_table, attendance_table.c.student_id == profile_table.c.id)
+        )
+    for row in connection.execute(query):
+        if by_department:
+            day, department, present, absent, members = row
+        else:
+            day, present, absent, members = row
+            department = ALL_DEPARTMENTS
+        yield {'date': day, 'department': department, 'present': present or 0, 'absent': absent or 0, 'members': members}
+
+
+def rebuild(connection, start, end):
+    """
+    Recompute the rollup rows for start..end (inclusive dates) from the
+    attendance table. The old rows are deleted first: their row locks make a
+    concurrent check-in that already flushed finish before the recount, and
+    one that has not flushed yet waits and adds its delta on top of the
+    rebuilt rows. Returns the number of rows written.
+    """
+    now = datetime.utcnow()
+    connection.execute(rollup_table.delete().where(rollup_table.c.date >= start, rollup_table.c.date <= end))
+    rows = list(_daily_counts(connection, start, end, by_department=False))
+    rows += _daily_counts(connection, start, end, by_department=True)
+    if rows:
+        connection.execute(rollup_table.insert(), [dict(row, updated_at=now) for row in rows])
+    return len(rows)
+
+
+def attendance_range(connection):
+    """(first, last) attendance date, or (None, None) when there is no attendance"""
+    return connection.execute(select(func.min(attendance_table.c.date), func.max(attendance_table.c.date))).one()
+
+
+def trend(start, end, department=None):
+    """
+    Daily totals for start..end, oldest first, with a zero row for days
+    without attendance. department None is the whole gym.
+    """
+    rows = db.session.execute(
+        select(rollup_table).where(
+            rollup_table.c.date >= start,
+            rollup_table.c.date <= end,
+            rollup_table.c.department == (ALL_DEPARTMENTS if department is None else department)
+        )
+    )
+    by_day = {row.date: row for row in rows}
+    result = []
+    day = start
+    while day <= end:
+        row = by_day.get(day)
+        present, absent = (row.present, row.absent) if row else (0, 0)
+        result.append({
+            'date': day.isoformat(),
+            'present': present,
+            'absent': absent,
+            'members': row.members if row else 0,
+            'attendance_rate': round(present / (present + absent) * 100, 2) if present + absent else 0
+        })
+        day += timedelta(days=1)
+    return result
+
+
+def department_breakdown(start, end):
+    """Totals per department over start..end"""
+    rows = db.session.execute(
+        select(
+            rollup_table.c.department,
+            func.sum(rollup_table.c.present),
+            func.sum(rollup_table.c.absent),
+            func.sum(rollup_table.c.members)
+        ).where(
+            rollup_table.c.date >= start,
+            rollup_table.c.date <= end,
+            rollup_table.c.department != ALL_DEPARTMENTS
+        ).group_by(rollup_table.c.department).order_by(rollup_table.c.department)
+    )
+    return [{
+        'department': department or None,
+        'present': int(present or 0),
+        'absent': int(absent or 0),
+        'member_days': int(member_days or 0)
+    } for department, present, absent, member_days in rows]
+
+
+def backfill(engine, start=None, end=None, chunk_days=31):
+    """Rebuild start..end (default: every attendance date) in chunks of chunk_days, one transaction each"""
+    if start is None or end is None:
+        with engine.connect() as conn:
+            first, last = attendance_range(conn)
+        if first is None:
+            return 0
+        start, end = start or first, end or last
+
+    written = 0
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        with engine.begin() as conn:
+            written += rebuild(conn, chunk_start, chunk_end)
+        print(f"  attendance_daily: rebuilt {chunk_start} .. {chunk_end}")
+        chunk_start = chunk_end + timedelta(days=1)
+    return written
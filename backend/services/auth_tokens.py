@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import update
+
+from models import db, RefreshToken
+
+# Refresh tokens rotate: every successful /auth/refresh marks the presented
+# token used and hands out a new one in the same family. Presenting a token a
+# second time means a copy is in someone else's hands, so the whole family is
+# revoked and the user has to log in again.
+
+
+def issue_tokens(identity, family_id=None, version=None):
+    """
+    Create an access token and a refresh token for identity ({'id', 'role'}).
+    The access token carries the user's version (claim 'ver') for the
+    identity cache. The refresh token row is added to the session; the
+    caller commits.
+    """
+    jti = str(uuid.uuid4())
+    family_id = family_id or jti
+    now = datetime.utcnow()
+    db.session.add(RefreshToken(
+        jti=jti,
+        user_id=identity['id'],
+        family_id=family_id,
+        expires_at=now + current_app.config['JWT_REFRESH_TOKEN_EXPIRES'],
+        created_at=now
+    ))
+    return {
+        'access_token': create_access_token(identity=identity, additional_claims={'ver': version}),
+        'refresh_token': create_refresh_token(identity=identity, additional_claims={'jti': jti, 'fam': family_id})
+    }
+
+
+def consume(jwt_payload):
+    """
+    Mark the refresh token in jwt_payload used. Returns its family id, or None
+    if the token is unknown, revoked, expired or was already used, in which
+    case the family is revoked.
+    """
+    now = datetime.utcnow()
+    # A single conditional UPDATE, so two concurrent refreshes with the same token cannot both win
+    claimed = db.session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.jti == jwt_payload['jti'])
+        .where(RefreshToken.used_at.is_(None))
+        .where(RefreshToken.revoked.is_(False))
+        .where(RefreshToken.expires_at > now)
+        .values(used_at=now)
+    ).rowcount
+    if claimed == 1:
+        return jwt_payload.get('fam')
+
+    family_id = jwt_payload.get('fam')
+    if family_id:
+        revoke_family(family_id)
+    return None
+
+
+def revoke_family(family_id):
+    db.session.execute(
+        update(RefreshToken).where(RefreshToken.family_id == family_id).values(revoked=True)
+    )
+
+
+def revoke_user(user_id):
+    """Revoke every refresh token of a user, e.g. after a password or role change"""
+    db.session.execute(
+        update(RefreshToken).where(RefreshToken.user_id == user_id).values(revoked=True)
+    )
@@ -0,0 +1,145 @@
+import heapq
+from datetime import datetime, time, timedelta
+from itertools import islice
+from time import perf_counter
+
+from sqlalchemy import select
+
+from models import db, Schedule, Trainer, User
+from services import schedule_conflicts, trainer_calendar
+from utils.slot_bitmap import SLOT, SLOTS_PER_DAY, SlotBitmap, count, daily, lowest, run_end, run_starts, span
+
+# Free-slot search: "who can take me Tuesday 6-8pm?". Time is counted in
+# 5-minute slots from midnight of the window's first day, and every set of
+# slots is one big integer: the window cut to the gym's daily hours, the
+# starts allowed by AVAILABILITY_SLOT_MINUTES, each trainer's booked time
+# (trainer_calendar keeps it per month) and, when given, the member's own
+# sessions and the room's. A trainer's free time is then
+#     open & ~member & ~room & ~trainer
+# and the starts of a free run of the requested length are a few shifts and
+# ANDs of it (utils/slot_bitmap.run_starts). Each operation covers every slot
+# of the window at once, so 200 trainers over three months cost 200 rows
+# read and a few thousand big-integer operations, not a loop over sessions
+# or minutes.
+#
+# Each free run gives one suggestion at its first allowed start. They are
+# ranked by start, then by the trainer with the least booked time that day;
+# the per-trainer lists are merged lazily, so only the first `limit` are built.
+
+_settings = {
+    'opens': time(6, 0),
+    'closes': time(22, 0),
+    'slot_minutes': 15,
+    'max_window_days': 93
+}
+
+
+class AvailabilityError(Exception):
+    """Raised for a search that cannot be run, e.g. an empty or too long window"""
+
+
+def parse_clock(value):
+    """time from 'HH:MM'; raises AvailabilityError"""
+    try:
+        return time.fromisoformat(value.strip())
+    except (AttributeError, ValueError):
+        raise AvailabilityError(f"Invalid time of day {value!r}, use HH:MM")
+
+
+def init_app(app):
+    opening_hours = app.config.get('GYM_OPENING_HOURS', '06:00-22:00')
+    opens, _, closes = opening_hours.partition('-')
+    _settings['opens'] = parse_clock(opens)
+    _settings['closes'] = parse_clock(closes)
+    # Starts are offered on a grid of whole slots
+    _settings['slot_minutes'] = max(int(app.config.get('AVAILABILITY_SLOT_MINUTES', 15)) // 5 * 5, 5)
+    _settings['max_window_days'] = int(app.config.get('AVAILABILITY_MAX_WINDOW_DAYS', 93))
+
+
+def _slot_of_day(clock, up=False):
+    slots, rest = divmod(clock.hour * 60 + clock.minute, 5)
+    return slots + 1 if up and (rest or clock.second or clock.microsecond) else slots
+
+
+def _shared_busy(origin, end, member_id, location):
+    """Slots taken by the member's own sessions and the room's, as bits counted from `origin`"""
+    bitmap = SlotBitmap(origin)
+    lookback = timedelta(minutes=schedule_conflicts.max_duration())
+    room = schedule_conflicts.location_key(location)
+    for column, value in ((Schedule.user_id, member_id), (Schedule.location_key, room)):
+        if value is None:
+            continue
+        for begins, ends, minutes in db.session.execute(
+            select(Schedule.scheduled_time, Schedule.ends_at, Schedule.duration_minutes)
+            .where(column == value, Schedule.scheduled_time >= origin - lookback, Schedule.scheduled_time < end)
+        ):
+            bitmap.add(begins, ends or begins + timedelta(minutes=minutes or 60))
+    return bitmap.bits
+
+
+def _candidates(trainer_id, name, busy, free, starts):
+    """(first slot, booked minutes that day, name, trainer_id, end slot) per free run, earliest first"""
+    while starts:
+        first = lowest(starts)
+        end = run_end(free, first)
+        day = first // SLOTS_PER_DAY
+        yield first, count(busy & span(day * SLOTS_PER_DAY, (day + 1) * SLOTS_PER_DAY)) * 5, name, trainer_id, end
+        starts = starts >> end << end
+
+
+def search(window_start, window_end, duration_minutes, specialization=None, member_id=None, location=None,
+           day_start=None, day_end=None, limit=20):
+    """
+    Ranked free slots of `duration_minutes` with any trainer inside
+    [window_start, window_end), in the gym's local time. Returns
+    {'suggestions', 'trainers', 'search_ms'}; raises AvailabilityError.
+    """
+    started = perf_counter()
+    window_start = max(window_start, datetime.now())
+    if window_end <= window_start:
+        raise AvailabilityError('The search window must end after it starts and in the future')
+    if window_end - window_start > timedelta(days=_settings['max_window_days']):
+        raise AvailabilityError(f"The search window can span at most {_settings['max_window_days']} days")
+    day_start = day_start or _settings['opens']
+    day_end = day_end or _settings['closes']
+    if day_end <= day_start:
+        raise AvailabilityError('day_end must be after day_start')
+    location = location.strip() if schedule_conflicts.is_room(location) else None  # shared areas fit anyone
+
+    query = select(Trainer.id, Trainer.specialization, User.name).join(User, User.id == Trainer.user_id)
+    if specialization:
+        query = query.where(Trainer.specialization.ilike(f"%{specialization.strip()}%"))
+    trainers = {row.id: (row.name, row.specialization) for row in db.session.execute(query.order_by(Trainer.id))}
+
+    origin = datetime.combine(window_start.date(), time())
+    days = (window_end - origin).days + 1
+    window = SlotBitmap(origin)
+    open_slots = (daily(span(_slot_of_day(day_start, up=True), _slot_of_day(day_end)), days)
+                  & span(window.index(window_start, up=True), window.index(window_end))
+                  & ~_shared_busy(origin, window_end, member_id, location))
+    allowed_starts = daily(sum(1 << slot for slot in range(0, SLOTS_PER_DAY, _settings['slot_minutes'] // 5)), days)
+    length = -(-duration_minutes // 5)
+
+    # Without a specialization nearly every row matches; skip the long IN list
+    booked = trainer_calendar.load(origin, window_end, trainers if specialization else None) if trainers else {}
+    runs = []
+    for trainer_id, (name, _) in trainers.items():
+        busy = booked.get(trainer_id, 0)
+        free = open_slots & ~busy
+        starts = run_starts(free, length) & allowed_starts
+        if starts:
+            runs.append(_candidates(trainer_id, name or '', busy, free, starts))
+
+    return {
+        'suggestions': [{
+            'trainer_id': trainer_id,
+            'trainer_name': trainers[trainer_id][0],
+            'specialization': trainers[trainer_id][1],
+            'start': (origin + first * SLOT).isoformat(),
+            'end': (origin + first * SLOT + timedelta(minutes=duration_minutes)).isoformat(),
+            'free_until': (origin + end * SLOT).isoformat(),
+            'booked_minutes_that_day': booked_minutes
+        } for first, booked_minutes, _, trainer_id, end in islice(heapq.merge(*runs), limit)],
+        'trainers': len(trainers),
+        'search_ms': round((perf_counter() - started) * 1000, 1)
+    }
@@ -0,0 +1,145 @@
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect, select
+
+from models import db, User, Equipment, StudentProfile, StatCounter
+
+# Counts shown on the admin dashboard, kept in stat_counter instead of being
+# recounted per request. A session listener turns every flushed insert,
+# delete and role/status change of users, equipment and student profiles
+# into `value = value + delta` updates on the same connection, so a counter
+# commits or rolls back together with the row that moved it. Bulk
+# query.update()/delete() calls and raw SQL bypass the listener: they call
+# add() with their own deltas, and the reconciliation job
+# (jobs/reconcile_counters.py) corrects any remaining drift.
+
+ROLES = ('student', 'trainer', 'staff', 'admin')
+MEMBERSHIP_STATUSES = ('active', 'expired', 'pending')
+
+counter_table = StatCounter.__table__
+
+
+def role_counter(role):
+    return f"users.role.{role}"
+
+
+def membership_counter(status):
+    return f"membership.{status}"
+
+
+EQUIPMENT_COUNTER = 'equipment.total'
+
+ALL_COUNTERS = [role_counter(r) for r in ROLES] + [EQUIPMENT_COUNTER] + [membership_counter(s) for s in MEMBERSHIP_STATUSES]
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _apply_deltas):
+        event.listen(db.session, 'after_flush', _apply_deltas)
+
+
+def _changed(obj, attribute):
+    """(old, new) for an attribute changed in this flush, or None"""
+    history = inspect(obj).attrs[attribute].history
+    if not history.added and not history.deleted:
+        return None
+    return (history.deleted[0] if history.deleted else None, history.added[0] if history.added else None)
+
+
+def _apply_deltas(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, User):
+            deltas[role_counter(obj.role)] += 1
+        elif isinstance(obj, Equipment):
+            deltas[EQUIPMENT_COUNTER] += 1
+        elif isinstance(obj, StudentProfile) and obj.membership_status:
+            deltas[membership_counter(obj.membership_status)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            deltas[role_counter(obj.role)] -= 1
+        elif isinstance(obj, Equipment):
+            deltas[EQUIPMENT_COUNTER] -= 1
+        elif isinstance(obj, StudentProfile) and obj.membership_status:
+            deltas[membership_counter(obj.membership_status)] -= 1
+    for obj in session.dirty:
+        attribute = 'role' if isinstance(obj, User) else 'membership_status' if isinstance(obj, StudentProfile) else None
+        change = attribute and _changed(obj, attribute)
+        if change:
+            name = role_counter if attribute == 'role' else membership_counter
+            if change[0]:
+                deltas[name(change[0])] -= 1
+            if change[1]:
+                deltas[name(change[1])] += 1
+
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        add(session.connection(), deltas)
+
+
+def add(connection, deltas):
+    """Apply {counter name: delta} on `connection`, for writes that bypass the session listener"""
+    now = datetime.utcnow()
+    # Fixed order so two transactions touching the same counters cannot deadlock
+    for name in sorted(deltas):
+        updated = connection.execute(
+            counter_table.update()
+            .where(counter_table.c.name == name)
+            .values(value=counter_table.c.value + deltas[name], updated_at=now)
+        ).rowcount
+        if not updated:
+            # A counter nobody has seen yet (e.g. a new status); reconciliation settles its true value
+            connection.execute(counter_table.insert().values(name=name, value=deltas[name], updated_at=now))
+
+
+def read(names=None):
+    """Counter values by name, read by primary key"""
+    names = names or ALL_COUNTERS
+    rows = db.session.execute(
+        select(counter_table.c.name, counter_table.c.value).where(counter_table.c.name.in_(names))
+    )
+    values = dict.fromkeys(names, 0)
+    values.update({row.name: row.value for row in rows})
+    return values
+
+
+def actual_counts(connection):
+    """The true values, counted from the source tables"""
+    counts = dict.fromkeys(ALL_COUNTERS, 0)
+    for role, count in connection.execute(select(User.role, func.count()).group_by(User.role)):
+        counts[role_counter(role)] = count
+    for status, count in connection.execute(
+        select(StudentProfile.membership_status, func.count()).group_by(StudentProfile.membership_status)
+    ):
+        if status:
+            counts[membership_counter(status)] = count
+    counts[EQUIPMENT_COUNTER] = connection.execute(select(func.count()).select_from(Equipment)).scalar()
+    return counts
+
+
+def reconcile(connection, fix=True):
+    """
+    Compare every counter with a fresh count and, if fix, overwrite it. The
+    counter rows are locked first: a writer that already flushed its row holds
+    the counter lock until it commits, so the count below includes it, and
+    one that has not flushed yet blocks until the corrected values commit.
+    Returns {name: (stored, actual)} for the counters that had drifted.
+    """
+    now = datetime.utcnow()
+    existing = {row.name for row in connection.execute(select(counter_table.c.name))}
+    for name in ALL_COUNTERS:
+        if name not in existing:
+            connection.execute(counter_table.insert().values(name=name, value=0, updated_at=now))
+
+    stored = {row.name: row.value for row in connection.execute(
+        select(counter_table.c.name, counter_table.c.value).order_by(counter_table.c.name).with_for_update()
+    )}
+    actual = actual_counts(connection)
+    for name in stored:
+        actual.setdefault(name, 0)
+
+    drift = {name: (stored.get(name, 0), value) for name, value in actual.items() if stored.get(name, 0) != value}
+    if fix:
+        for name, (_, value) in drift.items():
+            connection.execute(counter_table.update().where(counter_table.c.name == name).values(value=value, updated_at=now))
+    return drift
@@ -0,0 +1,325 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, event, func
+
+from models import db, User, StudentProfile, Attendance, MemberSummary, WorkoutPlan, Notification, Schedule, Trainer, TrainingVideo
+from services import member_summary
+from utils.ttl_cache import TTLCache
+
+# One payload per role dashboard, built with a handful of set-based queries and
+# cached per user. A session listener collects the users whose dashboards a
+# flush touched and drops their entries once the transaction commits, so
+# writes in this worker are visible on the next read. Other workers see them
+# when their entry expires after DASHBOARD_CACHE_TTL seconds.
+
+_caches = {
+    'student': TTLCache(ttl_seconds=30, max_entries=20000),
+    'trainer': TTLCache(ttl_seconds=30, max_entries=5000),
+    'staff': TTLCache(ttl_seconds=30, max_entries=5000)
+}
+
+# Row ids seen while building dashboards, used to map a changed row to its user without a query
+_profile_users = {}
+_trainer_users = {}
+
+
+def init_app(app):
+    ttl = float(app.config.get('DASHBOARD_CACHE_TTL', 30))
+    for cache in _caches.values():
+        cache.ttl_seconds = ttl
+        cache.clear()
+    if not event.contains(db.session, 'after_flush', _collect_changes):
+        event.listen(db.session, 'after_flush', _collect_changes)
+        event.listen(db.session, 'after_commit', _apply_invalidations)
+        event.listen(db.session, 'after_soft_rollback', _discard_invalidations)
+
+
+# Invalidation
+
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault('dashboard_invalidations', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Attendance):
+            pending.add(('student', _profile_users.get(obj.student_id)))
+        elif isinstance(obj, Notification):
+            pending.add(('student', obj.user_id))
+            pending.add(('trainer', obj.user_id))
+            pending.add(('staff', obj.user_id))
+        elif isinstance(obj, Schedule):
+            pending.add(('student', obj.user_id))
+            pending.add(('trainer', _trainer_users.get(obj.trainer_id)))
+            # Staff stats count trainers with sessions, so any schedule change can move them
+            pending.add(('staff', '*'))
+        elif isinstance(obj, WorkoutPlan):
+            pending.add(('student', obj.assigned_to))
+        elif isinstance(obj, StudentProfile):
+            pending.add(('student', obj.user_id))
+            pending.add(('trainer', '*'))
+        elif isinstance(obj, (User, Trainer)):
+            # Member totals and names shown on trainer and staff dashboards
+            pending.add(('trainer', '*'))
+            pending.add(('staff', '*'))
+        elif isinstance(obj, TrainingVideo):
+            pending.add(('trainer', obj.uploaded_by))
+
+
+def _apply_invalidations(session):
+    for role, user_id in session.info.pop('dashboard_invalidations', ()):
+        if user_id == '*':
+            _caches[role].clear()
+        elif user_id is not None:
+            _caches[role].invalidate(user_id)
+
+
+def _discard_invalidations(session, previous_transaction):
+    session.info.pop('dashboard_invalidations', None)
+
+
+def invalidate_user(user_id):
+    for cache in _caches.values():
+        cache.invalidate(user_id)
+
+
+def invalidate_all():
+    """For writes that bypass the session listener, e.g. bulk notification inserts"""
+    for cache in _caches.values():
+        cache.clear()
+
+
+# Formatting shared with the individual endpoints' payloads
+
+def _schedule_time_label(scheduled_time, now):
+    if not scheduled_time:
+        return "Not specified"
+    if scheduled_time.date() == now.date():
+        return f"Today, {scheduled_time.strftime('%I:%M %p')}"
+    if scheduled_time.date() == (now + timedelta(days=1)).date():
+        return f"Tomorrow, {scheduled_time.strftime('%I:%M %p')}"
+    return scheduled_time.strftime('%A, %I:%M %p')
+
+
+def _notification_list(user_id):
+    notifications = Notification.query.filter_by(user_id=user_id)\
+        .order_by(Notification.created_at.desc())\
+        .limit(10)\
+        .all()
+    result = [{
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        'read': notification.read
+    } for notification in notifications]
+    if not result:
+        result = [{
+            'id': 0,
+            'title': 'Welcome to FitWell Gym',
+            'message': 'Thank you for joining our fitness platform. Start exploring your dashboard!',
+            'created_at': datetime.utcnow().isoformat(),
+            'read': False
+        }]
+    return result
+
+
+# Student
+
+def _month_windows(now):
+    """The four (label, first day, last day) months shown by /student/progress, oldest first"""
+    windows = []
+    for i in range(4):
+        month_start = (now.replace(day=1) - timedelta(days=30 * i)).replace(day=1)
+        next_month = month_start.replace(month=month_start.month % 12 + 1) if month_start.month < 12 else month_start.replace(year=month_start.year + 1, month=1)
+        windows.append((month_start.strftime('%b'), month_start.date(), (next_month - timedelta(days=1)).date()))
+    windows.reverse()
+    return windows
+
+
+def build_student_dashboard(user_id):
+    """attendance + progress + notifications + schedule, as returned by the separate /student endpoints"""
+    now = datetime.now()
+    today = now.date()
+    profile = StudentProfile.query.filter_by(user_id=user_id).first()
+    profile_id = profile.id if profile else None
+    if profile:
+        _profile_users[profile.id] = user_id
+
+    # One attendance read covers the 30-day list and the four month buckets
+    months = _month_windows(now)
+    since = min(today - timedelta(days=30), months[0][1])
+    attendances = Attendance.query.filter_by(student_id=profile_id)\
+        .filter(Attendance.date >= since)\
+        .order_by(Attendance.date.desc())\
+        .all() if profile else []
+
+    recent = [a for a in attendances if today - timedelta(days=30) <= a.date <= today]
+    present = sum(1 for a in recent if a.status == 'present')
+    attendance = {
+        'attendance_records': [{'id': a.id, 'date': a.date.isoformat(), 'status': a.status} for a in recent],
+        'attendance_percentage': round((present / len(recent) * 100) if recent else 0, 2),
+        'days_present': present,
+        'total_days': len(recent)
+    }
+
+    monthly_progress = []
+    for label, start, end in months:
+        rows = [a for a in attendances if start <= a.date <= end]
+        month_present = sum(1 for a in rows if a.status == 'present')
+        monthly_progress.append({'month': label, 'value': round((month_present / len(rows) * 100) if rows else 0)})
+
+    # Streak and plan count from the summary row, as /student/progress reports them
+    activity = member_summary.card(db.session.get(MemberSummary, profile_id) if profile_id else None, today)
+    workouts_completed = activity['workout_plans'] if activity else 0
+    progress = {
+        'last_month': monthly_progress[-2]['value'],
+        'this_month': monthly_progress[-1]['value'],
+        'streak': activity['current_streak'] if activity else 0,
+        'workouts_completed': workouts_completed,
+        'hours_logged': workouts_completed * 2,
+        'monthly_progress': monthly_progress
+    }
+
+    # Trainer names joined in, instead of two lookups per session
+    rows = db.session.query(Schedule, User.name)\
+        .outerjoin(Trainer, Schedule.trainer_id == Trainer.id)\
+        .outerjoin(User, Trainer.user_id == User.id)\
+        .filter(Schedule.user_id == user_id)\
+        .order_by(Schedule.scheduled_time)\
+        .all()
+    schedule = [{
+        'id': entry.id,
+        'title': entry.title,
+        'trainer': trainer_name or "Staff",
+        'time': _schedule_time_label(entry.scheduled_time, now),
+        'location': entry.location or "Main Gym"
+    } for entry, trainer_name in rows]
+
+    return {
+        'attendance': attendance,
+        'progress': progress,
+        'notifications': _notification_list(user_id),
+        'schedule': schedule
+    }
+
+
+# Trainer
+
+def build_trainer_dashboard(user_id):
+    """/trainer/dashboard/stats + /trainer/schedule + notifications"""
+    today = datetime.now().date()
+    total_students = db.session.query(func.count(User.id)).filter(User.role == 'student').scalar()
+    active_members = db.session.query(func.count(StudentProfile.id))\
+        .filter(StudentProfile.membership_status == 'active').scalar()
+    total_videos = db.session.query(func.count(TrainingVideo.id)).filter(TrainingVideo.uploaded_by == user_id).scalar()
+
+    trainer = Trainer.query.filter_by(user_id=user_id).first()
+    sessions = {'today': 0, 'upcoming': 0, 'completed': 0}
+    schedule = []
+    if trainer:
+        _trainer_users[trainer.id] = user_id
+        rows = db.session.query(Schedule, User.name)\
+            .outerjoin(User, Schedule.user_id == User.id)\
+            .filter(Schedule.trainer_id == trainer.id)\
+            .all()
+        for entry, student_name in rows:
+            day = entry.scheduled_time.date()
+            sessions['today' if day == today else 'upcoming' if day > today else 'completed'] += 1
+            schedule.append({
+                'id': entry.id,
+                'title': entry.title,
+                'description': entry.description,
+                'student_id': entry.user_id,
+                'student_name': student_name or 'Unknown',
+                'scheduled_time': entry.scheduled_time.isoformat() if entry.scheduled_time else None,
+                'location': entry.location,
+                'created_at': entry.created_at.isoformat() if entry.created_at else None
+            })
+
+    return {
+        'stats': {
+            'members': {
+                'total': total_students,
+                'active': active_members,
+                'inactive': total_students - active_members
+            },
+            'sessions': sessions,
+            'videos': {'total': total_videos if trainer else 0}
+        },
+        'schedule': schedule,
+        'notifications': _notification_list(user_id)
+    }
+
+
+# Staff
+
+def build_staff_dashboard(user_id):
+    """/staff/stats + /staff/activities + /staff/updates"""
+    now = datetime.utcnow()
+    faculty_members = db.session.query(func.count(User.id)).filter(User.role == 'trainer').scalar()
+    sessions_scheduled, attended_sessions = db.session.query(
+        func.count(Schedule.id),
+        func.coalesce(func.sum(case((Schedule.scheduled_time < now, 1), else_=0)), 0)
+    ).filter(Schedule.user_id == user_id).one()
+    # Same rule as /staff/stats: trainer users whose id appears as a schedule trainer_id
+    active_trainers = db.session.query(func.count(func.distinct(Schedule.trainer_id)))\
+        .join(User, and_(User.id == Schedule.trainer_id, User.role == 'trainer')).scalar()
+
+    attendance_rate = attended_sessions / (sessions_scheduled or 1) * 100
+    participation_rate = (active_trainers / faculty_members) * 100 if faculty_members > 0 else 0
+    if participation_rate == 0 and faculty_members > 0:
+        participation_rate = 35
+
+    stats = {
+        'workoutsCompleted': attended_sessions + (sessions_scheduled // 2),
+        'attendance': f"{round(attendance_rate)}%",
+        'sessionsScheduled': sessions_scheduled,
+        'facultyMembers': faculty_members,
+        'participationRate': round(participation_rate)
+    }
+
+    in_range = Schedule.query.filter(
+        Schedule.user_id == user_id,
+        Schedule.scheduled_time >= now - timedelta(days=7),
+        Schedule.scheduled_time <= now + timedelta(days=60)
+    ).order_by(Schedule.scheduled_time).all()
+    recent = Schedule.query.filter(Schedule.user_id == user_id).order_by(Schedule.id.desc()).limit(10).all()
+    seen = set()
+    activities = []
+    for activity in in_range + recent:
+        if activity.id in seen:
+            continue
+        seen.add(activity.id)
+        activities.append({
+            'id': activity.id,
+            'title': activity.title,
+            'date': activity.scheduled_time.strftime('%Y-%m-%d'),
+            'time': activity.scheduled_time.strftime('%I:%M %p'),
+            'participants': 8,
+            'location': activity.location or 'Main Gym'
+        })
+
+    updates = [{
+        'id': notification.id,
+        'title': notification.title,
+        'content': notification.message,
+        'timestamp': notification.created_at.isoformat(),
+        'is_read': notification.read
+    } for notification in Notification.query.filter_by(user_id=user_id)
+        .order_by(Notification.created_at.desc()).limit(10).all()]
+
+    return {'stats': stats, 'activities': activities, 'updates': updates}
+
+
+_BUILDERS = {
+    'student': build_student_dashboard,
+    'trainer': build_trainer_dashboard,
+    'staff': build_staff_dashboard
+}
+
+
+def get_dashboard(role, user_id):
+    """Cached dashboard payload for a user"""
+    return _caches[role].get_or_load(user_id, lambda: _BUILDERS[role](user_id))
+
+
+def stats():
+    return {role: {'entries': len(cache), 'hits': cache.hits, 'misses': cache.misses} for role, cache in _caches.items()}
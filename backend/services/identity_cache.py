@@ -0,0 +1,53 @@
+from models import db, User
+from utils.ttl_cache import TTLCache
+
+# User records served by /auth/verify and /auth/profile, keyed by user id and
+# users.version. Every change to a cached field bumps the version, and access
+# tokens carry the version they were issued for (claim 'ver'), so an entry
+# older than the caller's token is reloaded in every worker, not just the one
+# that made the change. Writes in this process also invalidate immediately;
+# tokens issued before a change see it once the entry expires, so keep
+# IDENTITY_CACHE_TTL short.
+_cache = TTLCache(ttl_seconds=30, max_entries=50000)
+
+
+def init_app(app):
+    _cache.ttl_seconds = float(app.config.get('IDENTITY_CACHE_TTL', 30))
+    _cache.max_entries = int(app.config.get('IDENTITY_CACHE_MAX_ENTRIES', 50000))
+    _cache.clear()
+
+
+def _load_user(user_id):
+    user = db.session.get(User, user_id)
+    return (user.version, user.to_dict()) if user else None
+
+
+def get_user(user_id, version=None):
+    """
+    Public fields of a user (User.to_dict()), or None if the user does not
+    exist. `version` is the token's 'ver' claim; a cached entry loaded at an
+    older version is reloaded.
+    """
+    entry = _cache.get(user_id)
+    if entry is not None and (version is None or entry[0] >= version):
+        return entry[1]
+    generation = _cache.generation(user_id)
+    entry = _load_user(user_id)
+    if entry is None:
+        return None
+    _cache.set(user_id, entry, generation)
+    return entry[1]
+
+
+def bump_version(user):
+    """Mark a change to the user's cached fields; the caller commits, then calls invalidate_user()"""
+    user.version = User.version + 1
+
+
+def invalidate_user(user_id):
+    """Call after committing any change to a user's row"""
+    _cache.invalidate(user_id)
+
+
+def stats():
+    return {'entries': len(_cache), 'hits': _cache.hits, 'misses': _cache.misses}
@@ -0,0 +1,200 @@
+import csv
+from collections import Counter
+
+from sqlalchemy import or_, select
+
+from models import db, User, Attendance, Broadcast, DietPlan, MedicalRecord, MemberSummary, Notification, NotificationCounter, OutboxMessage, RefreshToken, Schedule, StudentDietPlan, StudentProfile, Trainer, TrainerCalendar, TrainingVideo, WorkoutPlan
+from services import attendance_bitmap, attendance_rollup, counters, identity_cache, job_queue, member_summary, memberships, notifications, segments, trainer_calendar, unread_counters
+from services.job_queue import JobFailed, handler
+
+# The kinds of background job jobs/worker.py runs. Each is called with its
+# JSON payload and job id inside an app context and returns a JSON-able
+# result. Handlers must be safe to run again after a failed attempt.
+
+DELETE_CHUNK_SIZE = 1000
+SUMMARY_CHUNK_SIZE = 1000
+
+
+@handler('broadcast')
+def send_broadcast(payload, job_id):
+    """Fan a queued Broadcast out to its audience, or to a segment evaluated now"""
+    record = db.session.get(Broadcast, payload['broadcast_id'])
+    if record is None:
+        raise JobFailed(f"broadcast {payload['broadcast_id']} no longer exists")
+    if record.completed_at is None:
+        if payload.get('segment') is not None:
+            try:
+                user_ids = list(segments.evaluate(payload['segment'])[0])
+            except segments.SegmentError as e:
+                raise JobFailed(str(e))
+        else:
+            user_ids = notifications.audience_ids(record.audience)
+        notifications.send(record, user_ids)
+    return {'broadcast_id': record.id, 'recipients': record.recipients, 'sent': record.sent,
+            'send_ms': record.duration_ms}
+
+
+def _delete_in_chunks(column, value, id_column):
+    table = column.table
+    deleted = 0
+    while True:
+        ids = db.session.execute(select(id_column).where(column == value).limit(DELETE_CHUNK_SIZE)).scalars().all()
+        if not ids:
+            return deleted
+        db.session.execute(table.delete().where(id_column.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+
+
+def _delete_attendance(profile):
+    """Chunked like _delete_in_chunks; each chunk takes its counts off the rollup in the same transaction"""
+    attendance_table = Attendance.__table__
+    department = profile.department or ''
+    deleted = 0
+    while True:
+        rows = db.session.execute(
+            select(attendance_table.c.id, attendance_table.c.date, attendance_table.c.status)
+            .where(attendance_table.c.student_id == profile.id).limit(DELETE_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            return deleted
+        deltas = {}
+        for _, day, status in rows:
+            for key in ((day, attendance_rollup.ALL_DEPARTMENTS), (day, department)):
+                delta = deltas.setdefault(key, Counter())
+                delta['members'] -= 1
+                if status in ('present', 'absent'):
+                    delta[status] -= 1
+        db.session.execute(attendance_table.delete().where(attendance_table.c.id.in_([row.id for row in rows])))
+        attendance_rollup.add(db.session.connection(), deltas)
+        db.session.commit()
+        deleted += len(rows)
+
+
+@handler('delete_user')
+def delete_user(payload, job_id):
+    """
+    Delete an account and every row that references it. The member's
+    notifications, sessions and attendance go first in short chunked
+    transactions; then, in one transaction, the plans, records, videos and
+    broadcasts they own or were assigned, their trainer profile, tokens and
+    emails, the student profile and the user row. Tokens were already
+    revoked when the job was queued.
+    """
+    user_id = payload['user_id']
+    if db.session.get(User, user_id) is None:
+        return {'user_id': user_id, 'deleted': False}
+
+    notification_table = Notification.__table__
+    schedule_table = Schedule.__table__
+    deleted_notifications = _delete_in_chunks(notification_table.c.user_id, user_id, notification_table.c.id)
+    trainer_ids = db.session.execute(
+        select(schedule_table.c.trainer_id).where(schedule_table.c.user_id == user_id).distinct()
+    ).scalars().all()
+    deleted_sessions = _delete_in_chunks(schedule_table.c.user_id, user_id, schedule_table.c.id)
+    # The chunked deletes bypass the session listener that keeps the trainers' calendars
+    trainer_ids = [trainer_id for trainer_id in trainer_ids if trainer_id is not None]
+    if trainer_ids:
+        trainer_calendar.rebuild(db.session.connection(), trainer_ids)
+        db.session.commit()
+
+    profile = StudentProfile.query.filter_by(user_id=user_id).first()
+    deleted_attendance = 0
+    if profile is not None:
+        deleted_attendance = _delete_attendance(profile)
+        # Core deletes skip the bitmap and summary listeners as well
+        attendance_bitmap.rebuild(db.session.connection(), [profile.id])
+        member_summary.rebuild(db.session.connection(), [profile.id])
+        db.session.commit()
+
+    diet_table = StudentDietPlan.__table__
+    workout_table = WorkoutPlan.__table__
+    own_diet_plans = select(DietPlan.id).where(DietPlan.created_by == user_id)
+    diet_condition = or_(diet_table.c.student_id == user_id, diet_table.c.assigned_by == user_id,
+                         diet_table.c.diet_plan_id.in_(own_diet_plans))
+    workout_condition = or_(workout_table.c.created_by == user_id, workout_table.c.assigned_to == user_id)
+    # Other members lose the plans this user wrote or assigned; their summary counts follow below
+    members = set(db.session.execute(select(diet_table.c.student_id).where(diet_condition)).scalars())
+    members.update(db.session.execute(select(workout_table.c.assigned_to).where(workout_condition)).scalars())
+    members.discard(user_id)
+
+    db.session.execute(diet_table.delete().where(diet_condition))
+    db.session.execute(DietPlan.__table__.delete().where(DietPlan.created_by == user_id))
+    db.session.execute(workout_table.delete().where(workout_condition))
+    for model, column in ((MedicalRecord, MedicalRecord.user_id), (TrainingVideo, TrainingVideo.uploaded_by),
+                          (Broadcast, Broadcast.created_by), (RefreshToken, RefreshToken.user_id),
+                          (NotificationCounter, NotificationCounter.user_id), (MemberSummary, MemberSummary.user_id),
+                          # Unsent and sent emails alike hold the address
+                          (OutboxMessage, OutboxMessage.user_id)):
+        db.session.execute(model.__table__.delete().where(column == user_id))
+
+    # A trainer's booked sessions stay with their members, without a trainer
+    own_trainer_ids = db.session.execute(select(Trainer.id).where(Trainer.user_id == user_id)).scalars().all()
+    if own_trainer_ids:
+        db.session.execute(schedule_table.update().where(schedule_table.c.trainer_id.in_(own_trainer_ids))
+                           .values(trainer_id=None))
+        db.session.execute(TrainerCalendar.__table__.delete()
+                           .where(TrainerCalendar.trainer_id.in_(own_trainer_ids)))
+        db.session.execute(Trainer.__table__.delete().where(Trainer.id.in_(own_trainer_ids)))
+
+    if members:
+        member_profiles = db.session.execute(
+            select(StudentProfile.id).where(StudentProfile.user_id.in_(members))
+        ).scalars().all()
+        if member_profiles:
+            member_summary.rebuild(db.session.connection(), member_profiles)
+
+    # The rows above went with Core; reload so the ORM deletes below see them gone.
+    # Profile and user go through the session so the counter, bitmap and summary
+    # listeners see them.
+    db.session.expire_all()
+    profile = StudentProfile.query.filter_by(user_id=user_id).first()
+    if profile is not None:
+        db.session.delete(profile)
+        db.session.flush()
+    db.session.delete(db.session.get(User, user_id))
+    db.session.commit()
+    identity_cache.invalidate_user(user_id)
+    return {'user_id': user_id, 'deleted': True, 'notifications_deleted': deleted_notifications,
+            'sessions_deleted': deleted_sessions, 'attendance_deleted': deleted_attendance}
+
+
+@handler('segment_export', executor='process')
+def export_segment(payload, job_id):
+    """Write a segment's members to a CSV file; formatting large segments is CPU work, so it runs in a process"""
+    try:
+        members, _ = segments.evaluate(payload['segment'])
+    except segments.SegmentError as e:
+        raise JobFailed(str(e))
+    path = job_queue.output_path(job_id, 'csv')
+    with open(path, 'w', newline='') as output:
+        rows = segments.write_csv(members, csv.writer(output))
+    return {'rows': rows, 'filename': f"segment-{job_id}.csv", 'download': f"/api/jobs/{job_id}/download"}
+
+
+@handler('reconcile_counters', max_attempts=2)
+def reconcile_counters(payload, job_id):
+    """Recount the admin dashboard and unread notification counters"""
+    drift = counters.reconcile(db.session.connection())
+    db.session.commit()
+    unread_drift = unread_counters.reconcile(db.session.connection())
+    db.session.commit()
+    return {'counters_fixed': len(drift), 'unread_counters_fixed': len(unread_drift)}
+
+
+@handler('rebuild_member_summaries', max_attempts=2)
+def rebuild_member_summaries(payload, job_id):
+    """Recompute every member_summary row, one short transaction per chunk of profiles"""
+    ids = db.session.execute(select(StudentProfile.id).order_by(StudentProfile.id)).scalars().all()
+    db.session.commit()
+    rebuilt = 0
+    for start in range(0, len(ids), SUMMARY_CHUNK_SIZE):
+        with db.engine.begin() as conn:
+            rebuilt += member_summary.rebuild(conn, ids[start:start + SUMMARY_CHUNK_SIZE])
+    return {'rebuilt': rebuilt}
+
+
+@handler('expire_memberships', max_attempts=2)
+def expire_memberships(payload, job_id):
+    """Expire the active memberships that ended before today, in committed batches"""
+    return memberships.expire_due()
@@ -0,0 +1,248 @@
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from models import db, Job
+
+# Durable background jobs in the `job` table, run by jobs/worker.py outside
+# the gunicorn workers. A route queues a job in its own transaction and
+# answers 202; the worker claims runnable jobs in priority order (SELECT ...
+# FOR UPDATE SKIP LOCKED, then a status-guarded UPDATE, so two workers never
+# take the same job) and runs each on a thread pool, or on a process pool for
+# CPU-bound kinds. A failed attempt is retried after an exponential backoff
+# with jitter until max_attempts; a handler raises JobFailed to give up at
+# once. Running jobs are heartbeated, and a job whose worker stopped
+# heartbeating for JOB_LEASE_SECONDS is queued again.
+#
+# Handlers are registered with @handler in services/job_handlers.py and are
+# called as fn(payload, job_id) inside an app context.
+
+PRIORITIES = {'high': 0, 'normal': 5, 'low': 9}
+STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+
+job_table = Job.__table__
+
+_handlers = {}
+_settings = {
+    'retry_base_seconds': 10.0,
+    'retry_max_seconds': 600.0,
+    'lease_seconds': 300.0,
+    'output_dir': 'job_output'
+}
+
+
+class JobFailed(Exception):
+    """Raised by a handler to fail its job without further attempts"""
+
+
+def init_app(app):
+    _settings['retry_base_seconds'] = float(app.config.get('JOB_RETRY_BASE_SECONDS', 10))
+    _settings['retry_max_seconds'] = float(app.config.get('JOB_RETRY_MAX_SECONDS', 600))
+    _settings['lease_seconds'] = float(app.config.get('JOB_LEASE_SECONDS', 300))
+    _settings['output_dir'] = app.config.get('JOB_OUTPUT_DIR', 'job_output')
+
+
+def handler(kind, executor='thread', max_attempts=3):
+    """Register fn(payload, job_id) for `kind`; executor is 'thread' or 'process'"""
+    if executor not in ('thread', 'process'):
+        raise ValueError("executor must be 'thread' or 'process'")
+
+    def register(fn):
+        _handlers[kind] = (fn, executor, max_attempts)
+        return fn
+    return register
+
+
+def kinds(executor=None):
+    return sorted(kind for kind, (_, kind_executor, _) in _handlers.items()
+                  if executor is None or kind_executor == executor)
+
+
+def priority_value(priority):
+    """'high', 'normal', 'low' or 0-9 -> the stored value"""
+    if isinstance(priority, str) and priority in PRIORITIES:
+        return PRIORITIES[priority]
+    if isinstance(priority, int) and not isinstance(priority, bool) and 0 <= priority <= 9:
+        return priority
+    raise ValueError(f"priority must be one of {', '.join(PRIORITIES)} or 0-9")
+
+
+def output_path(job_id, extension):
+    """Where a job writes a file it produces"""
+    os.makedirs(_settings['output_dir'], exist_ok=True)
+    return os.path.join(_settings['output_dir'], f"job-{job_id}.{extension}")
+
+
+# Queueing (web workers)
+
+def enqueue(kind, payload=None, priority='normal', created_by=None, max_attempts=None):
+    """
+    Add a job to the session; it is queued when the caller commits, together
+    with whatever else the transaction writes. Returns the Job.
+    """
+    if kind not in _handlers:
+        raise ValueError(f"unknown job kind '{kind}'")
+    job = Job(kind=kind, payload=json.dumps(payload or {}), status='queued',
+              priority=priority_value(priority), attempts=0,
+              max_attempts=max_attempts or _handlers[kind][2],
+              run_after=datetime.utcnow(), created_by=created_by)
+    db.session.add(job)
+    return job
+
+
+def cancel(job_id):
+    """Cancel a job that has not started. The caller commits. Returns whether it was cancelled."""
+    return bool(db.session.execute(
+        job_table.update().where(job_table.c.id == job_id, job_table.c.status == 'queued')
+        .values(status='cancelled', finished_at=datetime.utcnow())
+    ).rowcount)
+
+
+def retry(job_id):
+    """Queue a failed or cancelled job again with fresh attempts. The caller commits."""
+    return bool(db.session.execute(
+        job_table.update().where(job_table.c.id == job_id, job_table.c.status.in_(('failed', 'cancelled')))
+        .values(status='queued', attempts=0, run_after=datetime.utcnow(), error=None,
+                locked_by=None, locked_at=None, finished_at=None)
+    ).rowcount)
+
+
+# Claiming and finishing (jobs/worker.py)
+
+def claim(job_kinds, limit, worker_id):
+    """
+    Lock up to `limit` runnable jobs of the given kinds for worker_id and
+    commit. Returns [(id, kind, payload)] in priority order.
+    """
+    if not job_kinds or limit <= 0:
+        return []
+    now = datetime.utcnow()
+    candidates = db.session.execute(
+        select(job_table.c.id)
+        .where(job_table.c.status == 'queued', job_table.c.run_after <= now, job_table.c.kind.in_(job_kinds))
+        .order_by(job_table.c.priority, job_table.c.run_after, job_table.c.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    claimed = [job_id for job_id in candidates if db.session.execute(
+        job_table.update().where(job_table.c.id == job_id, job_table.c.status == 'queued')
+        .values(status='running', locked_by=worker_id, locked_at=now, started_at=now,
+                attempts=job_table.c.attempts + 1)
+    ).rowcount]
+    db.session.commit()
+    if not claimed:
+        return []
+    rows = {row.id: row for row in db.session.execute(
+        select(job_table.c.id, job_table.c.kind, job_table.c.payload).where(job_table.c.id.in_(claimed))
+    )}
+    db.session.commit()
+    return [(job_id, rows[job_id].kind, rows[job_id].payload) for job_id in claimed]
+
+
+def _owned(job_id, worker_id):
+    # A job whose lease expired may be running elsewhere now; its old worker must not overwrite it
+    return (job_table.c.id == job_id) & (job_table.c.locked_by == worker_id) & (job_table.c.status == 'running')
+
+
+def complete(job_id, worker_id, result):
+    db.session.execute(job_table.update().where(_owned(job_id, worker_id)).values(
+        status='succeeded', result=json.dumps(result) if result is not None else None,
+        error=None, locked_by=None, locked_at=None, finished_at=datetime.utcnow()
+    ))
+    db.session.commit()
+
+
+def backoff_seconds(attempt):
+    """Delay before retry number `attempt` (1-based): exponential, capped, with +-20% jitter"""
+    delay = min(_settings['retry_base_seconds'] * 2 ** (attempt - 1), _settings['retry_max_seconds'])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def fail(job_id, worker_id, error, permanent=False):
+    """Record a failed attempt: queue a retry after a backoff, or fail the job. Returns the new status."""
+    row = db.session.execute(
+        select(job_table.c.attempts, job_table.c.max_attempts).where(_owned(job_id, worker_id))
+    ).first()
+    if row is None:
+        db.session.commit()
+        return None
+    now = datetime.utcnow()
+    if permanent or row.attempts >= row.max_attempts:
+        values = {'status': 'failed', 'finished_at': now}
+    else:
+        values = {'status': 'queued', 'run_after': now + timedelta(seconds=backoff_seconds(row.attempts))}
+    db.session.execute(job_table.update().where(_owned(job_id, worker_id)).values(
+        error=str(error)[:2000], locked_by=None, locked_at=None, **values
+    ))
+    db.session.commit()
+    return values['status']
+
+
+def heartbeat(job_ids, worker_id):
+    """Extend the lease of this worker's running jobs"""
+    if job_ids:
+        db.session.execute(
+            job_table.update()
+            .where(job_table.c.id.in_(list(job_ids)), job_table.c.locked_by == worker_id, job_table.c.status == 'running')
+            .values(locked_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+
+def requeue_expired():
+    """Queue again (or fail, when out of attempts) running jobs whose worker stopped heartbeating"""
+    now = datetime.utcnow()
+    expired = (job_table.c.status == 'running') & (job_table.c.locked_at < now - timedelta(seconds=_settings['lease_seconds']))
+    lost = {'error': 'worker stopped responding', 'locked_by': None, 'locked_at': None}
+    failed = db.session.execute(job_table.update().where(expired & (job_table.c.attempts >= job_table.c.max_attempts))
+                                .values(status='failed', finished_at=now, **lost)).rowcount
+    requeued = db.session.execute(job_table.update().where(expired)
+                                  .values(status='queued', run_after=now, **lost)).rowcount
+    db.session.commit()
+    return requeued, failed
+
+
+def execute(app, kind, payload, job_id):
+    """Run a job's handler in an app context, on a pool thread or in a pool process"""
+    fn = _handlers[kind][0]
+    with app.app_context():
+        try:
+            return fn(json.loads(payload), job_id)
+        finally:
+            db.session.remove()
+
+
+# Reporting
+
+def serialize(job):
+    result = json.loads(job.result) if job.result else None
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'priority': job.priority,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'run_after': job.run_after.isoformat() if job.run_after else None,
+        'result': result,
+        'error': job.error,
+        'created_by': job.created_by,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'url': f"/api/jobs/{job.id}"
+    }
+
+
+def stats():
+    counts = dict(db.session.execute(select(job_table.c.status, func.count()).group_by(job_table.c.status)).all())
+    oldest = db.session.execute(
+        select(func.min(job_table.c.run_after)).where(job_table.c.status == 'queued')
+    ).scalar()
+    return {
+        'counts': {status: counts.get(status, 0) for status in STATUSES},
+        'oldest_queued_seconds': round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else None
+    }
@@ -0,0 +1,288 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, event, func, inspect, select
+
+from models import db, User, StudentProfile, Attendance, StudentDietPlan, WorkoutPlan, Schedule, MemberSummary
+
+# One member_summary row per student profile, kept current from the session
+# flushes that change its inputs. A same-day or next-day check-in, the common
+# write, is applied to the stored row directly (streak + 1, counts + 1). Any
+# other attendance change (backdated rows, deletes, status edits) and every
+# diet plan, workout plan or schedule change recomputes the affected members
+# from their own indexed rows. Everything runs on the flushing connection, so
+# a summary commits or rolls back with the change that moved it. The row of a
+# deleted profile goes in before_flush, ahead of the profile's DELETE that its
+# foreign key would otherwise block.
+#
+# Two values age without writes: visits_30d counts visits since window_start,
+# and next_session_* passes once the session starts. jobs/refresh_member_summaries.py
+# moves both forward; card() also treats a started session as none.
+
+WINDOW_DAYS = 30
+
+summary_table = MemberSummary.__table__
+attendance_table = Attendance.__table__
+profile_table = StudentProfile.__table__
+diet_table = StudentDietPlan.__table__
+workout_table = WorkoutPlan.__table__
+schedule_table = Schedule.__table__
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _apply_changes):
+        event.listen(db.session, 'after_flush', _apply_changes)
+        event.listen(db.session, 'before_flush', _remove_deleted_profiles)
+
+
+def _values(obj, attribute):
+    """Current and pre-flush value of an attribute, without duplicates"""
+    history = inspect(obj).attrs[attribute].history
+    values = {getattr(obj, attribute)}
+    values.update(history.deleted)
+    values.discard(None)
+    return values
+
+
+def _remove_deleted_profiles(session, flush_context, instances):
+    removed = [obj.id for obj in session.deleted if isinstance(obj, StudentProfile) and obj.id is not None]
+    if removed:
+        session.connection().execute(summary_table.delete().where(summary_table.c.profile_id.in_(removed)))
+
+
+def _apply_changes(session, flush_context):
+    checkins = []
+    profiles = set()
+    plan_users = set()
+    schedule_users = set()
+    removed_profiles = set()
+
+    for obj in session.new:
+        if isinstance(obj, Attendance):
+            if obj.status == 'present':
+                checkins.append((obj.student_id, obj.date))
+        elif isinstance(obj, StudentProfile):
+            profiles.add(obj.id)
+        elif isinstance(obj, (StudentDietPlan, WorkoutPlan)):
+            plan_users.update(_values(obj, 'student_id' if isinstance(obj, StudentDietPlan) else 'assigned_to'))
+        elif isinstance(obj, Schedule):
+            schedule_users.add(obj.user_id)
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Attendance):
+            if session.is_modified(obj) or obj in session.deleted:
+                profiles.update(_values(obj, 'student_id'))
+        elif isinstance(obj, StudentProfile) and obj in session.deleted:
+            removed_profiles.add(obj.id)
+        elif isinstance(obj, StudentDietPlan):
+            plan_users.update(_values(obj, 'student_id'))
+        elif isinstance(obj, WorkoutPlan):
+            plan_users.update(_values(obj, 'assigned_to'))
+        elif isinstance(obj, Schedule):
+            schedule_users.update(_values(obj, 'user_id'))
+    if not (checkins or profiles or plan_users or schedule_users):
+        return
+
+    connection = session.connection()
+
+    today = datetime.now().date()
+    for profile_id, day in sorted(checkins):
+        if profile_id not in profiles and not _record_checkin(connection, profile_id, day, today):
+            profiles.add(profile_id)
+    profiles -= removed_profiles
+    if profiles:
+        rebuild(connection, sorted(profiles))
+
+    # Plan and schedule fields belong to the user; profiles rebuilt above already have them
+    rebuilt_users = set(connection.execute(
+        select(profile_table.c.user_id).where(profile_table.c.id.in_(profiles))
+    ).scalars()) if profiles else set()
+    if plan_users - rebuilt_users:
+        _update_plan_counts(connection, plan_users - rebuilt_users)
+    if schedule_users - rebuilt_users:
+        _update_next_sessions(connection, schedule_users - rebuilt_users)
+
+
+def _record_checkin(connection, profile_id, day, today):
+    """
+    Apply one new visit to the stored row. Returns False when it cannot be
+    applied incrementally (no row yet, or a visit dated on or before the last
+    one) and the member needs a rebuild instead.
+    """
+    row = connection.execute(
+        select(summary_table).where(summary_table.c.profile_id == profile_id).with_for_update()
+    ).first()
+    if row is None or (row.last_visit is not None and day <= row.last_visit):
+        return False
+
+    streak = row.current_streak + 1 if row.last_visit == day - timedelta(days=1) else 1
+    in_window = row.window_start is not None and day >= row.window_start
+    connection.execute(summary_table.update().where(summary_table.c.profile_id == profile_id).values(
+        last_visit=day,
+        current_streak=streak,
+        longest_streak=max(row.longest_streak, streak),
+        visits_total=summary_table.c.visits_total + 1,
+        visits_30d=summary_table.c.visits_30d + (1 if in_window else 0),
+        updated_at=datetime.utcnow()
+    ))
+    return True
+
+
+def _visit_stats(dates, window_start):
+    """Summary fields from one member's visit dates in ascending order"""
+    stats = {'last_visit': None, 'current_streak': 0, 'longest_streak': 0,
+             'visits_total': 0, 'visits_30d': 0, 'window_start': window_start}
+    previous = None
+    for day in dates:
+        if day == previous:
+            continue
+        stats['current_streak'] = stats['current_streak'] + 1 if previous == day - timedelta(days=1) else 1
+        stats['longest_streak'] = max(stats['longest_streak'], stats['current_streak'])
+        stats['visits_total'] += 1
+        if day >= window_start:
+            stats['visits_30d'] += 1
+        previous = day
+    stats['last_visit'] = previous
+    return stats
+
+
+def _plan_counts(connection, user_ids):
+    diets = dict(connection.execute(
+        select(diet_table.c.student_id, func.count())
+        .where(diet_table.c.student_id.in_(user_ids), diet_table.c.status == 'active')
+        .group_by(diet_table.c.student_id)
+    ).all())
+    workouts = dict(connection.execute(
+        select(workout_table.c.assigned_to, func.count())
+        .where(workout_table.c.assigned_to.in_(user_ids))
+        .group_by(workout_table.c.assigned_to)
+    ).all())
+    return {user_id: {'active_diet_plans': diets.get(user_id, 0), 'workout_plans': workouts.get(user_id, 0)}
+            for user_id in user_ids}
+
+
+def _next_sessions(connection, user_ids):
+    now = datetime.now()
+    upcoming = select(schedule_table.c.user_id, func.min(schedule_table.c.scheduled_time).label('at'))\
+        .where(schedule_table.c.user_id.in_(user_ids), schedule_table.c.scheduled_time > now)\
+        .group_by(schedule_table.c.user_id).subquery()
+    rows = connection.execute(
+        select(schedule_table.c.user_id, schedule_table.c.id, schedule_table.c.scheduled_time, schedule_table.c.title)
+        .join(upcoming, and_(schedule_table.c.user_id == upcoming.c.user_id, schedule_table.c.scheduled_time == upcoming.c.at))
+        .order_by(schedule_table.c.id)
+    )
+    sessions = {user_id: {'next_session_id': None, 'next_session_at': None, 'next_session_title': None}
+                for user_id in user_ids}
+    for user_id, session_id, at, title in rows:
+        if sessions[user_id]['next_session_id'] is None:
+            sessions[user_id] = {'next_session_id': session_id, 'next_session_at': at, 'next_session_title': title}
+    return sessions
+
+
+def _update_plan_counts(connection, user_ids):
+    now = datetime.utcnow()
+    for user_id, values in sorted(_plan_counts(connection, list(user_ids)).items()):
+        connection.execute(summary_table.update().where(summary_table.c.user_id == user_id).values(updated_at=now, **values))
+
+
+def _update_next_sessions(connection, user_ids):
+    now = datetime.utcnow()
+    for user_id, values in sorted(_next_sessions(connection, list(user_ids)).items()):
+        connection.execute(summary_table.update().where(summary_table.c.user_id == user_id).values(updated_at=now, **values))
+
+
+def rebuild(connection, profile_ids):
+    """Recompute the summary rows of these profiles from their source rows. Returns the number written."""
+    profile_users = dict(connection.execute(
+        select(profile_table.c.id, profile_table.c.user_id).where(profile_table.c.id.in_(profile_ids))
+    ).all())
+    if not profile_users:
+        return 0
+
+    window_start = datetime.now().date() - timedelta(days=WINDOW_DAYS - 1)
+    visits = {profile_id: [] for profile_id in profile_users}
+    for profile_id, day in connection.execute(
+        select(attendance_table.c.student_id, attendance_table.c.date)
+        .where(attendance_table.c.student_id.in_(list(profile_users)), attendance_table.c.status == 'present')
+        .order_by(attendance_table.c.student_id, attendance_table.c.date)
+    ):
+        visits[profile_id].append(day)
+
+    user_ids = list(set(profile_users.values()))
+    plans = _plan_counts(connection, user_ids)
+    sessions = _next_sessions(connection, user_ids)
+
+    now = datetime.utcnow()
+    rows = [dict(
+        _visit_stats(visits[profile_id], window_start),
+        profile_id=profile_id, user_id=user_id, updated_at=now,
+        **plans[user_id], **sessions[user_id]
+    ) for profile_id, user_id in sorted(profile_users.items())]
+
+    connection.execute(summary_table.delete().where(summary_table.c.profile_id.in_(list(profile_users))))
+    connection.execute(summary_table.insert(), rows)
+    return len(rows)
+
+
+def roll_window(connection, lower_id, upper_id):
+    """
+    Move visits_30d of profiles lower_id < id <= upper_id to today's window,
+    recounting only rows whose window is stale. Returns the rows changed.
+    """
+    window_start = datetime.now().date() - timedelta(days=WINDOW_DAYS - 1)
+    recount = select(func.count()).select_from(attendance_table).where(
+        attendance_table.c.student_id == summary_table.c.profile_id,
+        attendance_table.c.status == 'present',
+        attendance_table.c.date >= window_start
+    ).scalar_subquery()
+    return connection.execute(summary_table.update().where(
+        summary_table.c.profile_id > lower_id,
+        summary_table.c.profile_id <= upper_id,
+        (summary_table.c.window_start < window_start) | (summary_table.c.window_start.is_(None))
+    ).values(visits_30d=recount, window_start=window_start, updated_at=datetime.utcnow())).rowcount
+
+
+def refresh_next_sessions(connection, limit=1000):
+    """Advance next_session_* for up to `limit` users whose next session has started. Returns the users updated."""
+    user_ids = list(connection.execute(
+        select(summary_table.c.user_id).distinct()
+        .where(summary_table.c.next_session_at <= datetime.now())
+        .limit(limit)
+    ).scalars())
+    if user_ids:
+        _update_next_sessions(connection, user_ids)
+    return len(user_ids)
+
+
+def card(summary, today=None):
+    """API representation of a summary row (or None for a member without one)"""
+    if summary is None:
+        return None
+    today = today or datetime.now().date()
+    on_streak = summary.last_visit is not None and summary.last_visit >= today - timedelta(days=1)
+    upcoming = summary.next_session_at is not None and summary.next_session_at > datetime.now()
+    return {
+        'last_visit': summary.last_visit.isoformat() if summary.last_visit else None,
+        'current_streak': summary.current_streak if on_streak else 0,
+        'longest_streak': summary.longest_streak,
+        'visits_30d': summary.visits_30d,
+        'visits_total': summary.visits_total,
+        'active_diet_plans': summary.active_diet_plans,
+        'workout_plans': summary.workout_plans,
+        'next_session': {
+            'id': summary.next_session_id,
+            'title': summary.next_session_title,
+            'scheduled_time': summary.next_session_at.isoformat()
+        } if upcoming else None
+    }
+
+
+def student_cards():
+    """Every student user with their first profile and its summary, in one query"""
+    first_profile = select(StudentProfile.user_id, func.min(StudentProfile.id).label('profile_id'))\
+        .group_by(StudentProfile.user_id).subquery()
+    return db.session.query(User, StudentProfile, MemberSummary)\
+        .outerjoin(first_profile, first_profile.c.user_id == User.id)\
+        .outerjoin(StudentProfile, StudentProfile.id == first_profile.c.profile_id)\
+        .outerjoin(MemberSummary, MemberSummary.profile_id == StudentProfile.id)\
+        .filter(User.role == 'student')\
+        .order_by(User.id)\
+        .all()
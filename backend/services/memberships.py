@@ -0,0 +1,115 @@
+import time
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+
+from models import db, StudentProfile
+from services import counters, dashboards, notifications, outbox
+
+# Membership terms and their expiry. A profile is 'active' until its
+# membership_end passes; jobs/expire_memberships.py (or the
+# expire_memberships background job) then sweeps the due profiles to
+# 'expired'. The sweep reads them from the (membership_status,
+# membership_end, id) index in batches of MEMBERSHIP_SWEEP_BATCH_SIZE, and
+# each batch is one short transaction: lock the batch (SKIP LOCKED, so two
+# sweepers split the work), one status-guarded UPDATE, one multi-row
+# notification INSERT, one multi-row outbox INSERT for the emails and the
+# counter deltas. No lock outlives its batch,
+# and a sweep that stops halfway is simply continued by the next one.
+#
+# Profiles without an end date never expire.
+
+EXPIRED_TITLE = 'Membership expired'
+EXPIRED_MESSAGE = 'Your membership has ended. Renew it at the front desk to keep booking sessions.'
+EXPIRED_EMAIL_SUBJECT = 'Your FitWell membership has expired'
+
+profile_table = StudentProfile.__table__
+
+_settings = {
+    'batch_size': 1000
+}
+
+
+def init_app(app):
+    _settings['batch_size'] = int(app.config.get('MEMBERSHIP_SWEEP_BATCH_SIZE', 1000))
+
+
+def parse_date(value):
+    """'YYYY-MM-DD' (or None/'' to clear) -> date; raises ValueError"""
+    if value in (None, ''):
+        return None
+    return date.fromisoformat(str(value)[:10])
+
+
+def serialize_term(profile):
+    return {
+        'membership_status': profile.membership_status,
+        'membership_start': profile.membership_start.isoformat() if profile.membership_start else None,
+        'membership_end': profile.membership_end.isoformat() if profile.membership_end else None
+    }
+
+
+def _due(today):
+    return (profile_table.c.membership_status == 'active') & (profile_table.c.membership_end < today)
+
+
+def due_count(today=None):
+    """Active memberships whose end date has passed"""
+    return db.session.execute(
+        select(func.count()).select_from(profile_table).where(_due(today or date.today()))
+    ).scalar()
+
+
+def expire_due(today=None, batch_size=None, throttle_ms=0):
+    """
+    Expire every active membership that ended before `today` and notify its
+    member, one committed batch at a time. Returns {'expired', 'batches', 'seconds'}.
+    """
+    today = today or date.today()
+    batch_size = batch_size or _settings['batch_size']
+    expired = batches = 0
+    started = time.perf_counter()
+    while True:
+        rows = db.session.execute(
+            select(profile_table.c.id, profile_table.c.user_id)
+            .where(_due(today))
+            .order_by(profile_table.c.membership_end, profile_table.c.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            db.session.commit()
+            break
+
+        changed = db.session.execute(
+            profile_table.update()
+            .where(profile_table.c.id.in_([row.id for row in rows]), profile_table.c.membership_status == 'active')
+            .values(membership_status='expired')
+        ).rowcount
+        if changed != len(rows):
+            # Another sweeper expired some of these in between (sqlite has no row
+            # locks); only changed rows may be notified, so read the batch again
+            db.session.rollback()
+            continue
+
+        # The Core UPDATE bypasses the counter listener
+        counters.add(db.session.connection(), {
+            counters.membership_counter('active'): -changed,
+            counters.membership_counter('expired'): changed
+        })
+        user_ids = sorted({row.user_id for row in rows if row.user_id is not None})
+        now = datetime.utcnow()
+        notifications.insert_many(user_ids, EXPIRED_TITLE, EXPIRED_MESSAGE, now)
+        outbox.email_users(db.session.connection(), user_ids, 'membership_expired', EXPIRED_EMAIL_SUBJECT,
+                           'Hi {name},\n\n' + EXPIRED_MESSAGE + '\n')
+        db.session.commit()
+        notifications.publish_many(user_ids, EXPIRED_TITLE, EXPIRED_MESSAGE, now)
+
+        expired += changed
+        batches += 1
+        if throttle_ms:
+            time.sleep(throttle_ms / 1000.0)
+
+    if expired:
+        dashboards.invalidate_all()
+    return {'expired': expired, 'batches': batches, 'seconds': round(time.perf_counter() - started, 3)}
@@ -0,0 +1,225 @@
+import json
+import time
+
+from sqlalchemy import event, inspect, select
+
+from models import db, Notification, Schedule, Trainer
+from utils.event_broker import LocalBroker, RedisBroker
+
+# Server-Sent Events for new notifications and schedule changes. A session
+# listener collects the events a flush produces and publishes them to the
+# broker once the transaction commits (a rollback drops them), and bulk
+# fan-outs publish one event per committed chunk. Each open stream is a
+# broker subscription: the request's DB session is released before the first
+# byte is sent, and between events the stream only waits on its queue, so an
+# idle connection holds no DB connection. Under the gevent worker class
+# (GUNICORN_WORKER_CLASS=gevent) it holds no thread either, only a greenlet.
+#
+# The local broker reaches streams in the publishing process only. With more
+# than one worker or host, EVENT_BROKER_URL=redis://... relays events through
+# Redis pub/sub instead.
+#
+# Under gunicorn every stream would pin a sync or gthread worker thread for
+# SSE_MAX_CONNECTION_SECONDS, and a local broker misses other workers' events.
+# gunicorn.conf.py reports the worker class and count (set_server), and
+# streams are only offered when they can work: gevent workers and a broker
+# that reaches all of them. Clients ask unavailable_reason() through the
+# unread-count endpoint before subscribing.
+
+_broker = LocalBroker()
+_settings = {
+    'heartbeat_seconds': 20.0,
+    'max_seconds': 600.0,
+    'max_connections': 1000,
+    'queue_size': 100,
+    'retry_ms': 3000,
+    'enabled': True
+}
+# Set by gunicorn.conf.py in each worker; left alone under the development server
+_server = {'worker_class': None, 'workers': 1}
+
+
+class StreamLimitReached(Exception):
+    """This worker already serves SSE_MAX_CONNECTIONS streams"""
+
+
+def init_app(app):
+    global _broker
+    url = app.config.get('EVENT_BROKER_URL')
+    _broker = RedisBroker(url) if url else LocalBroker()
+    _settings['heartbeat_seconds'] = float(app.config.get('SSE_HEARTBEAT_SECONDS', 20))
+    _settings['max_seconds'] = float(app.config.get('SSE_MAX_CONNECTION_SECONDS', 600))
+    _settings['max_connections'] = int(app.config.get('SSE_MAX_CONNECTIONS', 1000))
+    _settings['queue_size'] = int(app.config.get('SSE_QUEUE_SIZE', 100))
+    _settings['enabled'] = bool(app.config.get('SSE_ENABLED', True))
+    if not event.contains(db.session, 'after_flush', _collect_events):
+        event.listen(db.session, 'after_flush', _collect_events)
+        event.listen(db.session, 'after_commit', _publish_events)
+        event.listen(db.session, 'after_soft_rollback', _discard_events)
+
+
+def set_broker(broker):
+    """Swap the broker, e.g. for one shared with a test harness"""
+    global _broker
+    _broker = broker
+
+
+def set_server(worker_class, workers):
+    """Record the gunicorn worker class and worker count this process runs under"""
+    _server['worker_class'] = worker_class
+    _server['workers'] = workers
+
+
+def unavailable_reason():
+    """Why this server cannot serve streams, or None when it can"""
+    if not _settings['enabled']:
+        return 'Notification streams are turned off (SSE_ENABLED)'
+    if _server['worker_class'] not in (None, 'gevent'):
+        return 'Notification streams need the gevent worker class'
+    if isinstance(_broker, LocalBroker) and _server['workers'] > 1:
+        return 'Notification streams need EVENT_BROKER_URL with more than one worker'
+    return None
+
+
+# Publishing
+
+def serialize_notification(notification):
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        'read': bool(notification.read)
+    }
+
+
+def _schedule_event(entry, action):
+    return {
+        'action': action,
+        'id': entry.id,
+        'title': entry.title,
+        'scheduled_time': entry.scheduled_time.isoformat() if entry.scheduled_time else None,
+        'duration_minutes': entry.duration_minutes,
+        'location': entry.location,
+        'trainer_id': entry.trainer_id
+    }
+
+
+def _trainer_user_ids(session, trainer_ids):
+    trainer_ids = {trainer_id for trainer_id in trainer_ids if trainer_id is not None}
+    if not trainer_ids:
+        return []
+    return session.connection().execute(
+        select(Trainer.user_id).where(Trainer.id.in_(trainer_ids))
+    ).scalars().all()
+
+
+def _collect_events(session, flush_context):
+    pending = session.info.setdefault('stream_events', [])
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            pending.append(([obj.user_id], {'event': 'notification', 'id': obj.id,
+                                            'data': serialize_notification(obj)}))
+    changes = [(obj, 'created') for obj in session.new if isinstance(obj, Schedule)]
+    changes += [(obj, 'updated') for obj in session.dirty
+                if isinstance(obj, Schedule) and session.is_modified(obj, include_collections=False)]
+    changes += [(obj, 'deleted') for obj in session.deleted if isinstance(obj, Schedule)]
+    for entry, action in changes:
+        # A reassigned session is news to the previous member and trainer as well
+        state = inspect(entry)
+        user_ids = {entry.user_id, *state.attrs.user_id.history.deleted}
+        trainer_ids = {entry.trainer_id, *state.attrs.trainer_id.history.deleted}
+        user_ids.update(_trainer_user_ids(session, trainer_ids))
+        user_ids.discard(None)
+        pending.append((sorted(user_ids), {'event': 'schedule', 'data': _schedule_event(entry, action)}))
+
+
+def _publish_events(session):
+    for user_ids, payload in session.info.pop('stream_events', ()):
+        publish(user_ids, payload['event'], payload['data'], payload.get('id'))
+
+
+def _discard_events(session, previous_transaction):
+    session.info.pop('stream_events', None)
+
+
+def publish(user_ids, event_type, data, event_id=None):
+    """Send one event to every open stream of the given users. Call after the change commits."""
+    if user_ids:
+        try:
+            _broker.publish(user_ids, {'event': event_type, 'id': event_id, 'data': data})
+        except Exception as e:
+            # Streams are best effort; the change itself is already committed
+            print(f"Event publish error: {str(e)}")
+
+
+# Streaming
+
+def _format(payload):
+    lines = []
+    if payload.get('id') is not None:
+        lines.append(f"id: {payload['id']}")
+    lines.append(f"event: {payload['event']}")
+    lines.append(f"data: {json.dumps(payload['data'], separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventStream:
+    """
+    The body of one SSE response. Subscribes when created, so nothing
+    committed between the replay query and the first read is missed, and
+    unsubscribes when the server closes the response, even if it was never
+    iterated. Needs no app context while streaming.
+    """
+
+    def __init__(self, user_id):
+        if _broker.connections() >= _settings['max_connections']:
+            raise StreamLimitReached()
+        self._broker = _broker
+        self._subscription = self._broker.subscribe(user_id, _settings['queue_size'])
+        self._replay = []
+        self._closed = False
+
+    def replay(self, notifications):
+        """Send these serialized notifications first; live events they cover are skipped"""
+        self._replay = [{'event': 'notification', 'id': item['id'], 'data': item} for item in notifications]
+
+    def __iter__(self):
+        heartbeat = _settings['heartbeat_seconds']
+        deadline = time.monotonic() + _settings['max_seconds']
+        last_id = max((item['id'] for item in self._replay), default=0)
+        try:
+            yield f"retry: {_settings['retry_ms']}\n\n"
+            for payload in self._replay:
+                yield _format(payload)
+            while not self._closed and time.monotonic() < deadline:
+                payload = self._subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0.01)))
+                if self._subscription.overflowed:
+                    # Too far behind: the client reloads its lists and reconnects
+                    yield _format({'event': 'reset', 'data': {}})
+                    return
+                if payload is None:
+                    yield ': keepalive\n\n'
+                elif payload.get('id') is None or payload['id'] > last_id:
+                    yield _format(payload)
+        finally:
+            self.close()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._broker.unsubscribe(self._subscription)
+
+
+def replay_since(user_id, last_event_id, limit=50):
+    """Notifications created after the client's Last-Event-ID, oldest first"""
+    rows = db.session.execute(
+        select(Notification).where(Notification.user_id == user_id, Notification.id > last_event_id)
+        .order_by(Notification.id.desc()).limit(limit)
+    ).scalars().all()
+    return [serialize_notification(row) for row in reversed(rows)]
+
+
+def stats():
+    return {'connections': _broker.connections(), 'broker': type(_broker).__name__,
+            'available': unavailable_reason() is None, 'unavailable_reason': unavailable_reason()}
@@ -0,0 +1,141 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from models import db, User, Notification, Broadcast
+from services import dashboards, notification_stream, unread_counters
+
+# Fan-out of one message to many users. Notification rows are written with
+# Core multi-row INSERTs of NOTIFICATION_CHUNK_SIZE rows, each chunk in its own
+# transaction, instead of one ORM object per recipient: 50k recipients are
+# ~50 statements and no transaction holds locks for the whole send. A
+# Broadcast row records the audience, progress and send time. The inserts
+# bypass session listeners, so each chunk bumps the unread counters in its own
+# transaction, is published to open notification streams once committed, and
+# cached dashboards are dropped afterwards.
+
+AUDIENCES = {
+    'members': ('student',),
+    'trainers': ('trainer',),
+    'staff': ('staff', 'admin'),
+    'everyone': ('student', 'trainer', 'staff', 'admin')
+}
+
+_chunk_size = 1000
+
+
+def init_app(app):
+    global _chunk_size
+    _chunk_size = int(app.config.get('NOTIFICATION_CHUNK_SIZE', 1000))
+
+
+def audience_ids(audience):
+    """User ids of a named audience, ascending"""
+    if audience not in AUDIENCES:
+        raise ValueError(f"audience must be one of {', '.join(AUDIENCES)}")
+    return db.session.execute(
+        select(User.id).where(User.role.in_(AUDIENCES[audience])).order_by(User.id)
+    ).scalars().all()
+
+
+def fan_out(user_ids, title, message, chunk_size=None, on_chunk=None):
+    """
+    Insert one unread notification per user id, committing every chunk.
+    on_chunk(sent_so_far, chunk) runs before each commit, in the chunk's
+    transaction. Returns the number sent.
+    """
+    chunk_size = chunk_size or _chunk_size
+    user_ids = list(user_ids)
+    now = datetime.utcnow()
+    sent = 0
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        insert_many(chunk, title, message, now)
+        sent += len(chunk)
+        if on_chunk:
+            on_chunk(sent, chunk)
+        db.session.commit()
+        publish_many(chunk, title, message, now)
+    dashboards.invalidate_all()
+    return sent
+
+
+def insert_many(user_ids, title, message, now):
+    """
+    One multi-row INSERT of unread notifications plus their unread counter
+    deltas, in the current transaction. The caller commits, then calls
+    publish_many() and drops the affected dashboards.
+    """
+    user_ids = list(user_ids)
+    if user_ids:
+        db.session.execute(insert(Notification), [
+            {'user_id': user_id, 'title': title, 'message': message, 'read': False, 'created_at': now}
+            for user_id in user_ids
+        ])
+        unread_counters.add(db.session.connection(), dict.fromkeys(user_ids, 1))
+
+
+def publish_many(user_ids, title, message, now):
+    # Multi-row inserts do not return ids, so streams get the row without one
+    notification_stream.publish(list(user_ids), 'notification', {
+        'id': None, 'title': title, 'message': message, 'created_at': now.isoformat(), 'read': False
+    })
+
+
+def broadcast(title, message, audience, sender_id, user_ids=None):
+    """
+    Send to a named audience (or to user_ids, e.g. a segment) and record it.
+    Returns the committed Broadcast.
+    """
+    if user_ids is None:
+        user_ids = audience_ids(audience)
+    record = Broadcast(title=title, message=message, audience=audience, created_by=sender_id,
+                       recipients=len(user_ids), sent=0)
+    db.session.add(record)
+    db.session.commit()
+    return send(record, user_ids)
+
+
+def send(record, user_ids):
+    """
+    Fan a recorded Broadcast out to user_ids in ascending order. Each chunk
+    commits with record.last_user_id, so a retried background send resumes
+    after the last id it reached even if the audience changed in between:
+    nobody is notified twice and nobody who joined is skipped.
+    """
+    user_ids = sorted(set(user_ids))
+    already_sent = record.sent or 0
+    if record.last_user_id is not None:
+        user_ids = [user_id for user_id in user_ids if user_id > record.last_user_id]
+    else:
+        # Interrupted before last_user_id was recorded (migration 0017)
+        user_ids = user_ids[already_sent:]
+    record.recipients = already_sent + len(user_ids)
+    started = time.perf_counter()
+
+    def progress(sent, chunk):
+        record.sent = already_sent + sent
+        record.last_user_id = chunk[-1]
+
+    fan_out(user_ids, record.title, record.message, on_chunk=progress)
+    record.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    record.completed_at = datetime.utcnow()
+    db.session.commit()
+    return record
+
+
+def serialize_broadcast(record):
+    return {
+        'id': record.id,
+        'title': record.title,
+        'message': record.message,
+        'audience': record.audience,
+        'created_by': record.created_by,
+        'recipients': record.recipients,
+        'sent': record.sent,
+        'send_ms': record.duration_ms,
+        'status': 'sent' if record.completed_at else 'sending' if record.sent else 'queued',
+        'created_at': record.created_at.isoformat() if record.created_at else None,
+        'completed_at': record.completed_at.isoformat() if record.completed_at else None
+    }
@@ -0,0 +1,284 @@
+import random
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from sqlalchemy import event, func, inspect, insert, select
+
+from models import db, OutboxMessage, Schedule, User
+
+# Transactional outbox for email. A change that members should hear about
+# writes its messages to outbox_message on the same connection and in the
+# same transaction as the change itself: they commit together or not at all,
+# and sending never happens inside a request. jobs/deliver_outbox.py claims
+# due messages in batches (SELECT ... FOR UPDATE SKIP LOCKED, then a
+# status-guarded UPDATE, like the job queue), sends them over pooled SMTP
+# connections and records each result; a failed send is retried after an
+# exponential backoff until OUTBOX_MAX_ATTEMPTS.
+#
+# Schedule changes are picked up by a session listener: a booking writes a
+# confirmation now and a reminder due SCHEDULE_REMINDER_HOURS before the
+# session, a move or cancellation withdraws the pending reminder and says so.
+# The membership expiry sweep writes its emails with add_many() per batch.
+# Core statements on schedule (e.g. account deletion) bypass the listener.
+
+STATUSES = ('pending', 'sending', 'sent', 'failed', 'cancelled')
+REMINDER = 'session_reminder'
+
+outbox_table = OutboxMessage.__table__
+user_table = User.__table__
+
+_settings = {
+    'from_address': 'FitWell Gym <no-reply@fitwell.local>',
+    'max_attempts': 5,
+    'retry_base_seconds': 30.0,
+    'retry_max_seconds': 3600.0,
+    'lease_seconds': 300.0,
+    'reminder_hours': 24.0
+}
+
+
+def init_app(app):
+    _settings['from_address'] = app.config.get('OUTBOX_FROM_ADDRESS', _settings['from_address'])
+    _settings['max_attempts'] = int(app.config.get('OUTBOX_MAX_ATTEMPTS', 5))
+    _settings['retry_base_seconds'] = float(app.config.get('OUTBOX_RETRY_BASE_SECONDS', 30))
+    _settings['retry_max_seconds'] = float(app.config.get('OUTBOX_RETRY_MAX_SECONDS', 3600))
+    _settings['lease_seconds'] = float(app.config.get('OUTBOX_LEASE_SECONDS', 300))
+    _settings['reminder_hours'] = float(app.config.get('SCHEDULE_REMINDER_HOURS', 24))
+    if not event.contains(db.session, 'after_flush', _collect_schedule_messages):
+        event.listen(db.session, 'after_flush', _collect_schedule_messages)
+
+
+# Writing (in the transaction of the change)
+
+def contacts(connection, user_ids):
+    """{user_id: (email, name)} for the users that have an email address"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return {}
+    rows = connection.execute(
+        select(user_table.c.id, user_table.c.email, user_table.c.name).where(user_table.c.id.in_(user_ids))
+    )
+    return {row.id: (row.email, row.name) for row in rows if row.email}
+
+
+def add_many(connection, messages, now=None):
+    """
+    Queue [{'kind', 'user_id', 'recipient', 'subject', 'body'}, optionally
+    'ref' and 'send_at'] with one multi-row INSERT on `connection`. They are
+    sent once the caller's transaction commits. Returns the number queued.
+    """
+    if not messages:
+        return 0
+    now = now or datetime.utcnow()
+    connection.execute(insert(outbox_table), [{
+        'channel': 'email',
+        'kind': message['kind'],
+        'ref': message.get('ref'),
+        'user_id': message.get('user_id'),
+        'recipient': message['recipient'],
+        'subject': message['subject'],
+        'body': message['body'],
+        'status': 'pending',
+        'attempts': 0,
+        'next_attempt_at': max(message.get('send_at') or now, now),
+        'created_at': now
+    } for message in messages])
+    return len(messages)
+
+
+def email_users(connection, user_ids, kind, subject, body, ref=None, send_at=None):
+    """Queue one email per user; `body` may use {name}. Returns the number queued."""
+    return add_many(connection, [
+        {'kind': kind, 'ref': ref, 'user_id': user_id, 'recipient': email, 'subject': subject,
+         'body': body.format(name=name or 'member'), 'send_at': send_at}
+        for user_id, (email, name) in sorted(contacts(connection, user_ids).items())
+    ])
+
+
+def withdraw(connection, ref, kind=REMINDER):
+    """Cancel pending messages about `ref`, e.g. the reminder of a moved session"""
+    return connection.execute(
+        outbox_table.update()
+        .where(outbox_table.c.ref == ref, outbox_table.c.kind == kind, outbox_table.c.status == 'pending')
+        .values(status='cancelled')
+    ).rowcount
+
+
+def _utc(local_time):
+    # Session times are entered in the gym's local time; outbox times are UTC
+    return datetime.utcfromtimestamp(local_time.timestamp())
+
+
+def _when(entry):
+    text = f"{entry.scheduled_time:%A %d %B %Y at %H:%M}"
+    return f"{text}, {entry.location}" if entry.location else text
+
+
+def _session_messages(entry, action, user_id, contact, now):
+    email, name = contact
+    ref = f"schedule:{entry.id}"
+    greeting = f"Hi {name or 'member'},\n\n"
+    base = {'ref': ref, 'user_id': user_id, 'recipient': email}
+    if action == 'cancelled':
+        return [dict(base, kind='session_cancelled', subject=f"Cancelled: {entry.title}",
+                     body=f"{greeting}Your session \"{entry.title}\" on {_when(entry)} has been cancelled.\n")]
+    verb = 'booked' if action == 'created' else 'changed'
+    messages = [dict(base, kind=f"session_{verb}", subject=f"Session {verb}: {entry.title}",
+                     body=f"{greeting}Your session \"{entry.title}\" is on {_when(entry)}.\n")]
+    remind_at = _utc(entry.scheduled_time) - timedelta(hours=_settings['reminder_hours'])
+    if remind_at > now:
+        messages.append(dict(base, kind=REMINDER, subject=f"Reminder: {entry.title}", send_at=remind_at,
+                             body=f"{greeting}This is a reminder of your session \"{entry.title}\" "
+                                  f"on {_when(entry)}.\n"))
+    return messages
+
+
+def _collect_schedule_messages(session, flush_context):
+    changes = [(obj, 'created', obj.user_id) for obj in session.new if isinstance(obj, Schedule)]
+    for obj in session.dirty:
+        if isinstance(obj, Schedule) and session.is_modified(obj, include_collections=False):
+            state = inspect(obj)
+            previous = state.attrs.user_id.history.deleted
+            if previous and previous[0] != obj.user_id:
+                # Moved to another member: booked for the new one, cancelled for the previous one
+                changes += [(obj, 'cancelled', previous[0]), (obj, 'created', obj.user_id)]
+            elif any(state.attrs[name].history.has_changes() for name in ('scheduled_time', 'duration_minutes', 'location', 'title')):
+                changes.append((obj, 'changed', obj.user_id))
+    changes += [(obj, 'cancelled', obj.user_id) for obj in session.deleted if isinstance(obj, Schedule)]
+    if not changes:
+        return
+
+    connection = session.connection()
+    # Whatever happened to an existing session, its pending reminder is out of date
+    for entry_id in sorted({entry.id for entry, _, _ in changes if entry not in session.new}):
+        withdraw(connection, f"schedule:{entry_id}")
+
+    local_now = datetime.now()
+    changes = [change for change in changes if change[0].scheduled_time and change[0].scheduled_time > local_now]
+    people = contacts(connection, {user_id for _, _, user_id in changes})
+    now = datetime.utcnow()
+    messages = []
+    for entry, action, user_id in changes:
+        if user_id in people:
+            messages += _session_messages(entry, action, user_id, people[user_id], now)
+    add_many(connection, messages, now)
+
+
+# Delivery (jobs/deliver_outbox.py)
+
+def build_email(recipient, subject, body):
+    message = EmailMessage()
+    message['From'] = _settings['from_address']
+    message['To'] = recipient
+    message['Subject'] = subject
+    message.set_content(body)
+    return message
+
+
+def claim(limit, worker_id):
+    """
+    Lock up to `limit` due messages for worker_id and commit. Returns
+    [(id, recipient, subject, body)], oldest due first.
+    """
+    if limit <= 0:
+        return []
+    now = datetime.utcnow()
+    candidates = db.session.execute(
+        select(outbox_table.c.id)
+        .where(outbox_table.c.status == 'pending', outbox_table.c.next_attempt_at <= now,
+               outbox_table.c.channel == 'email')
+        .order_by(outbox_table.c.next_attempt_at, outbox_table.c.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not candidates:
+        db.session.commit()
+        return []
+    db.session.execute(
+        outbox_table.update().where(outbox_table.c.id.in_(candidates), outbox_table.c.status == 'pending')
+        .values(status='sending', locked_by=worker_id, locked_at=now, attempts=outbox_table.c.attempts + 1)
+    )
+    rows = db.session.execute(
+        select(outbox_table.c.id, outbox_table.c.recipient, outbox_table.c.subject, outbox_table.c.body)
+        .where(outbox_table.c.id.in_(candidates), outbox_table.c.locked_by == worker_id,
+               outbox_table.c.status == 'sending')
+        .order_by(outbox_table.c.id)
+    ).all()
+    db.session.commit()
+    return [tuple(row) for row in rows]
+
+
+def backoff_seconds(attempt):
+    """Delay before retry number `attempt` (1-based): exponential, capped, with +-20% jitter"""
+    delay = min(_settings['retry_base_seconds'] * 2 ** (attempt - 1), _settings['retry_max_seconds'])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def record(worker_id, sent_ids, failures):
+    """
+    Store a batch's results: sent_ids in one UPDATE, then each failure as
+    (id, error, permanent), retried after a backoff unless permanent or out
+    of attempts. Returns (retrying, failed) counts.
+    """
+    now = datetime.utcnow()
+    owned = (outbox_table.c.locked_by == worker_id) & (outbox_table.c.status == 'sending')
+    if sent_ids:
+        db.session.execute(outbox_table.update().where(outbox_table.c.id.in_(sent_ids), owned).values(
+            status='sent', sent_at=now, last_error=None, locked_by=None, locked_at=None
+        ))
+    retrying = failed = 0
+    if failures:
+        attempts = dict(db.session.execute(
+            select(outbox_table.c.id, outbox_table.c.attempts)
+            .where(outbox_table.c.id.in_([message_id for message_id, _, _ in failures]))
+        ).all())
+        for message_id, error, permanent in failures:
+            tries = attempts.get(message_id, 0)
+            if permanent or tries >= _settings['max_attempts']:
+                values = {'status': 'failed'}
+                failed += 1
+            else:
+                values = {'status': 'pending', 'next_attempt_at': now + timedelta(seconds=backoff_seconds(tries))}
+                retrying += 1
+            db.session.execute(outbox_table.update().where(outbox_table.c.id == message_id, owned).values(
+                last_error=str(error)[:2000], locked_by=None, locked_at=None, **values
+            ))
+    db.session.commit()
+    return retrying, failed
+
+
+def requeue_stale():
+    """Make messages claimed by a worker that stopped before recording them due again"""
+    now = datetime.utcnow()
+    requeued = db.session.execute(
+        outbox_table.update()
+        .where(outbox_table.c.status == 'sending',
+               outbox_table.c.locked_at < now - timedelta(seconds=_settings['lease_seconds']))
+        .values(status='pending', next_attempt_at=now, locked_by=None, locked_at=None,
+                last_error='delivery worker stopped responding')
+    ).rowcount
+    db.session.commit()
+    return requeued
+
+
+# Reporting
+
+def stats():
+    now = datetime.utcnow()
+    counts = dict(db.session.execute(
+        select(outbox_table.c.status, func.count()).group_by(outbox_table.c.status)
+    ).all())
+    oldest_due = db.session.execute(
+        select(func.min(outbox_table.c.next_attempt_at))
+        .where(outbox_table.c.status == 'pending', outbox_table.c.next_attempt_at <= now)
+    ).scalar()
+    sent_last_hour = db.session.execute(
+        select(func.count()).select_from(outbox_table)
+        .where(outbox_table.c.status == 'sent', outbox_table.c.sent_at >= now - timedelta(hours=1))
+    ).scalar()
+    return {
+        'counts': {status: counts.get(status, 0) for status in STATUSES},
+        'oldest_due_seconds': round((now - oldest_due).total_seconds(), 1) if oldest_due else None,
+        'sent_last_hour': sent_last_hour,
+        'sent_per_minute': round(sent_last_hour / 60, 1)
+    }
@@ -0,0 +1,128 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+# Password hashing runs on a small bounded pool instead of the request thread.
+# A burst of logins then queues on the pool, and requests beyond the queue
+# limit are refused with PasswordHasherBusy, while the worker's other threads
+# keep serving. PBKDF2 and scrypt release the GIL, so a thread pool is enough
+# for most deployments; PASSWORD_HASH_EXECUTOR=process moves the work out of
+# the worker process entirely. A check still waiting after PASSWORD_HASH_TIMEOUT
+# is cancelled and refused the same way; its slot is only freed once the pool is
+# done with it, so slow hashes cannot pile up beyond the limit.
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full or a hash timed out; the caller should answer 503"""
+
+
+def method_prefix(method):
+    """The method part Werkzeug stores in front of a hash, e.g. 'pbkdf2' -> 'pbkdf2:sha256:600000'"""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        if not args:
+            return 'scrypt:32768:8:1'
+        if len(args) != 3:
+            raise ValueError("'scrypt' takes 3 arguments.")
+        return 'scrypt:' + ':'.join(str(int(arg)) for arg in args)
+    if name == 'pbkdf2':
+        if len(args) > 2:
+            raise ValueError("'pbkdf2' takes 2 arguments.")
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    return method
+
+
+class _Hasher:
+    def __init__(self):
+        self.method = DEFAULT_METHOD
+        self.method_prefix = DEFAULT_METHOD
+        self.executor_kind = 'thread'
+        self.workers = 2
+        self.queue_limit = 32
+        self.timeout = 10.0
+        self._executor = None
+        self._executor_pid = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+        self._lock = threading.Lock()
+
+    def configure(self, method, executor_kind, workers, queue_limit, timeout):
+        self.method = method
+        self.method_prefix = method_prefix(method)
+        self.executor_kind = executor_kind
+        self.workers = max(int(workers), 1)
+        self.queue_limit = max(int(queue_limit), 0)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+        self.shutdown()
+
+    def _get_executor(self):
+        # Pools do not survive fork, so each gunicorn worker builds its own on first use
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._lock:
+                if self._executor is None or self._executor_pid != pid:
+                    if self.executor_kind == 'process':
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                    self._executor_pid = pid
+        return self._executor
+
+    def run(self, fn, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Too many password checks in progress')
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # Held until the pool is done with it, not until this request gives up waiting
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise PasswordHasherBusy('Password check timed out')
+
+    def shutdown(self):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=False)
+        self._executor = None
+        self._executor_pid = None
+
+
+_hasher = _Hasher()
+
+
+def init_app(app):
+    _hasher.configure(
+        app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+        app.config.get('PASSWORD_HASH_EXECUTOR', 'thread'),
+        app.config.get('PASSWORD_HASH_WORKERS', 2),
+        app.config.get('PASSWORD_HASH_QUEUE_LIMIT', 32),
+        float(app.config.get('PASSWORD_HASH_TIMEOUT', 10))
+    )
+
+
+def hash_password(password):
+    """Hash with the configured method on the hashing pool"""
+    return _hasher.run(generate_password_hash, password, _hasher.method)
+
+
+def verify_password(password_hash, password):
+    """check_password_hash on the hashing pool"""
+    if not password_hash:
+        return False
+    return _hasher.run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with a different method or cost than the current policy"""
+    return bool(password_hash) and password_hash.split('$', 1)[0] != _hasher.method_prefix
@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, RoomLock, Schedule, Trainer, User
+from utils.interval_index import IntervalIndex
+
+# Double-booking checks for schedule entries. A session occupies
+# [scheduled_time, ends_at) and conflicts with any other session of the same
+# trainer, the same member or the same room that overlaps it. Rooms are the
+# locations not listed in SCHEDULE_SHARED_LOCATIONS (the main floor hosts
+# many sessions at once). Rooms compare by Schedule.location_key, the
+# location trimmed and lower-cased, so 'Studio A' and 'studio a ' are one room.
+#
+# Sessions last at most SCHEDULE_MAX_DURATION_MINUTES, so an overlapping
+# session starts in [start - max duration, end): each party's candidates are
+# one range scan of its (trainer_id | user_id | location_key, scheduled_time)
+# index, however many sessions it has. find() checks a whole batch at once:
+# one query per party kind over the batch's time span, then an in-memory
+# IntervalIndex per trainer, member and room that also catches overlaps
+# inside the batch. Rows written by raw SQL before migration 0015 may lack
+# ends_at; it is recomputed from the duration. Raw SQL writes must set
+# location_key themselves (location_key()).
+#
+# lock_parties() serializes bookings that share a party: trainer and member
+# rows are locked FOR UPDATE, and each room through its room_lock row.
+
+_settings = {
+    'max_duration_minutes': 240,
+    'shared_locations': {'main gym'},
+    'bulk_max': 500
+}
+
+
+def init_app(app):
+    _settings['max_duration_minutes'] = int(app.config.get('SCHEDULE_MAX_DURATION_MINUTES', 240))
+    _settings['shared_locations'] = {
+        location.strip().lower() for location in app.config.get('SCHEDULE_SHARED_LOCATIONS', 'Main Gym').split(',')
+        if location.strip()
+    }
+    _settings['bulk_max'] = int(app.config.get('SCHEDULE_BULK_MAX', 500))
+    if not event.contains(Schedule, 'before_insert', _set_derived_columns):
+        event.listen(Schedule, 'before_insert', _set_derived_columns)
+        event.listen(Schedule, 'before_update', _set_derived_columns)
+
+
+def _set_derived_columns(mapper, connection, target):
+    if target.scheduled_time is not None:
+        target.ends_at = target.scheduled_time + timedelta(minutes=target.duration_minutes or 60)
+    target.location_key = location_key(target.location)
+
+
+def location_key(location):
+    """The stored, comparable form of a location: trimmed and lower-cased, or None"""
+    return (location.strip().lower() or None) if location else None
+
+
+def max_duration():
+    return _settings['max_duration_minutes']
+
+
+def bulk_max():
+    return _settings['bulk_max']
+
+
+def is_room(location):
+    return location_key(location) is not None and location_key(location) not in _settings['shared_locations']
+
+
+def parse_duration(value):
+    """Minutes from a request value, default 60; raises ValueError outside 5 to the maximum"""
+    try:
+        minutes = 60 if value in (None, '') else int(value)
+    except (TypeError, ValueError):
+        raise ValueError('duration_minutes must be a whole number of minutes')
+    if not 5 <= minutes <= _settings['max_duration_minutes']:
+        raise ValueError(f"duration_minutes must be between 5 and {_settings['max_duration_minutes']}")
+    return minutes
+
+
+def lock_parties(trainer_ids, user_ids, locations=()):
+    """
+    Lock the trainers' and members' rows and the rooms' room_lock rows (FOR
+    UPDATE, in key order) until the caller commits, so two requests booking
+    the same people or room check and insert one after the other instead of
+    both passing the check.
+    """
+    trainer_ids = sorted({trainer_id for trainer_id in trainer_ids if trainer_id is not None})
+    user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+    rooms = sorted({location_key(location) for location in locations if is_room(location)})
+    if trainer_ids:
+        db.session.execute(select(Trainer.id).where(Trainer.id.in_(trainer_ids)).order_by(Trainer.id).with_for_update())
+    if user_ids:
+        db.session.execute(select(User.id).where(User.id.in_(user_ids)).order_by(User.id).with_for_update())
+    if rooms:
+        _ensure_room_locks(rooms)
+        db.session.execute(select(RoomLock.room_key).where(RoomLock.room_key.in_(rooms))
+                           .order_by(RoomLock.room_key).with_for_update())
+
+
+def _ensure_room_locks(rooms):
+    known = set(db.session.execute(select(RoomLock.room_key).where(RoomLock.room_key.in_(rooms))).scalars())
+    for room in rooms:
+        if room in known:
+            continue
+        # A concurrent first booking of the room may insert the same row; either one will do
+        try:
+            with db.session.begin_nested():
+                db.session.execute(RoomLock.__table__.insert().values(room_key=room, created_at=datetime.utcnow()))
+        except IntegrityError:
+            pass
+
+
+def _party_keys(session):
+    keys = []
+    if session.get('trainer_id') is not None:
+        keys.append(('trainer', session['trainer_id']))
+    if session.get('user_id') is not None:
+        keys.append(('member', session['user_id']))
+    if is_room(session.get('location')):
+        keys.append(('room', location_key(session['location'])))
+    return keys
+
+
+def _existing(sessions, window_start, window_end, exclude_ids):
+    """Stored sessions of the batch's parties starting in [window_start, window_end), by party key"""
+    columns = {'trainer': Schedule.trainer_id, 'member': Schedule.user_id, 'room': Schedule.location_key}
+    wanted = {
+        'trainer': {session.get('trainer_id') for session in sessions} - {None},
+        'member': {session.get('user_id') for session in sessions} - {None},
+        'room': {location_key(session['location']) for session in sessions if is_room(session.get('location'))}
+    }
+    found = {}
+    for kind, column in columns.items():
+        values = sorted(wanted[kind])
+        if not values:
+            continue
+        rows = db.session.execute(
+            select(Schedule.id, Schedule.title, Schedule.scheduled_time, Schedule.ends_at, Schedule.duration_minutes,
+                   Schedule.trainer_id, Schedule.user_id, Schedule.location)
+            .where(column.in_(values), Schedule.scheduled_time >= window_start, Schedule.scheduled_time < window_end)
+        ).all()
+        for row in rows:
+            if row.id in exclude_ids:
+                continue
+            value = location_key(row.location) if kind == 'room' else getattr(row, column.key)
+            ends_at = row.ends_at or row.scheduled_time + timedelta(minutes=row.duration_minutes or 60)
+            found.setdefault((kind, value), []).append((row.scheduled_time, ends_at, {
+                'id': row.id,
+                'title': row.title,
+                'scheduled_time': row.scheduled_time.isoformat(),
+                'ends_at': ends_at.isoformat()
+            }))
+    return found
+
+
+def find(sessions, exclude_ids=()):
+    """
+    Conflicts of the proposed sessions with stored ones and with each other.
+    Each session is {'scheduled_time', 'duration_minutes', 'trainer_id',
+    'user_id', 'location'}; ids in exclude_ids (the entry being edited) are
+    ignored. Returns [{'index', 'party', 'with'}] in session order, where
+    'with' is a stored session or {'index': n} of an earlier one in the batch.
+    """
+    if not sessions:
+        return []
+    exclude_ids = set(exclude_ids)
+    spans = [(session['scheduled_time'], session['scheduled_time'] + timedelta(minutes=session['duration_minutes']))
+             for session in sessions]
+    window_start = min(start for start, _ in spans) - timedelta(minutes=max_duration())
+    window_end = max(end for _, end in spans)
+    indexes = {key: IntervalIndex(intervals)
+               for key, intervals in _existing(sessions, window_start, window_end, exclude_ids).items()}
+
+    conflicts = []
+    for position, (session, (start, end)) in enumerate(zip(sessions, spans)):
+        for key in _party_keys(session):
+            index = indexes.setdefault(key, IntervalIndex())
+            for _, _, other in index.overlapping(start, end):
+                conflicts.append({'index': position, 'party': key[0], 'with': other})
+            index.add(start, end, {'index': position})
+    return conflicts
@@ -0,0 +1,236 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from models import db, User, StudentProfile, StudentDietPlan, WorkoutPlan, Schedule, Trainer, AttendanceBitmap
+from utils.day_bitmap import DayBitmap
+from utils.roaring_bitmap import RoaringBitmap
+
+# Member segments for targeting, e.g. "active members who have not attended in
+# 14 days and have no diet plan". An index of RoaringBitmaps of student user
+# ids per predicate value is loaded with a handful of set-based queries and
+# kept for SEGMENT_INDEX_TTL seconds; a segment expression is then evaluated
+# with bitmap and/or/andnot only. Attendance windows are computed from the
+# attendance day bitmaps the first time a window is asked for and cached with
+# the index.
+#
+# Segment expressions are JSON:
+#   {"and": [expr, ...]}, {"or": [expr, ...]}, {"not": expr}
+#   {"membership_status": "active"}      a value or a list of values
+#   {"department": ["CS", "EE"]}
+#   {"trainer_id": 3}                    members with a session or workout plan from the trainer
+#   {"has_diet_plan": true}              an active diet plan
+#   {"has_workout_plan": false}
+#   {"attended_within_days": 14}         present on any of the last N days
+#   {"attended_between": ["2024-01-01", "2024-01-31"]}
+
+MAX_WINDOW_DAYS = 3 * 366
+
+
+class SegmentError(ValueError):
+    """An invalid segment expression"""
+
+
+class _SegmentIndex:
+    def __init__(self):
+        self.ttl_seconds = 300
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self.members = RoaringBitmap()
+        self.statuses = {}
+        self.departments = {}
+        self.trainers = {}
+        self.diet = RoaringBitmap()
+        self.workout = RoaringBitmap()
+        self._attendance = []
+        self._windows = {}
+
+    def ensure_fresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+            with self._lock:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+                    self.load()
+
+    def load(self):
+        session = db.session
+        members = session.execute(select(User.id).where(User.role == 'student')).scalars().all()
+
+        statuses, departments = {}, {}
+        profile_users = {}
+        for profile_id, user_id, status, department in session.execute(
+            select(StudentProfile.id, StudentProfile.user_id, StudentProfile.membership_status, StudentProfile.department)
+            .where(StudentProfile.user_id.isnot(None))
+        ):
+            profile_users[profile_id] = user_id
+            if status:
+                statuses.setdefault(status, []).append(user_id)
+            if department:
+                departments.setdefault(department, []).append(user_id)
+
+        trainers = {}
+        for trainer_id, user_id in session.execute(
+            select(Schedule.trainer_id, Schedule.user_id)
+            .where(Schedule.trainer_id.isnot(None), Schedule.user_id.isnot(None)).distinct()
+        ):
+            trainers.setdefault(trainer_id, []).append(user_id)
+        for trainer_id, user_id in session.execute(
+            select(Trainer.id, WorkoutPlan.assigned_to).join(Trainer, Trainer.user_id == WorkoutPlan.created_by)
+            .where(WorkoutPlan.assigned_to.isnot(None)).distinct()
+        ):
+            trainers.setdefault(trainer_id, []).append(user_id)
+
+        diet = session.execute(
+            select(StudentDietPlan.student_id).where(StudentDietPlan.status == 'active').distinct()
+        ).scalars().all()
+        workout = session.execute(
+            select(WorkoutPlan.assigned_to).where(WorkoutPlan.assigned_to.isnot(None)).distinct()
+        ).scalars().all()
+
+        attendance = [
+            (profile_users[row.profile_id], DayBitmap.from_bytes(row.start_date, row.present))
+            for row in session.execute(select(AttendanceBitmap.profile_id, AttendanceBitmap.start_date, AttendanceBitmap.present))
+            if row.profile_id in profile_users and row.present
+        ]
+
+        self.members = RoaringBitmap(members)
+        self.statuses = {status: RoaringBitmap(ids) for status, ids in statuses.items()}
+        self.departments = {department: RoaringBitmap(ids) for department, ids in departments.items()}
+        self.trainers = {trainer_id: RoaringBitmap(ids) for trainer_id, ids in trainers.items()}
+        self.diet = RoaringBitmap(diet)
+        self.workout = RoaringBitmap(workout)
+        self._attendance = attendance
+        self._windows = {}
+        self._loaded_at = time.monotonic()
+
+    def attended(self, first, last):
+        key = (first, last)
+        if key not in self._windows:
+            if len(self._windows) >= 64:
+                self._windows.clear()
+            self._windows[key] = RoaringBitmap(
+                user_id for user_id, present in self._attendance if present.count(first, last)
+            )
+        return self._windows[key]
+
+    def age_seconds(self):
+        return None if self._loaded_at is None else time.monotonic() - self._loaded_at
+
+
+_index = _SegmentIndex()
+
+
+def init_app(app):
+    _index.ttl_seconds = float(app.config.get('SEGMENT_INDEX_TTL', 300))
+    _index._loaded_at = None
+
+
+def refresh():
+    with _index._lock:
+        _index.load()
+
+
+def _values(value, kind):
+    values = value if isinstance(value, list) else [value]
+    if not values or not all(isinstance(v, kind) and not isinstance(v, bool) for v in values):
+        raise SegmentError(f"expected a {kind.__name__} or a list of them, got {value!r}")
+    return values
+
+
+def _union(bitmaps):
+    result = RoaringBitmap()
+    for bitmap in bitmaps:
+        result = result | bitmap
+    return result
+
+
+def _parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise SegmentError(f"dates must be YYYY-MM-DD, got {value!r}")
+
+
+def _evaluate(expr):
+    if not isinstance(expr, dict) or len(expr) != 1:
+        raise SegmentError(f"each segment term must be an object with one key, got {expr!r}")
+    (key, value), = expr.items()
+
+    if key in ('and', 'or'):
+        if not isinstance(value, list) or not value:
+            raise SegmentError(f"'{key}' takes a non-empty list")
+        result = _evaluate(value[0])
+        for term in value[1:]:
+            result = (result & _evaluate(term)) if key == 'and' else (result | _evaluate(term))
+        return result
+    if key == 'not':
+        return _index.members - _evaluate(value)
+    if key == 'membership_status':
+        return _union(_index.statuses.get(v, RoaringBitmap()) for v in _values(value, str))
+    if key == 'department':
+        return _union(_index.departments.get(v, RoaringBitmap()) for v in _values(value, str))
+    if key == 'trainer_id':
+        return _union(_index.trainers.get(v, RoaringBitmap()) for v in _values(value, int))
+    if key in ('has_diet_plan', 'has_workout_plan'):
+        if not isinstance(value, bool):
+            raise SegmentError(f"'{key}' takes true or false")
+        having = _index.diet if key == 'has_diet_plan' else _index.workout
+        return having if value else _index.members - having
+    if key == 'attended_within_days':
+        if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= MAX_WINDOW_DAYS:
+            raise SegmentError(f"'attended_within_days' takes a number of days between 1 and {MAX_WINDOW_DAYS}")
+        today = datetime.now().date()
+        return _index.attended(today - timedelta(days=value - 1), today)
+    if key == 'attended_between':
+        if not isinstance(value, list) or len(value) != 2:
+            raise SegmentError("'attended_between' takes [first day, last day]")
+        first, last = _parse_day(value[0]), _parse_day(value[1])
+        if not timedelta(0) <= last - first < timedelta(days=MAX_WINDOW_DAYS):
+            raise SegmentError(f"'attended_between' needs first <= last and at most {MAX_WINDOW_DAYS} days")
+        return _index.attended(first, last)
+    raise SegmentError(f"unknown segment term '{key}'")
+
+
+def evaluate(expr):
+    """(RoaringBitmap of student user ids, evaluation microseconds) for a segment expression"""
+    _index.ensure_fresh()
+    started = time.perf_counter()
+    result = _evaluate(expr) & _index.members
+    return result, (time.perf_counter() - started) * 1e6
+
+
+def predicates():
+    """The values each predicate can take right now"""
+    _index.ensure_fresh()
+    return {
+        'membership_status': sorted(_index.statuses),
+        'department': sorted(_index.departments),
+        'trainer_id': sorted(_index.trainers),
+        'members': len(_index.members),
+        'index_age_seconds': round(_index.age_seconds(), 1)
+    }
+
+
+EXPORT_COLUMNS = ['id', 'name', 'email', 'department', 'membership_status']
+
+
+def write_csv(members, writer, chunk_size=1000):
+    """Write a header and one row per member to a csv writer. Returns the number of members written."""
+    writer.writerow(EXPORT_COLUMNS)
+    ids = list(members)
+    written = 0
+    for start in range(0, len(ids), chunk_size):
+        rows = db.session.execute(
+            select(User.id, User.name, User.email, StudentProfile.department, StudentProfile.membership_status)
+            .outerjoin(StudentProfile, StudentProfile.user_id == User.id)
+            .where(User.id.in_(ids[start:start + chunk_size]))
+            .order_by(User.id)
+        ).all()
+        seen = set()
+        for row in rows:
+            if row.id not in seen:
+                seen.add(row.id)
+                writer.writerow(list(row))
+        written += len(seen)
+    return written
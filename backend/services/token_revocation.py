@@ -0,0 +1,132 @@
+import calendar
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from models import db, TokenRevocation
+from monitoring.tracing import tracer
+from utils.bloom_filter import BloomFilter
+
+# JWTs are revoked per user: a token_revocation row rejects every token of that
+# user issued at or before revoked_before. Each worker keeps a Bloom filter of
+# the user ids in the table, so the check on an authenticated request is a few
+# bit lookups. Only a filter hit (a revoked user, or a rare false positive)
+# reads the table. The filter picks up rows written by other workers every
+# REVOCATION_SYNC_SECONDS with an indexed id range query.
+
+
+class _RevocationList:
+    def __init__(self):
+        self.sync_interval = 5.0
+        self.capacity = 10000
+        self.error_rate = 0.001
+        self.retention = timedelta(days=30)
+        self.exact_checks = 0
+        self._filter = None
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, sync_interval, capacity, error_rate, retention):
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.retention = retention
+        self._filter = None
+
+    def _rebuild(self):
+        now = datetime.utcnow()
+        last_id = db.session.query(func.max(TokenRevocation.id)).scalar() or 0
+        user_ids = [row.user_id for row in db.session.query(TokenRevocation.user_id)
+                    .filter(TokenRevocation.expires_at > now).distinct()]
+        bloom = BloomFilter(max(self.capacity, len(user_ids) * 2), self.error_rate)
+        for user_id in user_ids:
+            bloom.add(user_id)
+        self._filter = bloom
+        self._last_id = last_id
+
+    def _sync(self):
+        if self._filter is None or self._filter.saturated:
+            self._rebuild()
+        else:
+            for row in db.session.query(TokenRevocation.id, TokenRevocation.user_id) \
+                    .filter(TokenRevocation.id > self._last_id).order_by(TokenRevocation.id):
+                self._filter.add(row.user_id)
+                self._last_id = row.id
+        self._synced_at = time.monotonic()
+
+    def might_be_revoked(self, user_id):
+        if self._filter is None or time.monotonic() - self._synced_at > self.sync_interval:
+            with self._lock:
+                if self._filter is None or time.monotonic() - self._synced_at > self.sync_interval:
+                    self._sync()
+        return user_id in self._filter
+
+    def add_local(self, user_id):
+        """Make a revocation visible in this worker without waiting for the next sync"""
+        if self._filter is not None:
+            self._filter.add(user_id)
+
+
+_revocations = _RevocationList()
+
+
+def init_app(app):
+    _revocations.configure(
+        float(app.config.get('REVOCATION_SYNC_SECONDS', 5)),
+        int(app.config.get('REVOCATION_FILTER_CAPACITY', 10000)),
+        float(app.config.get('REVOCATION_FILTER_ERROR_RATE', 0.001)),
+        max(app.config['JWT_ACCESS_TOKEN_EXPIRES'], app.config['JWT_REFRESH_TOKEN_EXPIRES'])
+    )
+
+
+def warm():
+    """Registered as a post-fork warmer so the first request does not build the filter"""
+    with _revocations._lock:
+        _revocations._sync()
+
+
+def _subject_id(jwt_payload):
+    identity = jwt_payload.get('sub')
+    return identity.get('id') if isinstance(identity, dict) else identity
+
+
+def is_revoked(jwt_payload):
+    """token_in_blocklist_loader check: O(1) unless the user is in the filter"""
+    user_id = _subject_id(jwt_payload)
+    if user_id is None or not _revocations.might_be_revoked(user_id):
+        return False
+
+    with tracer.start_span('auth.revocation_lookup'):
+        _revocations.exact_checks += 1
+        revoked_before = db.session.query(func.max(TokenRevocation.revoked_before)).filter(
+            TokenRevocation.user_id == user_id,
+            TokenRevocation.expires_at > datetime.utcnow()
+        ).scalar()
+    if revoked_before is None:
+        return False
+    # iat has whole-second precision, so a token from the same second as the revocation is rejected too
+    return jwt_payload.get('iat', 0) <= calendar.timegm(revoked_before.timetuple())
+
+
+def revoke_user(user_id):
+    """
+    Reject every token issued to user_id so far, e.g. after deletion, a role
+    change or a password reset. The row is added to the session; the caller commits.
+    """
+    now = datetime.utcnow()
+    # Rows past the longest token lifetime no longer reject anything
+    TokenRevocation.query.filter(TokenRevocation.expires_at <= now).delete(synchronize_session=False)
+    db.session.add(TokenRevocation(user_id=user_id, revoked_before=now, expires_at=now + _revocations.retention))
+    _revocations.add_local(user_id)
+
+
+def stats():
+    bloom = _revocations._filter
+    return {
+        'filter_entries': len(bloom) if bloom is not None else 0,
+        'filter_bits': bloom.size if bloom is not None else 0,
+        'exact_checks': _revocations.exact_checks
+    }
@@ -0,0 +1,141 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import event, insert, inspect, select
+
+from models import db, Schedule, TrainerCalendar
+from services import schedule_conflicts
+from utils.slot_bitmap import SlotBitmap
+
+# trainer_calendar mirrors each trainer's schedule as one slot bitmap per
+# calendar month: the 5-minute slots any of the trainer's sessions covers.
+# A session listener recomputes the (trainer, month) bitmaps a flush touched
+# from the schedule rows, on the same connection, so they commit or roll back
+# with the sessions. Recomputing rather than clearing bits keeps overlapping
+# sessions right. The free-slot search (services/availability.py) reads a few
+# hundred of these rows instead of every session in its window. Sessions
+# written with raw SQL need a rebuild (the delete_user job does its own).
+
+calendar_table = TrainerCalendar.__table__
+schedule_table = Schedule.__table__
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _apply_changes):
+        event.listen(db.session, 'after_flush', _apply_changes)
+
+
+def month_of(moment):
+    return date(moment.year, moment.month, 1)
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _midnight(day):
+    return datetime.combine(day, time())
+
+
+def _values(obj, attribute):
+    history = inspect(obj).attrs[attribute].history
+    values = {getattr(obj, attribute)}
+    values.update(history.deleted)
+    values.discard(None)
+    return values
+
+
+def _apply_changes(session, flush_context):
+    touched = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Schedule):
+            continue
+        if obj in session.dirty and not any(inspect(obj).attrs[name].history.has_changes()
+                                            for name in ('trainer_id', 'scheduled_time', 'duration_minutes')):
+            continue
+        # A session can run into the next month
+        spill = timedelta(minutes=schedule_conflicts.max_duration())
+        months = {month for begins in _values(obj, 'scheduled_time') for month in (month_of(begins), month_of(begins + spill))}
+        touched.update((trainer_id, month) for trainer_id in _values(obj, 'trainer_id') for month in months)
+    if touched:
+        rebuild_months(session.connection(), touched)
+
+
+def _bitmaps(connection, trainer_ids, first_month=None, end_month=None):
+    """{(trainer_id, month): SlotBitmap} from the trainers' sessions in [first_month, end_month)"""
+    query = select(schedule_table.c.trainer_id, schedule_table.c.scheduled_time, schedule_table.c.ends_at,
+                   schedule_table.c.duration_minutes).where(schedule_table.c.trainer_id.in_(list(trainer_ids)))
+    if first_month is not None:
+        query = query.where(schedule_table.c.scheduled_time >=
+                            _midnight(first_month) - timedelta(minutes=schedule_conflicts.max_duration()))
+    if end_month is not None:
+        query = query.where(schedule_table.c.scheduled_time < _midnight(end_month))
+
+    bitmaps = {}
+    for trainer_id, begins, ends, minutes in connection.execute(query):
+        ends = ends or begins + timedelta(minutes=minutes or 60)
+        month = month_of(begins)
+        while _midnight(month) < ends:
+            following = _next_month(month)
+            key = (trainer_id, month)
+            if key not in bitmaps:
+                bitmaps[key] = SlotBitmap(_midnight(month))
+            bitmaps[key].add(begins, min(ends, _midnight(following)))
+            month = following
+    return bitmaps
+
+
+def rebuild_months(connection, keys):
+    """Recompute the bitmaps of these (trainer_id, month) pairs from the schedule rows"""
+    months = {month for _, month in keys}
+    trainer_ids = {trainer_id for trainer_id, _ in keys}
+    bitmaps = _bitmaps(connection, trainer_ids, min(months), _next_month(max(months)))
+    existing = {tuple(row) for row in connection.execute(
+        select(calendar_table.c.trainer_id, calendar_table.c.month)
+        .where(calendar_table.c.trainer_id.in_(list(trainer_ids)), calendar_table.c.month.in_(list(months)))
+        .with_for_update()
+    )}
+    now = datetime.utcnow()
+    # Fixed order so two writers cannot deadlock on each other's rows
+    for trainer_id, month in sorted(keys):
+        bitmap = bitmaps.get((trainer_id, month))
+        busy = bitmap.to_bytes() if bitmap else b''
+        if (trainer_id, month) in existing:
+            connection.execute(
+                calendar_table.update()
+                .where(calendar_table.c.trainer_id == trainer_id, calendar_table.c.month == month)
+                .values(busy=busy, updated_at=now)
+            )
+        elif busy:
+            connection.execute(calendar_table.insert().values(trainer_id=trainer_id, month=month, busy=busy,
+                                                              updated_at=now))
+
+
+def rebuild(connection, trainer_ids):
+    """Recompute every month of these trainers from their sessions. Returns the number of rows written."""
+    trainer_ids = list(trainer_ids)
+    bitmaps = _bitmaps(connection, trainer_ids)
+    connection.execute(calendar_table.delete().where(calendar_table.c.trainer_id.in_(trainer_ids)))
+    now = datetime.utcnow()
+    rows = [{'trainer_id': trainer_id, 'month': month, 'busy': bitmap.to_bytes(), 'updated_at': now}
+            for (trainer_id, month), bitmap in sorted(bitmaps.items())]
+    if rows:
+        connection.execute(insert(calendar_table), rows)
+    return len(rows)
+
+
+def load(start, end, trainer_ids=None):
+    """
+    {trainer_id: busy bits counted from `start`} covering [start, end), for
+    the given trainers or all of them. `start` must be a slot boundary
+    (e.g. midnight); trainers with nothing booked are left out.
+    """
+    query = select(calendar_table.c.trainer_id, calendar_table.c.month, calendar_table.c.busy).where(
+        calendar_table.c.month >= month_of(start), calendar_table.c.month <= month_of(end)
+    )
+    if trainer_ids is not None:
+        query = query.where(calendar_table.c.trainer_id.in_(list(trainer_ids)))
+    busy = defaultdict(int)
+    for trainer_id, month, data in db.session.execute(query):
+        busy[trainer_id] |= SlotBitmap.from_bytes(_midnight(month), data).moved_to(start)
+    return busy
@@ -0,0 +1,151 @@
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Notification, NotificationCounter
+
+# Unread notification counts per user in notification_counter, so the badge
+# is one primary key read instead of a count over the user's notifications.
+# A session listener turns flushed notification inserts, deletes and read
+# flag changes into `unread + delta` updates on the same connection; bulk
+# fan-outs and mark_read() apply their own deltas in the statement's
+# transaction. Raw SQL bypasses both; jobs/reconcile_counters.py recounts.
+
+counter_table = NotificationCounter.__table__
+notification_table = Notification.__table__
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _apply_deltas):
+        event.listen(db.session, 'after_flush', _apply_deltas)
+
+
+def _old_value(obj, attribute):
+    history = inspect(obj).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(obj, attribute)
+
+
+def _apply_deltas(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Notification) and not obj.read:
+            deltas[obj.user_id] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Notification) and not _old_value(obj, 'read'):
+            deltas[_old_value(obj, 'user_id')] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Notification):
+            old = (_old_value(obj, 'user_id'), bool(_old_value(obj, 'read')))
+            new = (obj.user_id, bool(obj.read))
+            if old != new:
+                if not old[1]:
+                    deltas[old[0]] -= 1
+                if not new[1]:
+                    deltas[new[0]] += 1
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta and user_id is not None}
+    if deltas:
+        add(session.connection(), deltas)
+
+
+def add(connection, deltas):
+    """
+    Apply {user_id: delta} on `connection`. Users with the same delta share
+    one UPDATE, so a fan-out chunk is a single statement; users without a
+    counter row yet get one inserted.
+    """
+    now = datetime.utcnow()
+    by_delta = {}
+    for user_id in sorted(deltas):
+        by_delta.setdefault(deltas[user_id], []).append(user_id)
+    # Fixed order so two writers touching the same counters cannot deadlock
+    for delta, user_ids in sorted(by_delta.items()):
+        updated = connection.execute(
+            counter_table.update().where(counter_table.c.user_id.in_(user_ids))
+            .values(unread=counter_table.c.unread + delta, updated_at=now)
+        ).rowcount
+        if updated < len(user_ids):
+            _insert_missing(connection, user_ids, delta, now)
+
+
+def _insert_missing(connection, user_ids, delta, now):
+    existing = set(connection.execute(
+        select(counter_table.c.user_id).where(counter_table.c.user_id.in_(user_ids))
+    ).scalars())
+    missing = [user_id for user_id in user_ids if user_id not in existing]
+    # A concurrent first writer may insert the same row in between, so the
+    # insert runs in a savepoint and falls back to the UPDATE
+    try:
+        with connection.begin_nested():
+            connection.execute(counter_table.insert(), [
+                {'user_id': user_id, 'unread': delta, 'updated_at': now} for user_id in missing
+            ])
+    except IntegrityError:
+        for user_id in missing:
+            if not connection.execute(
+                counter_table.update().where(counter_table.c.user_id == user_id)
+                .values(unread=counter_table.c.unread + delta, updated_at=now)
+            ).rowcount:
+                connection.execute(counter_table.insert().values(user_id=user_id, unread=delta, updated_at=now))
+
+
+def unread_count(user_id):
+    """The badge count: one primary key read"""
+    value = db.session.execute(
+        select(counter_table.c.unread).where(counter_table.c.user_id == user_id)
+    ).scalar()
+    return max(value or 0, 0)
+
+
+def mark_read(user_id, from_id=None, to_id=None, before=None):
+    """
+    Mark the user's unread notifications read in one UPDATE, limited to ids
+    in [from_id, to_id] and/or created before `before`, and take the number
+    of rows it changed off the counter. The caller commits, then drops the
+    user's cached dashboards (dashboards.invalidate_user) if any were marked.
+    Returns the number of notifications marked.
+    """
+    condition = (notification_table.c.user_id == user_id) & notification_table.c.read.isnot(True)
+    if from_id is not None:
+        condition &= notification_table.c.id >= from_id
+    if to_id is not None:
+        condition &= notification_table.c.id <= to_id
+    if before is not None:
+        condition &= notification_table.c.created_at < before
+
+    connection = db.session.connection()
+    # Rows another request marks first no longer match, so each read is counted once
+    marked = connection.execute(notification_table.update().where(condition).values(read=True)).rowcount
+    if marked:
+        add(connection, {user_id: -marked})
+    return marked
+
+
+def reconcile(connection, fix=True):
+    """
+    Recount unread notifications per user and, if fix, correct the counters
+    that drifted. Returns {user_id: (stored, actual)} for those counters.
+    """
+    stored = dict(connection.execute(
+        select(counter_table.c.user_id, counter_table.c.unread).order_by(counter_table.c.user_id).with_for_update()
+    ).all())
+    actual = dict(connection.execute(
+        select(notification_table.c.user_id, func.count())
+        .where(notification_table.c.read.isnot(True))
+        .group_by(notification_table.c.user_id)
+    ).all())
+    for user_id in stored:
+        actual.setdefault(user_id, 0)
+
+    drift = {user_id: (stored.get(user_id, 0), value)
+             for user_id, value in actual.items() if stored.get(user_id) != value}
+    if fix:
+        now = datetime.utcnow()
+        for user_id, (_, value) in drift.items():
+            if user_id in stored:
+                connection.execute(counter_table.update().where(counter_table.c.user_id == user_id)
+                                   .values(unread=value, updated_at=now))
+            else:
+                connection.execute(counter_table.insert().values(user_id=user_id, unread=value, updated_at=now))
+    return drift
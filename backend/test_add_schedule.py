@@ -56,6 +56,7 @@ def add_test_schedule():
 
 if __name__ == "__main__":
     # Initialize app context
-    from app import app
+    from app import create_app
+    app = create_app()
     with app.app_context():
         add_test_schedule() 
\ No newline at end of file
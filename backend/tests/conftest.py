@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+# Add the backend directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault('TRACING_ENABLED', 'false')
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app on a fresh sqlite database with the demo accounts, enforcing foreign keys like InnoDB"""
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'test.db'))
+    from app import create_app
+    from models import db
+    from seed import init_database
+
+    app = create_app({'TESTING': True, 'REQUEST_DEBUG_LOGGING': False, 'QUERY_EXPLAIN_ENABLED': False,
+                      'RATE_LIMIT_ENABLED': False})
+    with app.app_context():
+        event.listen(db.engine, 'connect', _enforce_foreign_keys)
+        db.engine.dispose()
+    assert init_database(app)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        event.remove(db.engine, 'connect', _enforce_foreign_keys)
+
+
+def _enforce_foreign_keys(dbapi_connection, connection_record):
+    dbapi_connection.execute('PRAGMA foreign_keys=ON')
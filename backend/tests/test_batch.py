@@ -0,0 +1,20 @@
+from models import db, User, Equipment
+
+
+def test_failed_sub_request_changes_are_not_committed_by_a_later_one(app):
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'email': 'admin@fitwell.com', 'password': 'admin'}).json['access_token']
+    student_id = User.query.filter_by(email='student@fitwell.com').one().id
+    db.session.remove()
+
+    response = client.post('/api/batch', headers={'Authorization': 'Bearer ' + token}, json={'requests': [
+        {'id': 'rename', 'method': 'PUT', 'path': f'/api/admin/users/{student_id}',
+         'body': {'name': 'Half Applied', 'membership_status': 'bogus'}},
+        {'id': 'equipment', 'method': 'POST', 'path': '/api/admin/equipment',
+         'body': {'name': 'Rower', 'quantity': 2}},
+    ]})
+
+    assert [item['status'] for item in response.json['responses']] == [400, 201]
+    db.session.remove()
+    assert db.session.get(User, student_id).name == 'Test Student'
+    assert Equipment.query.filter_by(name='Rower').count() == 1
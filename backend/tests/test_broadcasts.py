@@ -0,0 +1,22 @@
+from models import db, User, Broadcast, Notification
+from services import notifications
+
+
+def test_retried_send_resumes_after_last_user_id(app):
+    db.session.add_all([User(name=f'Member {i}', email=f'member{i}@example.com', role='student', password_hash='!')
+                        for i in range(6)])
+    db.session.commit()
+    ids = [user.id for user in User.query.filter(User.email.like('member%@example.com')).order_by(User.id)]
+    admin = User.query.filter_by(email='admin@fitwell.com').first()
+    # An earlier attempt reached ids[2]; since then ids[1] left the segment and ids[4] joined it
+    record = Broadcast(title='Closed', message='Closed Monday', audience='segment', created_by=admin.id,
+                       recipients=4, sent=3, last_user_id=ids[2])
+    db.session.add(record)
+    db.session.commit()
+
+    notifications.send(record, [ids[5], ids[0], ids[2], ids[3], ids[4]])
+
+    notified = {row.user_id for row in Notification.query.filter_by(title='Closed')}
+    assert notified == {ids[3], ids[4], ids[5]}
+    assert (record.sent, record.recipients, record.last_user_id) == (6, 6, ids[5])
+    assert record.completed_at is not None
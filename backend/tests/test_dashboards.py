@@ -0,0 +1,22 @@
+from datetime import date, timedelta
+
+from models import db, User, Attendance, StudentProfile
+
+
+def test_dashboard_and_progress_report_the_same_streak(app):
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'email': 'student@fitwell.com', 'password': 'student'}).json['access_token']
+    headers = {'Authorization': 'Bearer ' + token}
+    user = User.query.filter_by(email='student@fitwell.com').one()
+    profile = StudentProfile.query.filter_by(user_id=user.id).one()
+    today = date.today()
+    # Present the three days before today, absent today: a streak of three present visits
+    db.session.add_all([Attendance(student_id=profile.id, date=today - timedelta(days=days), status='present')
+                        for days in (1, 2, 3)] + [Attendance(student_id=profile.id, date=today, status='absent')])
+    db.session.commit()
+
+    progress = client.get('/api/student/progress', headers=headers).json
+    dashboard = client.get('/api/student/dashboard', headers=headers).json
+    assert progress['streak'] == 3
+    assert dashboard['progress']['streak'] == progress['streak']
+    assert dashboard['progress']['workouts_completed'] == progress['workouts_completed']
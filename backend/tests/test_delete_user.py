@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from models import (db, User, Attendance, AttendanceBitmap, AttendanceDaily, DietPlan, MedicalRecord, MemberSummary,
+                    Notification, Schedule, StudentDietPlan, StudentProfile, Trainer, WorkoutPlan)
+from services import attendance_rollup, counters, member_summary
+from services.job_handlers import delete_user
+
+
+def add_student(email, department):
+    user = User(name=email, email=email, role='student', password_hash='!')
+    db.session.add(user)
+    db.session.flush()
+    profile = StudentProfile(user_id=user.id, department=department, membership_status='active')
+    db.session.add(profile)
+    db.session.flush()
+    return user, profile
+
+
+def rollup_rows():
+    return {(row.date, row.department): (row.present, row.absent, row.members)
+            for row in AttendanceDaily.query.all() if row.present or row.absent or row.members}
+
+
+def test_delete_student_with_attendance_and_plans(app):
+    trainer_user = User.query.filter_by(email='trainer@fitwell.com').first()
+    trainer = Trainer.query.filter_by(user_id=trainer_user.id).first()
+    user, profile = add_student('leaving@example.com', 'Physics')
+    other, other_profile = add_student('staying@example.com', 'Physics')
+    today = date.today()
+    for days_ago in range(40):
+        db.session.add(Attendance(student_id=profile.id, date=today - timedelta(days=days_ago),
+                                  status='present' if days_ago % 3 else 'absent'))
+    db.session.add(Attendance(student_id=other_profile.id, date=today, status='present'))
+    plan = DietPlan(title='Cut', created_by=trainer_user.id)
+    db.session.add(plan)
+    db.session.flush()
+    db.session.add_all([
+        StudentDietPlan(student_id=user.id, diet_plan_id=plan.id, assigned_by=trainer_user.id),
+        StudentDietPlan(student_id=other.id, diet_plan_id=plan.id, assigned_by=trainer_user.id),
+        WorkoutPlan(title='Legs', created_by=trainer_user.id, assigned_to=user.id),
+        MedicalRecord(user_id=user.id, record_type='injury', description='Knee', date=today),
+        Notification(user_id=user.id, title='Hi', message='Welcome'),
+        Schedule(user_id=user.id, trainer_id=trainer.id, title='PT', scheduled_time=datetime.now() + timedelta(days=1)),
+    ])
+    db.session.commit()
+    user_id, profile_id, other_id = user.id, profile.id, other.id
+    db.session.expunge_all()
+
+    result = delete_user({'user_id': user_id}, None)
+
+    assert result['deleted'] and result['attendance_deleted'] == 40
+    db.session.expunge_all()
+    assert db.session.get(User, user_id) is None
+    assert db.session.get(StudentProfile, profile_id) is None
+    for model, column in ((Attendance, Attendance.student_id), (AttendanceBitmap, AttendanceBitmap.profile_id),
+                          (MemberSummary, MemberSummary.profile_id)):
+        assert not model.query.filter(column == profile_id).count()
+    for model, column in ((StudentDietPlan, StudentDietPlan.student_id), (WorkoutPlan, WorkoutPlan.assigned_to),
+                          (MedicalRecord, MedicalRecord.user_id), (Notification, Notification.user_id),
+                          (Schedule, Schedule.user_id)):
+        assert not model.query.filter(column == user_id).count()
+    # The other member keeps their plan and attendance
+    assert StudentDietPlan.query.filter_by(student_id=other_id).count() == 1
+
+    # The counters and rollup match a recount
+    connection = db.session.connection()
+    assert counters.reconcile(connection, fix=False) == {}
+    stored = rollup_rows()
+    attendance_rollup.rebuild(connection, today - timedelta(days=40), today)
+    assert stored == rollup_rows()
+    db.session.rollback()
+
+
+def test_delete_trainer_keeps_members_sessions(app):
+    trainer_user = User.query.filter_by(email='trainer@fitwell.com').first()
+    trainer = Trainer.query.filter_by(user_id=trainer_user.id).first()
+    member, member_profile = add_student('member@example.com', None)
+    db.session.add_all([
+        WorkoutPlan(title='Arms', created_by=trainer_user.id, assigned_to=member.id),
+        Schedule(user_id=member.id, trainer_id=trainer.id, title='PT', scheduled_time=datetime.now() + timedelta(days=1)),
+    ])
+    db.session.commit()
+    member_summary.rebuild(db.session.connection(), [member_profile.id])
+    db.session.commit()
+    trainer_user_id, member_id, profile_id = trainer_user.id, member.id, member_profile.id
+    db.session.expunge_all()
+
+    assert delete_user({'user_id': trainer_user_id}, None)['deleted']
+
+    db.session.expunge_all()
+    assert db.session.get(User, trainer_user_id) is None
+    assert not Trainer.query.filter_by(user_id=trainer_user_id).count()
+    session = Schedule.query.filter_by(user_id=member_id).one()
+    assert session.trainer_id is None
+    assert db.session.get(MemberSummary, profile_id).workout_plans == 0
+    assert counters.reconcile(db.session.connection(), fix=False) == {}
+    db.session.rollback()
+    # Running the job again is harmless
+    assert delete_user({'user_id': trainer_user_id}, None) == {'user_id': trainer_user_id, 'deleted': False}
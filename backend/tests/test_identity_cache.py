@@ -0,0 +1,36 @@
+from sqlalchemy import update
+
+from models import db, User
+
+
+def login(client, email, password):
+    response = client.post('/api/auth/login', json={'email': email, 'password': password})
+    assert response.status_code == 200
+    return response.json
+
+
+def test_newer_token_version_reloads_a_cached_user(app):
+    client = app.test_client()
+    tokens = login(client, 'student@fitwell.com', 'student')
+    headers = {'Authorization': 'Bearer ' + tokens['access_token']}
+    assert client.get('/api/auth/verify', headers=headers).json['user']['name'] == 'Test Student'
+
+    # Another worker renames the user: this worker's entry is not invalidated
+    db.session.execute(update(User).where(User.email == 'student@fitwell.com')
+                       .values(name='Renamed', version=User.version + 1))
+    db.session.commit()
+    assert client.get('/api/auth/verify', headers=headers).json['user']['name'] == 'Test Student'
+
+    refreshed = client.post('/api/auth/refresh',
+                            headers={'Authorization': 'Bearer ' + tokens['refresh_token']}).json
+    headers = {'Authorization': 'Bearer ' + refreshed['access_token']}
+    assert client.get('/api/auth/verify', headers=headers).json['user']['name'] == 'Renamed'
+
+
+def test_staff_profile_update_bumps_version(app):
+    client = app.test_client()
+    headers = {'Authorization': 'Bearer ' + login(client, 'staff@fitwell.com', 'staff')['access_token']}
+    version = User.query.filter_by(email='staff@fitwell.com').one().version
+    assert client.put('/api/staff/profile', json={'name': 'Front Desk'}, headers=headers).status_code == 200
+    db.session.expire_all()
+    assert User.query.filter_by(email='staff@fitwell.com').one().version == version + 1
@@ -0,0 +1,17 @@
+from models import db, User, Notification
+
+
+def test_mark_read_refreshes_the_cached_dashboard(app):
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'email': 'student@fitwell.com', 'password': 'student'}).json['access_token']
+    headers = {'Authorization': 'Bearer ' + token}
+    user = User.query.filter_by(email='student@fitwell.com').one()
+    db.session.add(Notification(user_id=user.id, title='Class moved', message='Yoga is at 7 now'))
+    db.session.commit()
+
+    unread = lambda: [item for item in client.get('/api/student/dashboard', headers=headers).json['notifications']
+                      if not item['read']]
+    assert len(unread()) == 1
+    response = client.post('/api/notifications/read', json={'before': '2999-01-01T00:00:00'}, headers=headers)
+    assert response.json['marked'] == 1
+    assert unread() == []
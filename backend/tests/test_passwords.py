@@ -0,0 +1,29 @@
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from services import passwords
+
+
+@pytest.mark.parametrize('method', ['pbkdf2', 'pbkdf2:sha512', 'pbkdf2:sha256:1000', 'scrypt', 'scrypt:1024:8:1'])
+def test_method_prefix_matches_werkzeug(method):
+    assert passwords.method_prefix(method) == generate_password_hash('x', method).split('$', 1)[0]
+
+
+def test_timed_out_hash_is_busy_and_keeps_its_slot():
+    hasher = passwords._Hasher()
+    hasher.configure('pbkdf2:sha256:1000', 'thread', 1, 0, 0.05)
+    release = threading.Event()
+    try:
+        with pytest.raises(passwords.PasswordHasherBusy):
+            hasher.run(release.wait)
+        # The pool is still busy with the first call, so its slot is still taken
+        with pytest.raises(passwords.PasswordHasherBusy):
+            hasher.run(len, 'x')
+        release.set()
+        hasher._get_executor().submit(len, '').result()
+        assert hasher.run(len, 'abc') == 3
+    finally:
+        release.set()
+        hasher.shutdown()
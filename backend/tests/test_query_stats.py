@@ -0,0 +1,41 @@
+import json
+import time
+
+from sqlalchemy import text
+
+from models import db
+from monitoring import query_stats
+
+
+def plans(path):
+    if not path.exists():
+        return []
+    return [record for record in map(json.loads, path.read_text().splitlines()) if record['kind'] == 'plan']
+
+
+def wait_for(condition, seconds=5):
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_slow_statement_outside_a_request_is_explained_and_retried_after_a_failure(app, tmp_path, monkeypatch):
+    instrumentation = app.extensions['query_instrumentation']
+    monkeypatch.setattr(instrumentation, 'threshold_ms', 0)
+    monkeypatch.setattr(instrumentation, 'explain_enabled', True)
+    monkeypatch.setattr(instrumentation, 'plan_log', str(tmp_path / 'plans.jsonl'))
+    statement = 'SELECT id FROM users WHERE email = :email'
+    shape_id = query_stats.statement_shape_id(query_stats.normalize_statement(statement))
+
+    # EXPLAIN fails: nothing is written and the shape is left to be tried again
+    monkeypatch.setitem(query_stats.EXPLAIN_PREFIXES, 'sqlite', 'EXPLAIN NOT VALID ')
+    db.session.execute(text(statement), {'email': 'student@fitwell.com'})
+    instrumentation.flush()
+    assert wait_for(lambda: shape_id not in instrumentation._queued_shapes)
+    assert shape_id not in instrumentation._explained_shapes
+
+    monkeypatch.setitem(query_stats.EXPLAIN_PREFIXES, 'sqlite', 'EXPLAIN QUERY PLAN ')
+    db.session.execute(text(statement), {'email': 'staff@fitwell.com'})
+    assert wait_for(lambda: shape_id in instrumentation._explained_shapes)
+    assert [record['shape_id'] for record in plans(tmp_path / 'plans.jsonl')].count(shape_id) == 1
@@ -0,0 +1,127 @@
+import math
+import os
+import uuid
+
+import pytest
+
+from utils import token_bucket
+from utils.token_bucket import MemoryBackend, RedisBackend
+
+
+def test_take_all_takes_nothing_when_one_bucket_is_empty():
+    backend = MemoryBackend()
+    ip, route = ('login:ip:1.2.3.4', 2, 2 / 60), ('login:route:*', 5, 5 / 60)
+    assert backend.take_all([ip, route]) == (True, 0.0)
+    assert backend.take_all([ip, route]) == (True, 0.0)
+    for _ in range(10):
+        allowed, retry_after = backend.take_all([ip, route])
+        assert not allowed and retry_after > 0
+
+    # The throttled address spent only its first two tokens of the route's five
+    other_ip = ('login:ip:5.6.7.8', 10, 10 / 60)
+    assert [backend.take_all([other_ip, route])[0] for _ in range(4)] == [True, True, True, False]
+
+
+class FakeRedis:
+    """
+    Runs _REDIS_TAKE's steps in Python over dicts, with Redis's types: hash
+    fields come back as strings (None when missing) and the script's number
+    comes back as a string.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.ttls = {}
+        self.scripts = []
+
+    def register_script(self, script):
+        self.scripts.append(script)
+        return self._take
+
+    def _take(self, keys, args):
+        cost, now = float(args[0]), float(args[1])
+        refilled = []
+        retry_after = 0
+        for i, key in enumerate(keys, start=1):
+            capacity, refill = float(args[2 * i]), float(args[2 * i + 1])
+            state = self.hashes.get(key, {})
+            tokens = float(state['tokens']) if 'tokens' in state else capacity
+            updated = float(state['updated']) if 'updated' in state else now
+            tokens = min(capacity, tokens + max(now - updated, 0) * refill)
+            if tokens < cost:
+                retry_after = max(retry_after, (cost - tokens) / refill)
+            refilled.append(tokens)
+        if retry_after == 0:
+            for i, key in enumerate(keys, start=1):
+                capacity, refill = float(args[2 * i]), float(args[2 * i + 1])
+                self.hashes[key] = {'tokens': str(refilled[i - 1] - cost), 'updated': str(now)}
+                self.ttls[key] = math.ceil(capacity / refill) + 1
+        return str(retry_after).encode()
+
+
+def _redis_backends():
+    backends = [pytest.param(lambda: (RedisBackend(client=FakeRedis()), None), id='fake')]
+    url = os.getenv('RATE_LIMIT_TEST_REDIS_URL')
+    backends.append(pytest.param(
+        lambda: _real_redis(url), id='redis',
+        marks=pytest.mark.skipif(not url, reason='RATE_LIMIT_TEST_REDIS_URL is not set'),
+    ))
+    return backends
+
+
+def _real_redis(url):
+    import redis
+    client = redis.Redis.from_url(url)
+    prefix = 'ratelimit-test:%s:' % uuid.uuid4().hex
+    return RedisBackend(client=client, prefix=prefix), client
+
+
+@pytest.fixture(params=_redis_backends())
+def redis_backend(request, monkeypatch):
+    clock = [1000000.0]
+    monkeypatch.setattr(token_bucket.time, 'time', lambda: clock[0])
+    backend, client = request.param()
+    yield backend, clock
+    if client is not None:
+        for key in client.scan_iter(backend.prefix + '*'):
+            client.delete(key)
+
+
+def test_redis_take_all_takes_nothing_when_one_bucket_is_empty(redis_backend):
+    backend, _ = redis_backend
+    ip, route = ('login:ip:1.2.3.4', 2, 2 / 60), ('login:route:*', 5, 5 / 60)
+    assert backend.take_all([ip, route]) == (True, 0.0)
+    assert backend.take_all([ip, route]) == (True, 0.0)
+    for _ in range(10):
+        allowed, retry_after = backend.take_all([ip, route])
+        assert not allowed and retry_after == pytest.approx(30)
+
+    other_ip = ('login:ip:5.6.7.8', 10, 10 / 60)
+    assert [backend.take_all([other_ip, route])[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_redis_take_all_refills_with_time(redis_backend):
+    backend, clock = redis_backend
+    bucket = ('login:ip:1.2.3.4', 2, 2 / 60)
+    assert backend.take_all([bucket], cost=2) == (True, 0.0)
+    allowed, retry_after = backend.take_all([bucket])
+    assert not allowed and retry_after == pytest.approx(30)
+
+    clock[0] += 15
+    allowed, retry_after = backend.take_all([bucket])
+    assert not allowed and retry_after == pytest.approx(15)
+    clock[0] += 15
+    assert backend.take_all([bucket]) == (True, 0.0)
+    # A long idle period refills only up to capacity
+    clock[0] += 3600
+    assert backend.take_all([bucket], cost=2) == (True, 0.0)
+    assert not backend.take_all([bucket])[0]
+
+
+def test_redis_keys_are_prefixed_and_expire_once_full():
+    client = FakeRedis()
+    backend = RedisBackend(client=client, prefix='rl:')
+    assert client.scripts == [token_bucket._REDIS_TAKE]
+    backend.take_all([('login:ip:1.2.3.4', 2, 2 / 60), ('login:route:*', 5, 5 / 60)])
+    assert client.ttls == {'rl:login:ip:1.2.3.4': 61, 'rl:login:route:*': 61}
+    assert client.hashes['rl:login:ip:1.2.3.4']['tokens'] == '1.0'
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+from models import db, User, RoomLock, Schedule
+from services import schedule_conflicts
+
+
+def test_room_conflicts_ignore_case_and_spacing(app):
+    member = User.query.filter_by(email='student@fitwell.com').one()
+    other = User(name='Other', email='other@example.com', role='student', password_hash='!')
+    db.session.add(other)
+    start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    db.session.add(Schedule(user_id=member.id, title='Yoga', scheduled_time=start, location='Studio A'))
+    db.session.commit()
+
+    conflicts = schedule_conflicts.find([{'scheduled_time': start, 'duration_minutes': 60, 'trainer_id': None,
+                                          'user_id': other.id, 'location': ' studio a'}])
+    assert [conflict['party'] for conflict in conflicts] == ['room']
+    assert Schedule.query.one().location_key == 'studio a'
+
+
+def test_lock_parties_locks_each_room_once(app):
+    schedule_conflicts.lock_parties([], [], ['Studio A', 'studio a ', 'Main Gym', None])
+    db.session.commit()
+    schedule_conflicts.lock_parties([], [], ['STUDIO A', 'Pool'])
+    db.session.commit()
+    assert sorted(lock.room_key for lock in RoomLock.query.all()) == ['pool', 'studio a']
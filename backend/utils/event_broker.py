@@ -0,0 +1,113 @@
+import json
+import queue
+import threading
+
+
+class Subscription:
+    """
+    One connected client's queue of pending events. A client that falls
+    max_pending events behind is marked overflowed and gets nothing more; its
+    stream tells it to reload and reconnect instead of buffering without bound.
+    """
+
+    __slots__ = ('user_id', 'overflowed', '_queue')
+
+    def __init__(self, user_id, max_pending=100):
+        self.user_id = user_id
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """The next event, or None after `timeout` seconds without one"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LocalBroker:
+    """
+    Publish/subscribe between threads (or greenlets) of one process. Events
+    only reach subscribers in the process that published them, which is
+    enough when one worker serves every stream.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, max_pending=100):
+        subscription = Subscription(user_id, max_pending)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_ids, event):
+        """Queue `event` (a dict) for every subscription of the given users"""
+        self._deliver(user_ids, event)
+
+    def _deliver(self, user_ids, event):
+        with self._lock:
+            targets = [subscription for user_id in user_ids
+                       for subscription in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            subscription.put(event)
+
+    def connections(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+class RedisBroker(LocalBroker):
+    """
+    Events relayed through a Redis pub/sub channel, so a stream in any worker
+    or host sees events published by all of them. Each process runs one
+    listener thread, started on its first subscription, that hands channel
+    messages to its local subscribers. Needs the `redis` package, which is only
+    imported when this broker is configured.
+    """
+
+    def __init__(self, url=None, client=None, channel='fitwell:events'):
+        super().__init__()
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.channel = channel
+        self._client = client
+        self._listener = None
+
+    def subscribe(self, user_id, max_pending=100):
+        if self._listener is None or not self._listener.is_alive():
+            with self._lock:
+                if self._listener is None or not self._listener.is_alive():
+                    self._listener = threading.Thread(target=self._listen, name='event-broker', daemon=True)
+                    self._listener.start()
+        return super().subscribe(user_id, max_pending)
+
+    def publish(self, user_ids, event):
+        self._client.publish(self.channel, json.dumps({'user_ids': list(user_ids), 'event': event}))
+
+    def _listen(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            if message.get('type') != 'message':
+                continue
+            payload = json.loads(message['data'])
+            self._deliver(payload['user_ids'], payload['event'])
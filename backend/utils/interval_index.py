@@ -0,0 +1,40 @@
+from bisect import bisect_left, insort
+
+
+class IntervalIndex:
+    """
+    Half-open [start, end) intervals kept sorted by start, with the longest
+    length seen. An interval overlapping [start, end) must start in
+    [start - longest, end), so a query is two binary searches plus a scan of
+    that slice. With bounded lengths (gym sessions last hours, not weeks) the
+    slice holds a handful of entries however many the index has. Works with
+    any ordered values whose differences can be subtracted, e.g. datetimes or
+    integers.
+    """
+
+    def __init__(self, intervals=()):
+        self._items = sorted((start, end, i, value) for i, (start, end, value) in enumerate(intervals))
+        self._starts = [item[0] for item in self._items]
+        self._longest = max((end - start for start, end, _, _ in self._items), default=None)
+        self._next = len(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, start, end, value=None):
+        # The counter keeps ties on start from comparing the values
+        insort(self._items, (start, end, self._next, value))
+        insort(self._starts, start)
+        self._next += 1
+        if self._longest is None or end - start > self._longest:
+            self._longest = end - start
+
+    def overlapping(self, start, end):
+        """[(start, end, value)] of the intervals overlapping [start, end), by start"""
+        if not self._items or end <= start:
+            return []
+        lower = bisect_left(self._starts, start - self._longest)
+        upper = bisect_left(self._starts, end)
+        return [(item_start, item_end, value) for item_start, item_end, _, value in self._items[lower:upper]
+                if item_end > start]
+
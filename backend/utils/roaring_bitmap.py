@@ -0,0 +1,133 @@
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(value):
+        return bin(value).count('1')
+
+# C Roaring switches to a bitmap container above 4096 values. In Python a
+# frozenset costs ~40 bytes per value and hashes on every operation, while an
+# 8 KB integer is combined in about a microsecond, so chunks go dense much sooner
+ARRAY_LIMIT = 256
+CHUNK_BITS = 16
+LOW_MASK = (1 << CHUNK_BITS) - 1
+
+
+def _to_bits(values):
+    """Dense container from a set of 16-bit values"""
+    data = bytearray(1 << (CHUNK_BITS - 3))
+    for value in values:
+        data[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(data, 'little')
+
+
+def _bit_values(bits):
+    """The set bits of a dense container, ascending"""
+    data = bits.to_bytes(1 << (CHUNK_BITS - 3), 'little')
+    return [index << 3 | bit for index, byte in enumerate(data) if byte for bit in range(8) if byte >> bit & 1]
+
+
+def _size(container):
+    return _popcount(container) if isinstance(container, int) else len(container)
+
+
+class RoaringBitmap:
+    """
+    Compressed set of non-negative integer ids in the style of Roaring bitmaps.
+
+    Ids are split by their high bits into chunks of 65536. A chunk with at
+    most ARRAY_LIMIT ids is stored as a frozenset of the low 16 bits (the
+    "array" container); a denser chunk is a 65536-bit integer. And, or and andnot run
+    chunk by chunk with C-level set or integer operations, so combining sets
+    of 100k member ids takes microseconds. Mixing a sparse and a dense chunk
+    needs the sparse one as bits; that form is cached per bitmap, so a
+    long-lived index pays for the conversion once.
+    """
+
+    __slots__ = ('_chunks', '_dense')
+
+    def __init__(self, ids=()):
+        grouped = {}
+        for member_id in ids:
+            grouped.setdefault(member_id >> CHUNK_BITS, set()).add(member_id & LOW_MASK)
+        self._chunks = {
+            high: _to_bits(lows) if len(lows) > ARRAY_LIMIT else frozenset(lows)
+            for high, lows in grouped.items()
+        }
+        self._dense = {}
+
+    @classmethod
+    def _from_chunks(cls, chunks):
+        bitmap = cls.__new__(cls)
+        bitmap._chunks = {high: container for high, container in chunks.items() if container}
+        bitmap._dense = {}
+        return bitmap
+
+    def _bits(self, high):
+        """Chunk `high` as a 65536-bit integer"""
+        container = self._chunks[high]
+        if isinstance(container, int):
+            return container
+        if high not in self._dense:
+            self._dense[high] = _to_bits(container)
+        return self._dense[high]
+
+    def __and__(self, other):
+        chunks = {}
+        for high, container in self._chunks.items():
+            if high not in other._chunks:
+                continue
+            if isinstance(container, int) or isinstance(other._chunks[high], int):
+                chunks[high] = self._bits(high) & other._bits(high)
+            else:
+                chunks[high] = container & other._chunks[high]
+        return self._from_chunks(chunks)
+
+    def __or__(self, other):
+        chunks = dict(self._chunks)
+        for high, container in other._chunks.items():
+            if high not in chunks:
+                chunks[high] = container
+            elif isinstance(container, int) or isinstance(chunks[high], int):
+                chunks[high] = self._bits(high) | other._bits(high)
+            else:
+                union = chunks[high] | container
+                chunks[high] = _to_bits(union) if len(union) > ARRAY_LIMIT else union
+        return self._from_chunks(chunks)
+
+    def __sub__(self, other):
+        chunks = {}
+        for high, container in self._chunks.items():
+            if high not in other._chunks:
+                chunks[high] = container
+            elif isinstance(container, int) or isinstance(other._chunks[high], int):
+                chunks[high] = self._bits(high) & ~other._bits(high)
+            else:
+                chunks[high] = container - other._chunks[high]
+        return self._from_chunks(chunks)
+
+    def __len__(self):
+        return sum(_size(container) for container in self._chunks.values())
+
+    def __bool__(self):
+        return bool(self._chunks)
+
+    def __contains__(self, member_id):
+        container = self._chunks.get(member_id >> CHUNK_BITS)
+        if container is None:
+            return False
+        low = member_id & LOW_MASK
+        return bool(container >> low & 1) if isinstance(container, int) else low in container
+
+    def __iter__(self):
+        for high in sorted(self._chunks):
+            container = self._chunks[high]
+            base = high << CHUNK_BITS
+            for low in (_bit_values(container) if isinstance(container, int) else sorted(container)):
+                yield base | low
+
+    def __eq__(self, other):
+        # The same chunk can be held by either container kind, so compare contents
+        return isinstance(other, RoaringBitmap) and len(self) == len(other) and list(self) == list(other)
+
+    def __repr__(self):
+        return f"RoaringBitmap({len(self)} ids)"
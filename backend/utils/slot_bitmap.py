@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(value):
+        return bin(value).count('1')
+
+SLOT = timedelta(minutes=5)
+SLOTS_PER_DAY = 24 * 60 // 5
+
+
+class SlotBitmap:
+    """
+    Busy time stored as bits of 5-minute slots: bit i is
+    [start + 5i min, start + 5(i+1) min).
+
+    A month of one trainer's calendar is about 1.1 KB. Free time, "free for
+    an hour", "free at a quarter past" and the same over many trainers are
+    a few big-integer operations, each running over all slots at once,
+    instead of a walk over schedule rows. Time before `start` is ignored;
+    a period that only partly covers a slot marks the whole slot.
+    """
+
+    __slots__ = ('start', 'bits')
+
+    def __init__(self, start, bits=0):
+        self.start = start
+        self.bits = bits
+
+    @classmethod
+    def from_bytes(cls, start, data):
+        return cls(start, int.from_bytes(data, 'little') if data else 0)
+
+    def to_bytes(self):
+        return self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
+
+    def index(self, moment, up=False):
+        """Slot of `moment`; with up=True the first slot starting at or after it"""
+        slots, rest = divmod(moment - self.start, SLOT)
+        return slots + 1 if up and rest else slots
+
+    def add(self, begins, ends):
+        lower = max(self.index(begins), 0)
+        upper = self.index(ends, up=True)
+        if upper > lower:
+            self.bits |= span(lower, upper)
+
+    def moved_to(self, start):
+        """The bits counted from another start (a whole number of slots away), e.g. to combine two bitmaps"""
+        offset = self.index(start)
+        return self.bits >> offset if offset >= 0 else self.bits << -offset
+
+
+def span(lower, upper):
+    """Bits lower..upper-1"""
+    return ((1 << (upper - lower)) - 1) << lower if upper > lower else 0
+
+
+def daily(day_bits, days):
+    """`day_bits` (SLOTS_PER_DAY wide) repeated for `days` consecutive days"""
+    return day_bits * (((1 << (SLOTS_PER_DAY * days)) - 1) // ((1 << SLOTS_PER_DAY) - 1))
+
+
+def run_starts(bits, length):
+    """Bits i where bits i..i+length-1 are all set"""
+    covered = 1
+    while covered * 2 <= length:
+        bits &= bits >> covered
+        covered *= 2
+    if covered < length:
+        bits &= bits >> (length - covered)
+    return bits
+
+
+def lowest(bits):
+    """Index of the lowest set bit, -1 when none is set"""
+    return (bits & -bits).bit_length() - 1
+
+
+def run_end(bits, index):
+    """The first clear bit at or after `index`"""
+    return index + lowest(~bits >> index)
+
+
+def count(bits):
+    return _popcount(bits)
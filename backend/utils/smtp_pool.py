@@ -0,0 +1,108 @@
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+
+class SMTPPool:
+    """
+    Up to `size` open SMTP connections shared by the threads of one process.
+    A connection is logged in once and reused for many messages instead of
+    paying the TCP, EHLO, STARTTLS and AUTH round trips per message. One that
+    sat idle is checked with NOOP before reuse, one that sent
+    `max_messages` is replaced (servers cap messages per session), and one
+    that broke mid-send is dropped and reopened on next use.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_tls=False, size=4, timeout=10.0,
+                 max_messages=500, idle_check_seconds=30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_check_seconds = idle_check_seconds
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self.opened = 0
+
+    def _open(self):
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.ehlo()
+            if self.use_tls:
+                connection.starttls()
+                connection.ehlo()
+            if self.username:
+                connection.login(self.username, self.password or '')
+        except Exception:
+            self._close(connection)
+            raise
+        self.opened += 1
+        return [connection, 0, time.monotonic()]
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+    def _checkout(self):
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+            if time.monotonic() - entry[2] < self.idle_check_seconds:
+                return entry
+            try:
+                if entry[0].noop()[0] == 250:
+                    return entry
+            except Exception:
+                pass
+            self._close(entry[0])
+
+    @contextmanager
+    def connection(self):
+        """An open smtplib.SMTP, returned to the pool afterwards unless it broke"""
+        with self._slots:
+            entry = self._checkout()
+            try:
+                yield entry[0]
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                # The server answered (e.g. a refused recipient); the session is still
+                # usable unless it said it is closing it (421)
+                if getattr(e, 'smtp_code', None) == 421:
+                    self._close(entry[0])
+                else:
+                    self._release(entry)
+                raise
+            except Exception:
+                self._close(entry[0])
+                raise
+            else:
+                self._release(entry)
+
+    def _release(self, entry):
+        entry[1] += 1
+        entry[2] = time.monotonic()
+        if entry[1] >= self.max_messages:
+            self._close(entry[0])
+        else:
+            self._idle.put(entry)
+
+    def send(self, message):
+        """Send one email.message.EmailMessage on a pooled connection"""
+        with self.connection() as connection:
+            connection.send_message(message)
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait()[0])
+            except queue.Empty:
+                return
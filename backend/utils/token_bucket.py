@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def parse_rate(rate):
+    """'20/minute' -> (capacity 20, refill 20/60 tokens per second)"""
+    count, _, period = rate.partition('/')
+    seconds = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}[period.strip().rstrip('s') or 'second']
+    capacity = float(count)
+    return capacity, capacity / seconds
+
+
+class MemoryBackend:
+    """
+    Token buckets in a dict, private to this process. The least recently used
+    buckets are dropped past max_keys; a dropped bucket comes back full.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_per_second, cost=1):
+        """Take `cost` tokens. Returns (allowed, seconds until enough tokens are available)"""
+        return self.take_all([(key, capacity, refill_per_second)], cost)
+
+    def take_all(self, buckets, cost=1):
+        """
+        Take `cost` tokens from every (key, capacity, refill_per_second) bucket,
+        or from none of them if any is short. Returns (allowed, seconds until
+        the shortest bucket has enough).
+        """
+        now = time.monotonic()
+        with self._lock:
+            refilled = []
+            retry_after = 0.0
+            for key, capacity, refill_per_second in buckets:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+                if tokens < cost:
+                    retry_after = max(retry_after, (cost - tokens) / refill_per_second)
+                refilled.append((key, tokens))
+            for key, tokens in refilled:
+                self._buckets[key] = (tokens if retry_after else tokens - cost, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after == 0.0, retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# Refill every bucket and take from all of them, or none, in one round trip,
+# so concurrent workers cannot both spend the last token.
+# KEYS are the buckets, ARGV cost, now, then capacity and refill per key.
+_REDIS_TAKE = """
+local cost = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local refilled = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[1 + 2 * i])
+    local refill = tonumber(ARGV[2 + 2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(now - updated, 0) * refill)
+    if tokens < cost then
+        retry_after = math.max(retry_after, (cost - tokens) / refill)
+    end
+    refilled[i] = tokens
+end
+if retry_after == 0 then
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[1 + 2 * i])
+        local refill = tonumber(ARGV[2 + 2 * i])
+        redis.call('HSET', key, 'tokens', refilled[i] - cost, 'updated', now)
+        redis.call('EXPIRE', key, math.ceil(capacity / refill) + 1)
+    end
+end
+return tostring(retry_after)
+"""
+
+
+class RedisBackend:
+    """
+    Token buckets shared by every worker and host through Redis. Needs the
+    `redis` package, which is only imported when this backend is configured.
+    `client` can be any object with register_script(), e.g. a stand-in in tests.
+    """
+
+    def __init__(self, url=None, client=None, prefix='ratelimit:'):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = client.register_script(_REDIS_TAKE)
+
+    def take(self, key, capacity, refill_per_second, cost=1):
+        return self.take_all([(key, capacity, refill_per_second)], cost)
+
+    def take_all(self, buckets, cost=1):
+        args = [cost, time.time()]
+        for _, capacity, refill_per_second in buckets:
+            args += [capacity, refill_per_second]
+        retry_after = float(self._take(keys=[self.prefix + key for key, _, _ in buckets], args=args))
+        return retry_after == 0.0, retry_after
+
+    def clear(self):
+        pass
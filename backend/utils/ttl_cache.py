@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry expiry and an LRU size bound.
+
+    Each key carries a generation number that invalidate() bumps. get_or_load()
+    only stores a freshly loaded value if the generation did not change while
+    it was loading, so a read racing with a write cannot put the old row back.
+    """
+
+    def __init__(self, ttl_seconds=30, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING or entry[1] < time.monotonic():
+                if entry is not _MISSING:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and self._generations.get(key, 0) != generation:
+                return False
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def generation(self, key):
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def get_or_load(self, key, loader):
+        """Return the cached value, or call loader() and cache its result unless it is None"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self.generation(key)
+        value = loader()
+        if value is not None:
+            self.set(key, value, generation)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def __len__(self):
+        return len(self._entries)
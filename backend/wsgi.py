@@ -0,0 +1,12 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is built once in the gunicorn master (preload_app) so workers share
+the imported code copy-on-write; gunicorn.conf.py warms each worker's
+connection pool and caches after the fork.
+"""
+from app import create_app
+
+app = create_app()
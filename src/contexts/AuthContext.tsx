@@ -1,6 +1,6 @@
 import React, { createContext, useContext, useState, ReactNode } from 'react';
 import axios from "axios";
-import api, { authService, AuthResponse, TokenVerificationResponse } from "../services/api";
+import api, { authService, refreshAccessToken, AuthResponse, TokenVerificationResponse } from "../services/api";
 import { toast } from "sonner";
 
 const API_URL = "http://localhost:5000/api";
@@ -55,6 +55,7 @@ export const AuthProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
   };
 
   const logout = () => {
+    authService.logout();
     localStorage.removeItem('token');
     localStorage.removeItem('user');
     setToken(null);
@@ -129,19 +130,29 @@ export const AuthProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
 
   const checkAuth = async () => {
     try {
-      const storedToken = localStorage.getItem('token');
+      let storedToken = localStorage.getItem('token');
       if (!storedToken) {
         throw new Error('No stored token');
       }
 
-      const response = await fetch(`${API_URL}/auth/verify`, {
+      const verify = (accessToken: string) => fetch(`${API_URL}/auth/verify`, {
         method: 'GET',
         headers: {
-          'Authorization': `Bearer ${storedToken}`,
+          'Authorization': `Bearer ${accessToken}`,
           'Content-Type': 'application/json',
         },
       });
 
+      let response = await verify(storedToken);
+      if (response.status === 401) {
+        // Expired access token: renew it with the refresh token instead of forcing a login
+        const refreshedToken = await refreshAccessToken();
+        if (refreshedToken) {
+          storedToken = refreshedToken;
+          response = await verify(storedToken);
+        }
+      }
+
       const data = await response.json();
       console.log('Verify response:', data);
 
@@ -158,6 +169,7 @@ export const AuthProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
     } catch (error) {
       console.error('Auth check failed:', error);
       localStorage.removeItem('token');
+      localStorage.removeItem('refresh_token');
       localStorage.removeItem('user');
       setUser(null);
       setToken(null);
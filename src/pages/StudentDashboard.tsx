@@ -51,6 +51,7 @@ import {
   getNotifications,
   getSchedule
 } from "@/services/studentService";
+import { openNotificationStream, notificationService } from "@/services/api";
 
 const StudentDashboard = () => {
   const navigate = useNavigate();
@@ -78,6 +79,7 @@ const StudentDashboard = () => {
     monthly_progress: []
   });
   const [notifications, setNotifications] = useState([]);
+  const [unreadCount, setUnreadCount] = useState(0);
   const [schedule, setSchedule] = useState([]);
   
   // Loading states
@@ -140,6 +142,45 @@ const StudentDashboard = () => {
     loadInitialData();
   }, [navigate, user]);
 
+  // New notifications and schedule changes are pushed instead of polled, where the server streams
+  useEffect(() => {
+    if (!user || user.role !== "student") return;
+
+    const subscribe = () => openNotificationStream(({ event, data }) => {
+      if (event === "notification" && !data.read) {
+        setUnreadCount((count) => count + 1);
+      }
+      if (event === "unread") {
+        setUnreadCount(data.unread);
+      }
+      if (event === "notification" && data.id) {
+        setNotifications((current) =>
+          current.some((item) => item.id === data.id) ? current : [data, ...current].slice(0, 10)
+        );
+      } else if (event === "notification" || event === "reset") {
+        // Broadcast rows arrive without an id, and a reset means events were dropped
+        loadNotificationsData();
+      }
+      if (event === "schedule" || event === "reset") {
+        loadScheduleData();
+      }
+    });
+
+    let closeStream: (() => void) | null = null;
+    let cancelled = false;
+    notificationService.getUnreadCount()
+      .then((data) => {
+        setUnreadCount(data.unread);
+        if (data.stream && !cancelled) closeStream = subscribe();
+      })
+      .catch((error) => console.error("Error loading unread count:", error));
+
+    return () => {
+      cancelled = true;
+      closeStream?.();
+    };
+  }, [user]);
+
   // Load data based on active tab
   useEffect(() => {
     const loadTabData = async () => {
@@ -276,6 +317,12 @@ const StudentDashboard = () => {
       setLoadingNotifications(true);
       const data = await getNotifications();
       setNotifications(data);
+      // Opening the list reads everything it shows
+      const newestId = Math.max(0, ...data.map((item) => item.id));
+      if (data.some((item) => !item.read) && newestId > 0) {
+        const result = await notificationService.markRead({ to_id: newestId });
+        setUnreadCount(result.unread);
+      }
     } catch (error) {
       console.error("Error loading notifications:", error);
       toast.error("Failed to load notifications");
@@ -387,6 +434,11 @@ const StudentDashboard = () => {
           >
             <Bell className="mr-2 h-5 w-5" />
             Notifications
+            {unreadCount > 0 && (
+              <span className="ml-auto rounded-full bg-white px-2 text-xs font-semibold text-indigo-700">
+                {unreadCount}
+              </span>
+            )}
           </Button>
         </nav>
         
@@ -6,6 +6,7 @@ const API_PATH = "/api";
 // Define response types for better type safety
 export interface AuthResponse {
   access_token: string;
+  refresh_token?: string;
   user: {
     id: number;
     name: string;
@@ -68,13 +69,56 @@ api.interceptors.request.use(
   (error) => Promise.reject(error)
 );
 
+// Exchange the stored refresh token for a new token pair. Concurrent 401s share one call,
+// since each refresh token can only be used once.
+let refreshInFlight: Promise<string | null> | null = null;
+
+export const refreshAccessToken = (): Promise<string | null> => {
+  const refreshToken = localStorage.getItem("refresh_token");
+  if (!refreshToken) {
+    return Promise.resolve(null);
+  }
+  if (!refreshInFlight) {
+    refreshInFlight = fetch(`${API_BASE_URL}${API_PATH}/auth/refresh`, {
+      method: 'POST',
+      headers: { 'Authorization': `Bearer ${refreshToken}` }
+    })
+      .then(async (response) => {
+        if (!response.ok) {
+          localStorage.removeItem("refresh_token");
+          return null;
+        }
+        const data = await response.json();
+        localStorage.setItem("token", data.access_token);
+        localStorage.setItem("refresh_token", data.refresh_token);
+        return data.access_token as string;
+      })
+      .catch(() => null)
+      .finally(() => {
+        refreshInFlight = null;
+      });
+  }
+  return refreshInFlight;
+};
+
 // Add a response interceptor to handle common errors and directly return data
 api.interceptors.response.use(
   (response) => {
     console.log(`API Response from ${response.config.url}:`, response.data);
     return response.data; // This returns the response.data directly instead of the whole response
   }, 
-  (error) => {
+  async (error) => {
+    // An expired access token is renewed once with the refresh token instead of a new login
+    const originalRequest = error.config;
+    if (error.response?.status === 401 && originalRequest && !originalRequest._retried) {
+      originalRequest._retried = true;
+      const newToken = await refreshAccessToken();
+      if (newToken) {
+        originalRequest.headers.Authorization = `Bearer ${newToken}`;
+        return api(originalRequest);
+      }
+    }
+
     console.error("API Error:", error.response?.data || error.message);
     console.error("Request that caused error:", {
       url: error.config?.url,
@@ -115,6 +159,9 @@ export const authService = {
       // Store the token
       if (data.access_token) {
         localStorage.setItem('token', data.access_token);
+        if (data.refresh_token) {
+          localStorage.setItem('refresh_token', data.refresh_token);
+        }
         localStorage.setItem('user', JSON.stringify(data.user));
         console.log("Token stored in localStorage");
       }
@@ -126,13 +173,181 @@ export const authService = {
     }
   },
   register: async (userData: any): Promise<AuthResponse> => {
-    return api.post("auth/register", userData) as Promise<AuthResponse>;
+    const data = await (api.post("auth/register", userData) as Promise<AuthResponse>);
+    if (data.refresh_token) {
+      localStorage.setItem('refresh_token', data.refresh_token);
+    }
+    return data;
+  },
+  logout: async (): Promise<void> => {
+    // Revoke the refresh token family on the server; the local session is cleared either way
+    const refreshToken = localStorage.getItem('refresh_token');
+    localStorage.removeItem('refresh_token');
+    if (refreshToken) {
+      await fetch(`${API_BASE_URL}${API_PATH}/auth/logout`, {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${refreshToken}` }
+      }).catch(() => undefined);
+    }
   },
   verifyToken: async (): Promise<TokenVerificationResponse> => {
     return api.get("auth/verify") as Promise<TokenVerificationResponse>;
   }
 };
 
+// Batch service - several API calls in one round trip and one auth check
+export interface BatchRequest {
+  id: string;
+  method?: "GET" | "POST" | "PUT" | "DELETE";
+  path: string;
+  body?: any;
+}
+
+export interface BatchResponse {
+  id: string;
+  status: number;
+  body: any;
+}
+
+export const batchService = {
+  run: async (requests: BatchRequest[]): Promise<Record<string, BatchResponse>> => {
+    const data = await (api.post("batch", { requests }) as Promise<{ responses: BatchResponse[] }>);
+    return Object.fromEntries(data.responses.map((response) => [response.id, response]));
+  }
+};
+
+// Member segments (staff and admin), e.g. { and: [{ membership_status: "active" }, { not: { attended_within_days: 14 } }] }
+export const segmentService = {
+  getPredicates: async () => {
+    return api.get("segments/predicates");
+  },
+  preview: async (segment: any) => {
+    return api.post("segments/preview", { segment });
+  },
+  exportCsv: async (segment: any) => {
+    return api.post("segments/export", { segment }, { responseType: "blob" });
+  },
+  // large segments: a background job writes the file, see jobService.download
+  exportInBackground: async (segment: any) => {
+    return api.post("segments/export", { segment, async: true });
+  },
+  notify: async (segment: any, title: string, message: string) => {
+    return api.post("segments/notify", { segment, title, message });
+  }
+};
+
+// Unread badge and bulk mark-as-read, for any role
+export const notificationService = {
+  // `stream` is false when the server cannot serve openNotificationStream (see backend README)
+  getUnreadCount: async (): Promise<{ unread: number; stream: boolean }> => {
+    return api.get("notifications/unread-count");
+  },
+  // an id range ({ from_id, to_id }, either bound optional) or everything created before a timestamp
+  markRead: async (range: { from_id?: number; to_id?: number; before?: string }): Promise<{ marked: number; unread: number }> => {
+    return api.post("notifications/read", range);
+  }
+};
+
+// Notification stream (Server-Sent Events). Read with fetch rather than EventSource so the
+// token goes in the Authorization header, not the URL. Reconnects with Last-Event-ID so
+// notifications created while disconnected are replayed. Returns a function that closes it.
+export interface StreamEvent {
+  event: "notification" | "schedule" | "unread" | "reset";
+  id?: string;
+  data: any;
+}
+
+export const openNotificationStream = (onEvent: (event: StreamEvent) => void): (() => void) => {
+  const controller = new AbortController();
+  let lastEventId: string | null = null;
+  let retryMs = 3000;
+
+  const dispatch = (block: string) => {
+    let event = "message";
+    let id: string | undefined;
+    const data: string[] = [];
+    for (const line of block.split("\n")) {
+      if (line.startsWith(":")) continue;
+      const [field, ...rest] = line.split(":");
+      const value = rest.join(":").replace(/^ /, "");
+      if (field === "event") event = value;
+      else if (field === "id") id = value;
+      else if (field === "data") data.push(value);
+      else if (field === "retry") retryMs = Number(value) || retryMs;
+    }
+    if (id) lastEventId = id;
+    if (data.length) onEvent({ event: event as StreamEvent["event"], id, data: JSON.parse(data.join("\n")) });
+  };
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const token = localStorage.getItem("token");
+        const headers: Record<string, string> = { Authorization: `Bearer ${token}` };
+        if (lastEventId) headers["Last-Event-ID"] = lastEventId;
+        const response = await fetch(`${API_BASE_URL}${API_PATH}/notifications/stream`, {
+          headers,
+          signal: controller.signal
+        });
+        if (response.status === 401) {
+          if (!(await refreshAccessToken())) return;
+          continue;
+        }
+        // Without Retry-After the server does not serve streams at all
+        if (response.status === 503 && !response.headers.get("Retry-After")) return;
+        if (response.ok && response.body) {
+          const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+          let buffer = "";
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value;
+            let end;
+            while ((end = buffer.indexOf("\n\n")) >= 0) {
+              dispatch(buffer.slice(0, end));
+              buffer = buffer.slice(end + 2);
+            }
+          }
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return;
+        console.error("Notification stream error:", error);
+      }
+      await new Promise((resolve) => setTimeout(resolve, retryMs));
+    }
+  };
+
+  connect();
+  return () => controller.abort();
+};
+
+// Background jobs (staff see the jobs they queued, admins all). Queuing endpoints answer 202 with `job`;
+// poll getJob(job.id) until status is "succeeded" or "failed".
+export const jobService = {
+  getJobs: async (params?: { status?: string; kind?: string; limit?: number }) => {
+    return api.get("jobs", { params });
+  },
+  getJob: async (id: number) => {
+    return api.get(`jobs/${id}`);
+  },
+  cancel: async (id: number) => {
+    return api.post(`jobs/${id}/cancel`);
+  },
+  retry: async (id: number) => {
+    return api.post(`jobs/${id}/retry`);
+  },
+  // kind: "reconcile_counters" | "rebuild_member_summaries" (admin)
+  queueMaintenance: async (kind: string, priority = "low") => {
+    return api.post("jobs", { kind, priority });
+  },
+  download: async (id: number) => {
+    return api.get(`jobs/${id}/download`, { responseType: "blob" });
+  },
+  getStats: async () => {
+    return api.get("jobs/stats");
+  }
+};
+
 // Admin services
 export const adminService = {
   getUsers: async (role?: string) => {
@@ -153,6 +368,10 @@ export const adminService = {
   },
   addEquipment: async (equipmentData: any) => {
     return api.post("admin/equipment", equipmentData);
+  },
+  // daily present/absent totals; defaults to the last 30 days
+  getAttendanceTrends: async (params?: { start_date?: string; end_date?: string; department?: string }) => {
+    return api.get("admin/attendance/trends", { params });
   }
 };
 
@@ -161,6 +380,10 @@ export const studentService = {
   getProfile: async () => {
     return api.get("student/profile");
   },
+  // attendance, progress, notifications and schedule in one request
+  getDashboard: async () => {
+    return api.get("student/dashboard");
+  },
   getWorkouts: async () => {
     return api.get("student/workouts");
   },
@@ -174,6 +397,10 @@ export const staffService = {
   getProfile: async () => {
     return api.get("staff/profile");
   },
+  // stats, activities and department updates in one request
+  getDashboard: async () => {
+    return api.get("staff/dashboard");
+  },
   getDepartmentMembers: async () => {
     return api.get("staff/department");
   },
@@ -194,6 +421,13 @@ export const staffService = {
   },
   getDietPlans: async () => {
     return api.get("staff/diet-plans");
+  },
+  // audience: "members" | "trainers" | "staff" | "everyone"
+  sendBroadcast: async (title: string, message: string, audience = "members") => {
+    return api.post("staff/broadcasts", { title, message, audience });
+  },
+  getBroadcasts: async () => {
+    return api.get("staff/broadcasts");
   }
 };
 
@@ -202,6 +436,10 @@ export const trainerService = {
   getProfile: async () => {
     return api.get("trainer/profile");
   },
+  // stats, schedule and notifications in one request
+  getDashboard: async () => {
+    return api.get("trainer/dashboard");
+  },
   getAssignedMembers: async () => {
     return api.get("trainer/members");
   },
@@ -162,4 +162,15 @@ export const getSchedule = async () => {
     console.error('Error fetching schedule:', error);
     throw error;
   }
+};
+
+// Free slots with any trainer, e.g. { start, end, duration_minutes, specialization }
+export const findAvailableSlots = async (params) => {
+  try {
+    const response = await apiClient.get('/availability', { params });
+    return response.data;
+  } catch (error) {
+    console.error('Error finding available slots:', error);
+    throw error;
+  }
 }; 
\ No newline at end of file
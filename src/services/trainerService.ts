@@ -248,6 +248,17 @@ export const deleteSchedule = async (scheduleId) => {
   }
 };
 
+// Create many sessions at once (e.g. a weekly series); nothing is created if any of them overlaps
+export const createSchedules = async (sessions) => {
+  try {
+    const response = await apiClient.post('/trainer/schedule/bulk', { sessions });
+    return response.data;
+  } catch (error) {
+    console.error('Error creating schedules:', error);
+    throw error;
+  }
+};
+
 export const getStudentsForScheduling = async () => {
   try {
     const response = await apiClient.get('/trainer/students-for-scheduling');